@@ -0,0 +1,100 @@
+"""
+Synthetic inputs for the benchmarks
+"""
+
+import argparse
+import io
+import random
+from pathlib import Path
+
+from twiddler_ctl.config.config7 import Config7
+from twiddler_ctl.config.text import Text
+from twiddler_ctl.log.binary import CHAR_MAP, Binary
+from twiddler_ctl.models import Command, CommandType, Config, Mapping
+from twiddler_ctl.util import get_backward_mapping, get_forward_mapping, normalize_str
+
+# Candidate characters for datalogs; those the layout cannot type are dropped
+LOG_CHARS = "abcdefghijklmnopqrstuvwxyz0123456789" + "".join(CHAR_MAP)
+
+# Chords are 20 bits wide
+CHORD_BITS = 20
+
+
+def key_codes(layout: str) -> list[int]:
+    # Only plain key codes; modifiers live in the upper byte of the command
+    return sorted(code for code in get_forward_mapping(layout) if code <= 0xFF)
+
+
+def generate_config(
+    mappings: int, macro_share: float, layout: str, seed: int = 0
+) -> Config:
+    """
+    A config with `mappings` distinct chords, of which roughly `macro_share`
+    are bound to command lists of two to eight keys
+    """
+
+    if mappings >= 1 << CHORD_BITS:
+        raise ValueError(f"At most {(1 << CHORD_BITS) - 1} mappings are possible")
+
+    rng = random.Random(seed)
+    codes = key_codes(normalize_str(layout))
+
+    cfg = Config()
+    for chord in rng.sample(range(1, 1 << CHORD_BITS), mappings):
+        length = rng.randint(2, 8) if rng.random() < macro_share else 1
+        commands = [
+            Command(CommandType.KEYBOARD, rng.choice(codes) << 8, 0)
+            for _ in range(length)
+        ]
+        cfg.mappings.append(Mapping(Config7._chord_from_int(chord), commands))
+
+    return cfg
+
+
+def log_chars(layout: str) -> str:
+    mapping = get_backward_mapping(layout)
+    return "".join(c for c in LOG_CHARS if CHAR_MAP.get(c, c) in mapping)
+
+
+def generate_text(length: int, layout: str, seed: int = 0) -> str:
+    rng = random.Random(seed)
+    return "".join(rng.choices(log_chars(layout), k=length))
+
+
+def generate_datalog(megabytes: float, layout: str, seed: int = 0) -> bytes:
+    """A binary datalog of about `megabytes` MB of typed characters"""
+
+    # Every keystroke is a 4-byte code
+    layout = normalize_str(layout)
+    text = generate_text(int(megabytes * (1 << 20)) // 4, layout, seed)
+    buf = io.BytesIO()
+    Binary.write(text, buf, layout)
+    return buf.getvalue()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Generate benchmark inputs")
+    parser.add_argument("output", type=Path, help="Output directory")
+    parser.add_argument("--mappings", type=int, default=10_000)
+    parser.add_argument("--macro-share", type=float, default=0.2)
+    parser.add_argument("--log-mb", type=float, default=1.0)
+    parser.add_argument("--layout", type=str, action="append")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    args.output.mkdir(parents=True, exist_ok=True)
+    for layout in args.layout or ["default"]:
+        name = normalize_str(layout)
+        cfg = generate_config(args.mappings, args.macro_share, name, args.seed)
+
+        with open(args.output / f"{name}.cfg", "wb") as fh:
+            Config7.write(cfg, fh, name)
+        with open(args.output / f"{name}.txt", "w") as fh:
+            Text.write(cfg, fh, name)
+
+        log = generate_datalog(args.log_mb, name, args.seed)
+        (args.output / f"{name}.log").write_bytes(log)
+
+
+if __name__ == "__main__":
+    main()
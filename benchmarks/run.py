@@ -0,0 +1,164 @@
+"""
+Benchmarks for the hot paths, with JSON results that can be compared between runs
+
+    python -m benchmarks.run -o results.json
+    python -m benchmarks.run --baseline results.json --threshold 0.2
+"""
+
+import argparse
+import io
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Callable
+
+from twiddler_ctl.commands.sync import sync_command
+from twiddler_ctl.config.config7 import Config7
+from twiddler_ctl.config.text import Text
+from twiddler_ctl.log.binary import Binary
+from twiddler_ctl.util import normalize_str
+
+from .generate import generate_config, generate_datalog
+
+Case = Callable[[], object]
+
+
+def measure(fn: Case, repeat: int) -> float:
+    """Best wall-clock time of `repeat` runs, after one warm-up run"""
+
+    fn()
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def layout_cases(args: argparse.Namespace, layout: str, tmp: Path) -> dict[str, Case]:
+    cfg = generate_config(args.mappings, args.macro_share, layout, args.seed)
+
+    buf = io.BytesIO()
+    Config7.write(cfg, buf, layout)
+    binary = buf.getvalue()
+
+    buf = io.StringIO()
+    Text.write(cfg, buf, layout)
+    text = buf.getvalue()
+
+    log = generate_datalog(args.log_mb, layout, args.seed)
+    typed = Binary.read(io.BytesIO(log), layout)
+
+    # The drive already holds the encoded configs, so sync only reads, encodes
+    # and compares them
+    drive = tmp / layout / "drive"
+    drive.mkdir(parents=True)
+    source = tmp / layout / "config.txt"
+    source.write_text(text)
+    for i in (1, 2, 3):
+        (drive / f"{i}.cfg").write_bytes(binary)
+    sync_ini = tmp / layout / "sync.ini"
+    sync_ini.write_text(
+        f"[twiddler]\npath={drive}\nlayout={layout}\n\n"
+        f"[configs]\n1={source}\n2={source}\n3={source}\n"
+    )
+    sync_args = argparse.Namespace(config=sync_ini, dry_run=True)
+
+    return {
+        "config7_read": lambda: Config7.read(io.BytesIO(binary), layout),
+        "config7_write": lambda: Config7.write(cfg, io.BytesIO(), layout),
+        "text_read": lambda: Text.read(io.StringIO(text), layout),
+        "text_write": lambda: Text.write(cfg, io.StringIO(), layout),
+        "log_decode": lambda: Binary.read(io.BytesIO(log), layout),
+        "log_encode": lambda: Binary.write(typed, io.BytesIO(), layout),
+        "sync_dry_run": lambda: sync_command(sync_args),
+    }
+
+
+def cold_start() -> None:
+    subprocess.run(
+        [sys.executable, "-m", "twiddler_ctl", "dump", "--table", "system"],
+        check=True,
+        stdout=subprocess.DEVNULL,
+    )
+
+
+def run(args: argparse.Namespace) -> dict[str, float]:
+    results = {}
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for layout in args.layout or ["default"]:
+            name = normalize_str(layout)
+            for case, fn in layout_cases(args, name, Path(tmp)).items():
+                results[f"{case}/{name}"] = measure(fn, args.repeat)
+                print(f"{case}/{name}: {results[f'{case}/{name}'] * 1000:.2f}ms")
+
+    results["cli_cold_start"] = measure(cold_start, args.repeat)
+    print(f"cli_cold_start: {results['cli_cold_start'] * 1000:.2f}ms")
+
+    return results
+
+
+def regressions(
+    results: dict[str, float], baseline: dict[str, float], threshold: float
+) -> list[str]:
+    slower = []
+    for case, secs in results.items():
+        old = baseline.get(case)
+        if old is not None and secs > old * (1 + threshold):
+            slower.append(f"{case}: {old * 1000:.2f}ms -> {secs * 1000:.2f}ms")
+    return slower
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Run benchmarks")
+    parser.add_argument("-o", "--output", type=Path, help="Write results as JSON")
+    parser.add_argument("--baseline", type=Path, help="Results to compare against")
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=0.2,
+        help="Fail if a case is slower than the baseline by this fraction",
+    )
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--mappings", type=int, default=10_000)
+    parser.add_argument("--macro-share", type=float, default=0.2)
+    parser.add_argument("--log-mb", type=float, default=1.0)
+    parser.add_argument("--layout", type=str, action="append")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    results = run(args)
+
+    if args.output:
+        doc = {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+            "params": {
+                "mappings": args.mappings,
+                "macro_share": args.macro_share,
+                "log_mb": args.log_mb,
+                "seed": args.seed,
+            },
+            "results": results,
+        }
+        args.output.write_text(json.dumps(doc, indent=2) + "\n")
+
+    if args.baseline:
+        baseline = json.loads(args.baseline.read_text())["results"]
+        slower = regressions(results, baseline, args.threshold)
+        if slower:
+            print(f"Slower than baseline by more than {args.threshold:.0%}:")
+            for line in slower:
+                print(f"  {line}")
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
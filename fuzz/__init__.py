@@ -0,0 +1,4 @@
+"""
+Differential fuzzing of the config and datalog codecs against reference
+implementations
+"""
@@ -0,0 +1,189 @@
+"""
+Reference codecs written straight from the file formats, without any of the
+table lookups, caching or batching of the real implementations. They are slow
+on purpose and only serve as the expected behaviour for the fuzzer.
+"""
+
+import struct
+
+from twiddler_ctl.log.binary import CHAR_MAP, NAME_MAP
+from twiddler_ctl.models import Chord, Command, CommandType, Config, Mapping
+from twiddler_ctl.util import get_backward_mapping, get_forward_mapping
+
+HEADER_LENGTH = 0x80
+MAPPING_LENGTH = 8
+NONE_COMMAND = b"\x00\x00\x00\x00"
+HEADER_TAIL = (
+    b"\x00\x01\x02\x03\x04\x05\x06\x07"
+    b"\x08\x09\x0a\x0c\x0d\x0f\x11\x14"
+    b"\x16\x18\x1a\x1d\x80\x80\x80\x80"
+    b"\x80\x80\x80\x80\x80\x80\x80\x80"
+)
+
+# Bit positions of the thumb buttons and of the finger rows (R, M, L)
+THUMB_BITS = (0x13, 0x00, 0x04, 0x08, 0x0C)
+FINGER_BITS = (
+    (0x10, 0x11, 0x12),
+    (0x01, 0x02, 0x03),
+    (0x05, 0x06, 0x07),
+    (0x09, 0x0A, 0x0B),
+    (0x0D, 0x0E, 0x0F),
+)
+CHORD_BITS = THUMB_BITS + sum(FINGER_BITS, ())
+
+
+def chord_from_int(value: int) -> Chord:
+    return Chord(
+        thumbs=tuple(bool(value >> bit & 1) for bit in THUMB_BITS),
+        fingers=tuple(
+            tuple(bool(value >> bit & 1) for bit in row) for row in FINGER_BITS
+        ),
+    )
+
+
+def chord_to_int(chord: Chord) -> int:
+    value = 0
+    for on, bit in zip((*chord.thumbs, *sum(chord.fingers, ())), CHORD_BITS):
+        if on:
+            value |= 1 << bit
+    return value
+
+
+def command_from_bytes(data: bytes) -> Command:
+    cmd_type, a, b = struct.unpack("<BHB", data)
+    return Command(CommandType(cmd_type), a, b)
+
+
+def command_to_bytes(command: Command) -> bytes:
+    return struct.pack("<BHB", command.command_type, command.a, command.b)
+
+
+def read_config7(data: bytes) -> Config:
+    if len(data) < HEADER_LENGTH:
+        raise ValueError("Unexpected end of file while reading header")
+    if data[4] != 7:
+        raise ValueError(f"Unsupported version: {data[4]}, expected 7")
+
+    cfg = Config()
+    cfg.version = data[4]
+
+    a = data[5]
+    cfg.repeat = bool(a & 0x01)
+    cfg.bluetooth = bool(a & 0x02)
+    cfg.direct = bool(a & 0x04)
+    cfg.haptic = bool(a & 0x08)
+    cfg.sticky_num = bool(a & 0x10)
+    cfg.sticky_alt = bool(a & 0x20)
+    cfg.sticky_ctrl = bool(a & 0x40)
+    cfg.sticky_shift = bool(a & 0x80)
+
+    b = data[6]
+    cfg.nav_up_direction = b & 0x3
+    cfg.nav_invert_x = bool(b & 0x4)
+    cfg.nav_sensitivity = (b >> 3) & 0x7
+
+    count = data[8] | data[9] << 8
+    cfg.idle_time = data[10] | data[11] << 8
+    cfg.repeat_delay = data[12]
+    cfg.dedicated = data[0x40 : 0x40 + 20]
+
+    region = HEADER_LENGTH + count * MAPPING_LENGTH
+    if len(data) < region:
+        raise ValueError("Unexpected end of file while reading mappings")
+
+    cfg.mappings = []
+    for i in range(count):
+        off = HEADER_LENGTH + i * MAPPING_LENGTH
+        chord = chord_from_int(int.from_bytes(data[off : off + 4], "little"))
+        command = command_from_bytes(data[off + 4 : off + 8])
+
+        commands = [command]
+        if command.command_type == CommandType.COMMAND_LIST:
+            commands = []
+            pos = region + command.a
+            while True:
+                word = data[pos : pos + 4]
+                if len(word) < 4:
+                    raise ValueError("Unexpected end of file while reading commands")
+                if word == NONE_COMMAND:
+                    break
+                commands.append(command_from_bytes(word))
+                pos += 4
+
+        cfg.mappings.append(Mapping(chord, commands))
+
+    return cfg
+
+
+def write_config7(cfg: Config) -> bytes:
+    header = bytearray(HEADER_LENGTH)
+    header[4] = cfg.version
+    for bit, on in enumerate(
+        (
+            cfg.repeat,
+            cfg.bluetooth,
+            cfg.direct,
+            cfg.haptic,
+            cfg.sticky_num,
+            cfg.sticky_alt,
+            cfg.sticky_ctrl,
+            cfg.sticky_shift,
+        )
+    ):
+        header[5] |= int(on) << bit
+    header[6] = (
+        (cfg.nav_up_direction & 0x3)
+        | int(cfg.nav_invert_x) << 2
+        | (cfg.nav_sensitivity & 0x7) << 3
+    )
+    header[8:10] = len(cfg.mappings).to_bytes(2, "little")
+    header[10:12] = cfg.idle_time.to_bytes(2, "little")
+    header[12] = cfg.repeat_delay
+    header[0x40 : 0x40 + 20] = bytes(cfg.dedicated)
+    header[0x60:0x80] = HEADER_TAIL
+
+    table = b""
+    region = b""
+    offsets: dict[bytes, int] = {}
+    mappings = [(chord_to_int(m.chord), m.commands) for m in cfg.mappings]
+    for chord, commands in sorted(mappings, key=lambda m: m[0]):
+        table += chord.to_bytes(4, "little")
+        if len(commands) == 1:
+            table += command_to_bytes(commands[0])
+            continue
+
+        # Identical command lists are stored once
+        buf = b"".join(command_to_bytes(cmd) for cmd in commands)
+        buf += NONE_COMMAND
+        if buf not in offsets:
+            offsets[buf] = len(region)
+            region += buf
+        table += command_to_bytes(Command(CommandType.COMMAND_LIST, offsets[buf], 0))
+
+    return bytes(header) + table + region
+
+
+def read_log_codes(data: bytes) -> list[int]:
+    codes = []
+    for i in range(0, len(data), 4):
+        codes.append(struct.unpack("<I", data[i : i + 4])[0])
+    return codes
+
+
+def read_log(data: bytes, layout: str) -> str:
+    mapping = get_forward_mapping(layout)
+
+    text = ""
+    for code in read_log_codes(data):
+        char = mapping.get(code, "_")
+        text += NAME_MAP.get(char, char)
+    return text
+
+
+def write_log(text: str, layout: str) -> bytes:
+    mapping = get_backward_mapping(layout)
+
+    data = b""
+    for c in text:
+        data += struct.pack("<I", mapping.get(CHAR_MAP.get(c, c)))
+    return data
@@ -0,0 +1,209 @@
+"""
+Differential fuzzer for the codecs, spread over all cores
+
+    python -m fuzz.run --seconds 60
+    python -m fuzz.run --target config7_read --replay 1234
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+import traceback
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any
+
+from twiddler_ctl.util import layout_exists, normalize_str
+
+from .targets import TARGETS, Target
+
+# Upper bound on shrink attempts, so minimizing never takes longer than fuzzing
+MAX_SHRINK_STEPS = 20_000
+
+
+@dataclass
+class Failure:
+    target: str
+    seed: int
+    problem: str
+    data: Any
+
+
+def check(target: Target, data: Any, layout: str) -> str | None:
+    # Whatever a check lets escape is a crash in the code under test, which is
+    # what the fuzzer is looking for, so it is reported rather than propagated
+    try:
+        return target.check(data, layout)
+    except Exception as e:  # noqa: BLE001
+        frame = traceback.extract_tb(e.__traceback__)[-1]
+        return f"crash: {type(e).__name__}: {e} ({frame.filename}:{frame.lineno})"
+
+
+def _kind(problem: str) -> str:
+    return problem.split(":", 1)[0]
+
+
+def run_batch(
+    name: str, layout: str, seed: int, count: int
+) -> tuple[int, float, list[Failure]]:
+    """
+    Run `count` inputs, each generated from its own seed for replay. Returns
+    the count, the seconds spent and the failures.
+    """
+
+    target = TARGETS[name]
+    failures = []
+    start = time.perf_counter()
+    for i in range(count):
+        data = target.generate(random.Random(seed + i), layout)
+        problem = check(target, data, layout)
+        if problem is not None:
+            failures.append(Failure(name, seed + i, problem, data))
+    return count, time.perf_counter() - start, failures
+
+
+def minimize(failure: Failure, layout: str) -> Failure:
+    """Greedily take the first smaller input that fails the same way"""
+
+    target = TARGETS[failure.target]
+    kind = _kind(failure.problem)
+    steps = 0
+
+    progress = True
+    while progress and steps < MAX_SHRINK_STEPS:
+        progress = False
+        for data in target.shrink(failure.data):
+            steps += 1
+            problem = check(target, data, layout)
+            if problem is not None and _kind(problem) == kind:
+                failure = Failure(failure.target, failure.seed, problem, data)
+                progress = True
+                break
+            if steps >= MAX_SHRINK_STEPS:
+                break
+
+    return failure
+
+
+def _dump(failure: Failure, output: Path) -> Path:
+    output.mkdir(parents=True, exist_ok=True)
+    path = output / f"{failure.target}-{failure.seed}"
+    if isinstance(failure.data, bytes):
+        path = path.with_suffix(".bin")
+        path.write_bytes(failure.data)
+    else:
+        path = path.with_suffix(".txt")
+        path.write_text(f"{failure.problem}\n\n{failure.data!r}\n")
+    return path
+
+
+def fuzz(
+    args: argparse.Namespace, layout: str
+) -> tuple[dict[str, int], dict[str, float], list[Failure]]:
+    names = args.target or list(TARGETS)
+    execs = dict.fromkeys(names, 0)
+    # Worker seconds per target, as the targets share the workers
+    seconds = dict.fromkeys(names, 0.0)
+    failures: list[Failure] = []
+    seen: set[tuple[str, str]] = set()
+
+    deadline = time.monotonic() + args.seconds
+    seed = args.seed
+    turn = 0
+
+    with ProcessPoolExecutor(args.jobs) as pool:
+
+        def submit():
+            nonlocal seed, turn
+            name = names[turn % len(names)]
+            turn += 1
+            future = pool.submit(run_batch, name, layout, seed, args.batch)
+            seed += args.batch
+            return future, name
+
+        pending = dict(submit() for _ in range(args.jobs * 2))
+        while pending:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                name = pending.pop(future)
+                count, elapsed, found = future.result()
+                execs[name] += count
+                seconds[name] += elapsed
+
+                # Only the first failure of each kind per target is kept
+                for failure in found:
+                    key = (failure.target, _kind(failure.problem))
+                    if key not in seen:
+                        seen.add(key)
+                        failures.append(failure)
+
+                if time.monotonic() < deadline and len(failures) < args.max_failures:
+                    future, name = submit()
+                    pending[future] = name
+
+        if failures and not args.no_minimize:
+            failures = list(pool.map(minimize, failures, [layout] * len(failures)))
+
+    return execs, seconds, failures
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Fuzz the codecs")
+    parser.add_argument("--seconds", type=float, default=60.0)
+    parser.add_argument("--jobs", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--batch", type=int, default=200, help="Inputs per task")
+    parser.add_argument(
+        "--target", choices=sorted(TARGETS), action="append", help="Default: all"
+    )
+    parser.add_argument("--layout", type=str, default="default")
+    parser.add_argument("--seed", type=int, help="Default: random")
+    parser.add_argument("--max-failures", type=int, default=10)
+    parser.add_argument("--no-minimize", action="store_true")
+    parser.add_argument("--replay", type=int, help="Re-run a single seed and exit")
+    parser.add_argument("-o", "--output", type=Path, help="Save failing inputs here")
+    args = parser.parse_args()
+
+    layout = normalize_str(args.layout)
+    if not layout_exists(layout):
+        print(f"Unknown layout: {args.layout}")
+        sys.exit(1)
+
+    if args.replay is not None:
+        failures = []
+        for name in args.target or list(TARGETS):
+            _, _, found = run_batch(name, layout, args.replay, 1)
+            failures += found
+        for failure in failures:
+            print(f"{failure.target} seed {failure.seed}: {failure.problem}")
+            print(f"  input: {failure.data!r}")
+        sys.exit(1 if failures else 0)
+
+    if args.seed is None:
+        args.seed = random.randrange(1 << 32)
+    print(f"Seed {args.seed}, {args.jobs} jobs, layout {layout}")
+
+    start = time.monotonic()
+    execs, seconds, failures = fuzz(args, layout)
+    elapsed = time.monotonic() - start
+
+    for name, count in execs.items():
+        rate = count / seconds[name] if seconds[name] else 0
+        print(f"{name}: {count} execs ({rate:.0f}/sec per job)")
+    total = sum(execs.values())
+    print(f"{total} execs in {elapsed:.1f}s ({total / elapsed:.0f} execs/sec)")
+
+    for failure in failures:
+        print(f"\n{failure.target} seed {failure.seed}: {failure.problem}")
+        print(f"  input: {failure.data!r}")
+        if args.output:
+            print(f"  saved to {_dump(failure, args.output)}")
+
+    if failures:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,402 @@
+"""
+Fuzz targets. Each target generates an input from a random source, checks the
+real implementation against the reference for it, and proposes smaller inputs
+when a check fails.
+
+A check returns None when both agree, or a description of the difference.
+Inputs that both sides reject with `ValueError` or `struct.error` agree; any
+other exception escapes the check and is reported as a crash.
+"""
+
+import io
+import random
+import struct
+from dataclasses import dataclass, fields, replace
+from typing import Any, Callable, Iterator
+
+from twiddler_ctl.canonical import config_digest, image_digest
+from twiddler_ctl.config.config7 import Config7
+from twiddler_ctl.config.text import (
+    DEDICATED_CODES,
+    MODIFIER_CODES,
+    MOUSE_CODES,
+    NAV_CODES,
+    SYSTEM_CODES,
+    Text,
+)
+from twiddler_ctl.log.binary import Binary
+from twiddler_ctl.models import Command, CommandType, Config, Mapping
+from twiddler_ctl.util import get_forward_mapping
+
+from benchmarks.generate import log_chars
+
+from . import reference
+
+REJECTED = (ValueError, struct.error)
+
+# Byte values that tend to hit edge cases in the binary formats
+INTERESTING_BYTES = (0x00, 0x01, 0x07, 0x7F, 0x80, 0xFF)
+
+# Inputs are kept small so that many run per second and failures are readable
+MAX_MAPPINGS = 40
+MAX_COMMANDS = 6
+MAX_LOG_CODES = 200
+
+
+@dataclass(frozen=True)
+class Target:
+    name: str
+    generate: Callable[[random.Random, str], Any]
+    check: Callable[[Any, str], str | None]
+    shrink: Callable[[Any], Iterator[Any]]
+
+
+def _outcome(fn: Callable[[], Any]) -> tuple[str, Any]:
+    try:
+        return "ok", fn()
+    except REJECTED:
+        return "rejected", None
+
+
+def _compare(
+    name: str, actual: tuple[str, Any], expected: tuple[str, Any]
+) -> str | None:
+    if actual == expected:
+        return None
+    if actual[0] != expected[0]:
+        return f"{name}: {actual[0]}, reference {expected[0]}"
+    return f"{name}: {actual[1]!r} != {expected[1]!r}"
+
+
+# Generators
+
+
+def _random_command(rng: random.Random) -> Command:
+    return Command(
+        CommandType(rng.randrange(len(CommandType))),
+        rng.randrange(0x10000),
+        rng.randrange(0x100),
+    )
+
+
+def _random_settings(rng: random.Random) -> Config:
+    return Config(
+        repeat=rng.random() < 0.5,
+        bluetooth=rng.random() < 0.5,
+        direct=rng.random() < 0.5,
+        haptic=rng.random() < 0.5,
+        sticky_num=rng.random() < 0.5,
+        sticky_alt=rng.random() < 0.5,
+        sticky_ctrl=rng.random() < 0.5,
+        sticky_shift=rng.random() < 0.5,
+        nav_up_direction=rng.choice(list(NAV_CODES)),
+        nav_invert_x=rng.random() < 0.5,
+        nav_sensitivity=rng.randrange(8),
+        idle_time=rng.randrange(0x10000),
+        repeat_delay=rng.randrange(0x100),
+        dedicated=[rng.choice([0, *DEDICATED_CODES]) for _ in range(20)],
+    )
+
+
+def random_config(rng: random.Random) -> Config:
+    """Any config the binary format can hold, duplicate chords included"""
+
+    cfg = _random_settings(rng)
+    chords = [rng.randrange(1 << 20) for _ in range(rng.randrange(8))]
+    for _ in range(rng.randrange(MAX_MAPPINGS)):
+        # Reusing chords exercises duplicates and shared command lists
+        chord = (
+            rng.choice(chords)
+            if chords and rng.random() < 0.2
+            else rng.randrange(1 << 20)
+        )
+        commands = [
+            _random_command(rng)
+            for _ in range(rng.choice([1, 1, 1, *range(MAX_COMMANDS)]))
+        ]
+        cfg.mappings.append(Mapping(Config7._chord_from_int(chord), commands))
+    return cfg
+
+
+def _text_command(rng: random.Random, layout: str) -> Command:
+    kind = rng.randrange(6)
+    if kind == 0:
+        return Command(CommandType.SYSTEM, rng.choice(list(SYSTEM_CODES)), 0)
+    if kind == 1:
+        return Command(CommandType.MOUSE, rng.choice(list(MOUSE_CODES)), 0)
+    if kind == 2:
+        apps = get_forward_mapping("default", True)
+        return Command(CommandType.APPLICATION, rng.choice(list(apps)), 0)
+    if kind == 3:
+        return Command(CommandType.DELAY, rng.randrange(0x10000), 0)
+    if kind == 4:
+        return Command(CommandType.HAPTIC, rng.randrange(0x10000), 0)
+
+    keys = [code for code in get_forward_mapping(layout) if code <= 0xFF]
+    mods = 0
+    for bit in MODIFIER_CODES:
+        if rng.random() < 0.15:
+            mods |= bit
+    return Command(CommandType.KEYBOARD, rng.choice(keys) << 8 | mods, 0)
+
+
+def random_text_config(rng: random.Random, layout: str) -> Config:
+    """A config the text format can express: known commands, unique chords"""
+
+    cfg = _random_settings(rng)
+    for chord in rng.sample(range(1 << 20), rng.randrange(MAX_MAPPINGS)):
+        commands = [
+            _text_command(rng, layout)
+            for _ in range(rng.choice([1, 1, *range(MAX_COMMANDS)]))
+        ]
+        cfg.mappings.append(Mapping(Config7._chord_from_int(chord), commands))
+    return cfg
+
+
+def header_change(rng: random.Random, layout: str) -> tuple[Config, str, Any]:
+    """A config, and a setting to change in it along with the new value"""
+
+    cfg = random_config(rng)
+    other = _random_settings(rng)
+    name = rng.choice(SETTINGS)
+    value = getattr(other, name)
+    if name == "dedicated":
+        # A single key, so that the change is as small as possible
+        value = list(cfg.dedicated)
+        i = rng.randrange(len(value))
+        value[i] = rng.choice([c for c in [0, *DEDICATED_CODES] if c != value[i]])
+    return cfg, name, value
+
+
+def mutate(rng: random.Random, data: bytes) -> bytes:
+    buf = bytearray(data)
+    for _ in range(rng.randint(1, 4)):
+        op = rng.randrange(6)
+        pos = rng.randrange(len(buf) + 1)
+        if op == 0 and buf:
+            buf[pos % len(buf)] ^= 1 << rng.randrange(8)
+        elif op == 1 and buf:
+            buf[pos % len(buf)] = rng.choice(INTERESTING_BYTES)
+        elif op == 2:
+            del buf[pos:]
+        elif op == 3:
+            buf[pos:pos] = rng.randbytes(rng.randint(1, 8))
+        elif op == 4 and len(buf) >= 10:
+            # The mapping count decides how much of the rest is read
+            buf[8:10] = rng.randrange(MAX_MAPPINGS * 2).to_bytes(2, "little")
+        elif op == 5 and buf:
+            del buf[pos : pos + rng.randint(1, 8)]
+    return bytes(buf)
+
+
+def config_image(rng: random.Random, layout: str) -> bytes:
+    data = reference.write_config7(random_config(rng))
+    if rng.random() < 0.7:
+        data = mutate(rng, data)
+    return data
+
+
+def log_data(rng: random.Random, layout: str) -> bytes:
+    known = list(get_forward_mapping(layout))
+    codes = [
+        rng.choice(known) if rng.random() < 0.9 else rng.randrange(1 << 32)
+        for _ in range(rng.randrange(MAX_LOG_CODES))
+    ]
+    data = struct.pack(f"<{len(codes)}I", *codes)
+    if rng.random() < 0.1:
+        data = mutate(rng, data)
+    return data
+
+
+def log_text(rng: random.Random, layout: str) -> str:
+    chars = log_chars(layout)
+    text = "".join(rng.choices(chars, k=rng.randrange(MAX_LOG_CODES)))
+    if text and rng.random() < 0.1:
+        # A character the layout cannot type
+        pos = rng.randrange(len(text))
+        text = text[:pos] + "☃" + text[pos:]
+    return text
+
+
+# Settings the binary format stores, other than the version
+SETTINGS = tuple(
+    f.name for f in fields(Config) if f.name not in ("version", "mappings")
+)
+
+# Checks
+
+
+def check_config7_read(data: bytes, layout: str) -> str | None:
+    return _compare(
+        "Config7.read",
+        _outcome(lambda: Config7.read(io.BytesIO(data), layout)),
+        _outcome(lambda: reference.read_config7(data)),
+    )
+
+
+def check_config7_write(cfg: Config, layout: str) -> str | None:
+    def write() -> bytes:
+        buf = io.BytesIO()
+        Config7.write(cfg, buf, layout)
+        return buf.getvalue()
+
+    return _compare(
+        "Config7.write",
+        _outcome(write),
+        _outcome(lambda: reference.write_config7(cfg)),
+    )
+
+
+def check_digest(data: bytes, layout: str) -> str | None:
+    # The streaming digest must agree with hashing the decoded config. Images
+    # that do not decode have no defined digest, since it skips shadowed
+    # duplicates and never validates command types.
+    expected = _outcome(lambda: config_digest(reference.read_config7(data)))
+    if expected[0] == "rejected":
+        return None
+    return _compare(
+        "image_digest", _outcome(lambda: image_digest(io.BytesIO(data))), expected
+    )
+
+
+def check_digest_distinct(data: tuple[Config, str, Any], layout: str) -> str | None:
+    # Configs that decode differently must not share a digest, or they would be
+    # deduplicated into one. Changing a single setting looks for the smallest
+    # differences the digest could miss.
+    cfg, name, value = data
+    images = _outcome(
+        lambda: [
+            reference.write_config7(c) for c in (cfg, replace(cfg, **{name: value}))
+        ]
+    )
+    if images[0] == "rejected":
+        return None
+    decoded = _outcome(lambda: [reference.read_config7(i) for i in images[1]])
+    if decoded[0] == "rejected" or decoded[1][0] == decoded[1][1]:
+        return None
+
+    a, b = (image_digest(io.BytesIO(i)) for i in images[1])
+    if a == b:
+        return f"digest collision: {name} {getattr(cfg, name)!r} -> {value!r}"
+    return None
+
+
+def check_text(cfg: Config, layout: str) -> str | None:
+    def round_trip() -> Config:
+        buf = io.StringIO()
+        Text.write(cfg, buf, layout)
+        buf.seek(0)
+        return Text.read(buf, layout)
+
+    # The text format holds everything in these configs, so it must round trip
+    return _compare("Text round trip", _outcome(round_trip), ("ok", cfg))
+
+
+def check_log_read(data: bytes, layout: str) -> str | None:
+    return _compare(
+        "Binary.read",
+        _outcome(lambda: Binary.read(io.BytesIO(data), layout)),
+        _outcome(lambda: reference.read_log(data, layout)),
+    ) or _compare(
+        "Binary.read_codes",
+        _outcome(lambda: Binary.read_codes(io.BytesIO(data))),
+        _outcome(lambda: reference.read_log_codes(data)),
+    )
+
+
+def check_log_write(text: str, layout: str) -> str | None:
+    def write() -> bytes:
+        buf = io.BytesIO()
+        Binary.write(text, buf, layout)
+        return buf.getvalue()
+
+    return _compare(
+        "Binary.write",
+        _outcome(write),
+        _outcome(lambda: reference.write_log(text, layout)),
+    )
+
+
+# Shrinkers
+
+
+def shrink_sequence(data: Any) -> Iterator[Any]:
+    """Drop ever smaller chunks, then zero out single bytes"""
+
+    size = len(data) // 2
+    while size:
+        for start in range(0, len(data) - size + 1, size):
+            yield data[:start] + data[start + size :]
+        size //= 2
+
+    if isinstance(data, bytes):
+        for i, value in enumerate(data):
+            if value:
+                yield data[:i] + b"\x00" + data[i + 1 :]
+
+
+def shrink_image(data: bytes) -> Iterator[bytes]:
+    """Drop whole mapping table entries first, keeping the count in step"""
+
+    if len(data) >= reference.HEADER_LENGTH:
+        count = int.from_bytes(data[8:10], "little")
+        for i in reversed(range(count)):
+            off = reference.HEADER_LENGTH + i * reference.MAPPING_LENGTH
+            if off + reference.MAPPING_LENGTH > len(data):
+                continue
+            yield (
+                data[:8]
+                + (count - 1).to_bytes(2, "little")
+                + data[10:off]
+                + data[off + reference.MAPPING_LENGTH :]
+            )
+
+    yield from shrink_sequence(data)
+
+
+def shrink_config(cfg: Config) -> Iterator[Config]:
+    for mappings in shrink_sequence(cfg.mappings):
+        yield replace(cfg, mappings=mappings)
+
+    for i, mapping in enumerate(cfg.mappings):
+        for commands in shrink_sequence(mapping.commands):
+            mappings = list(cfg.mappings)
+            mappings[i] = Mapping(mapping.chord, commands)
+            yield replace(cfg, mappings=mappings)
+
+    # Settings back to their defaults, one at a time
+    default = Config()
+    for f in fields(Config):
+        if f.name != "mappings" and getattr(cfg, f.name) != getattr(default, f.name):
+            yield replace(cfg, **{f.name: getattr(default, f.name)})
+
+
+def shrink_header_change(
+    data: tuple[Config, str, Any],
+) -> Iterator[tuple[Config, str, Any]]:
+    cfg, name, value = data
+    for smaller in shrink_config(cfg):
+        yield smaller, name, value
+
+
+def _random_config(rng: random.Random, layout: str) -> Config:
+    return random_config(rng)
+
+
+TARGETS = {
+    target.name: target
+    for target in (
+        Target("config7_read", config_image, check_config7_read, shrink_image),
+        Target("config7_write", _random_config, check_config7_write, shrink_config),
+        Target("config7_digest", config_image, check_digest, shrink_image),
+        Target(
+            "config7_digest_distinct",
+            header_change,
+            check_digest_distinct,
+            shrink_header_change,
+        ),
+        Target("text_round_trip", random_text_config, check_text, shrink_config),
+        Target("log_read", log_data, check_log_read, shrink_sequence),
+        Target("log_write", log_text, check_log_write, shrink_sequence),
+    )
+}
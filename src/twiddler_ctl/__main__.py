@@ -3,20 +3,40 @@
 twiddler-ctl
 """
 
+import cProfile
 import sys
 import argparse
 from pathlib import Path
 
+from . import profiling
 from .commands.convert import convert_command
 from .commands._util import FORMAT_MAP
 from .commands.visualize import visualize_command
 from .commands.sync import sync_command
 from .commands.dump import dump_command, KEY_TABLES
-from .commands.convert_log import convert_log_command
+from .commands.convert_log import convert_log_command, FORMAT_MAP as LOG_FORMAT_MAP
+from .commands.validate import validate_command
+from .commands.serve import serve_command
+from .commands.diff import diff_command
+from .commands.analyze import analyze_command
+from .commands.layouts_check import layouts_check_command
+from .commands.optimize import optimize_command
+from .commands.encode import encode_command
+from .commands.remap import remap_command
+from .commands.edit import edit_command
+from .commands.hash import hash_command
+from .commands.index import index_build_command, index_query_command
+from .commands.lsp import lsp_command
 
 
 def main() -> None:
     parser = argparse.ArgumentParser(description="Manage Twiddler configs")
+    parser.add_argument(
+        "--profile", action="store_true", help="Print time spent in each phase"
+    )
+    parser.add_argument(
+        "--profile-output", type=Path, help="Also write cProfile stats to this file"
+    )
 
     subparsers = parser.add_subparsers(dest="command", help="Command")
 
@@ -24,10 +44,16 @@ def main() -> None:
         "convert", help="Convert configs from/to text"
     )
     convert_parser.set_defaults(func=convert_command)
-    convert_parser.add_argument("input", type=Path, help="Input file")
-    convert_parser.add_argument("output", type=Path, help="Output file")
+    convert_parser.add_argument("input", type=Path, help="Input file, or - for stdin")
     convert_parser.add_argument(
-        "--layout", type=str, default="default", help="Keyboard layout"
+        "output", type=Path, help="Output file, or - for stdout"
+    )
+    convert_parser.add_argument(
+        "--layout",
+        type=str,
+        action="append",
+        help="Keyboard layout (default: default). Repeat to convert for several "
+        "layouts, with {layout} in the output path",
     )
     convert_parser.add_argument(
         "--input-format", choices=FORMAT_MAP.keys(), help="Input format"
@@ -36,6 +62,50 @@ def main() -> None:
         "--output-format", choices=FORMAT_MAP.keys(), help="Output format"
     )
 
+    remap_parser = subparsers.add_parser(
+        "remap", help="Translate a binary config between keyboard layouts"
+    )
+    remap_parser.set_defaults(func=remap_command)
+    remap_parser.add_argument("input", type=Path, help="Input file, or - for stdin")
+    remap_parser.add_argument("output", type=Path, help="Output file, or - for stdout")
+    remap_parser.add_argument(
+        "--from", dest="src", type=str, required=True, help="Source keyboard layout"
+    )
+    remap_parser.add_argument(
+        "--to", dest="dst", type=str, required=True, help="Target keyboard layout"
+    )
+    remap_parser.add_argument(
+        "--keep-missing",
+        action="store_true",
+        help="Leave keys the target layout lacks unchanged instead of failing",
+    )
+
+    edit_parser = subparsers.add_parser(
+        "edit", help="Change mappings in a binary config in place"
+    )
+    edit_parser.set_defaults(func=edit_command)
+    edit_parser.add_argument("input", type=Path, help="Input file, or - for stdin")
+    edit_parser.add_argument(
+        "-o", "--output", type=Path, help="Output file, or - for stdout"
+    )
+    edit_parser.add_argument(
+        "--set",
+        action="append",
+        default=[],
+        metavar="CHORD=COMMANDS",
+        help="Add or replace a mapping",
+    )
+    edit_parser.add_argument(
+        "--remove",
+        action="append",
+        default=[],
+        metavar="CHORD",
+        help="Remove a mapping",
+    )
+    edit_parser.add_argument(
+        "--layout", type=str, default="default", help="Keyboard layout"
+    )
+
     visualize_parser = subparsers.add_parser(
         "visualize", help="(WIP) Visualize config layout"
     )
@@ -44,12 +114,138 @@ def main() -> None:
     visualize_parser.add_argument(
         "--input-format", choices=FORMAT_MAP.keys(), help="Input format"
     )
+    visualize_parser.add_argument(
+        "--format",
+        default="braille",
+        choices=["braille", "svg", "html"],
+        help="Output format",
+    )
+    visualize_parser.add_argument(
+        "-o", "--output", type=Path, help="Output file for svg and html"
+    )
+    visualize_parser.add_argument(
+        "--layout", type=str, default="default", help="Keyboard layout"
+    )
+
+    validate_parser = subparsers.add_parser("validate", help="Validate config")
+    validate_parser.set_defaults(func=validate_command)
+    validate_parser.add_argument("input", type=Path, help="Input file")
+    validate_parser.add_argument(
+        "--layout", type=str, default="default", help="Keyboard layout"
+    )
+    validate_parser.add_argument(
+        "--input-format", choices=FORMAT_MAP.keys(), help="Input format"
+    )
+
+    diff_parser = subparsers.add_parser("diff", help="Compare two configs")
+    diff_parser.set_defaults(func=diff_command)
+    diff_parser.add_argument("a", type=Path, help="Old config")
+    diff_parser.add_argument("b", type=Path, help="New config")
+    diff_parser.add_argument(
+        "--layout", type=str, default="default", help="Keyboard layout"
+    )
+    diff_parser.add_argument(
+        "--a-format", choices=FORMAT_MAP.keys(), help="Old config format"
+    )
+    diff_parser.add_argument(
+        "--b-format", choices=FORMAT_MAP.keys(), help="New config format"
+    )
+
+    hash_parser = subparsers.add_parser(
+        "hash", help="Print digests for detecting equivalent configs"
+    )
+    hash_parser.set_defaults(func=hash_command)
+    hash_parser.add_argument("input", type=Path, nargs="+", help="Input files")
+    hash_parser.add_argument(
+        "--layout", type=str, default="default", help="Keyboard layout"
+    )
+    hash_parser.add_argument(
+        "--input-format", choices=FORMAT_MAP.keys(), help="Input format"
+    )
+
+    index_parser = subparsers.add_parser(
+        "index", help="Search many configs by chord or command"
+    )
+    index_subparsers = index_parser.add_subparsers(dest="index_command")
+
+    index_build_parser = index_subparsers.add_parser(
+        "build", help="Add or refresh configs in the index"
+    )
+    index_build_parser.set_defaults(func=index_build_command)
+    index_build_parser.add_argument(
+        "input", type=Path, nargs="+", help="Config files or directories"
+    )
+    index_build_parser.add_argument(
+        "--index", type=Path, default=".twiddler-index.json", help="Index file"
+    )
+    index_build_parser.add_argument(
+        "--layout", type=str, default="default", help="Keyboard layout"
+    )
+
+    index_query_parser = index_subparsers.add_parser(
+        "query", help="Find mappings in the index"
+    )
+    index_query_parser.set_defaults(func=index_query_command)
+    index_query_parser.add_argument(
+        "--index", type=Path, default=".twiddler-index.json", help="Index file"
+    )
+    index_query_parser.add_argument(
+        "--layout", type=str, default="default", help="Keyboard layout"
+    )
+    query_group = index_query_parser.add_mutually_exclusive_group(required=True)
+    query_group.add_argument("--chord", type=str, help="Chord, e.g. T1F2M")
+    query_group.add_argument(
+        "--command", type=str, help="Command, e.g. system:toggle_untethered_mode"
+    )
+
+    analyze_parser = subparsers.add_parser("analyze", help="Report conflicting chords")
+    analyze_parser.set_defaults(func=analyze_command)
+    analyze_parser.add_argument("input", type=Path, help="Input file")
+    analyze_parser.add_argument(
+        "--layout", type=str, default="default", help="Keyboard layout"
+    )
+    analyze_parser.add_argument(
+        "--input-format", choices=FORMAT_MAP.keys(), help="Input format"
+    )
+    analyze_parser.add_argument(
+        "--max-distance",
+        type=int,
+        default=1,
+        help="Report subset chords missing at most this many keys",
+    )
+
+    layouts_check_parser = subparsers.add_parser(
+        "layouts-check", help="Report mappings that change under other layouts"
+    )
+    layouts_check_parser.set_defaults(func=layouts_check_command)
+    layouts_check_parser.add_argument("input", type=Path, help="Input file")
+    layouts_check_parser.add_argument(
+        "--layout",
+        type=str,
+        default="default",
+        help="Keyboard layout the config was written for",
+    )
+    layouts_check_parser.add_argument(
+        "--input-format", choices=FORMAT_MAP.keys(), help="Input format"
+    )
+    layouts_check_parser.add_argument(
+        "--details", action="store_true", help="List the affected mappings"
+    )
+    layouts_check_parser.add_argument(
+        "-o", "--output", type=Path, help="Write the full matrix as CSV"
+    )
+    layouts_check_parser.add_argument(
+        "--jobs", type=int, help="Worker processes (default: CPU count)"
+    )
 
     sync_parser = subparsers.add_parser("sync", help="Sync configs")
     sync_parser.set_defaults(func=sync_command)
     sync_parser.add_argument(
         "--config", type=Path, default="config.ini", help="Config file"
     )
+    sync_parser.add_argument(
+        "--dry-run", action="store_true", help="Only report configs that would change"
+    )
 
     dump_parser = subparsers.add_parser("dump", help="Output valid actions")
     dump_parser.set_defaults(func=dump_command)
@@ -67,10 +263,65 @@ def main() -> None:
         "--layout", type=str, default="default", help="Keyboard layout"
     )
     convert_log_parser.add_argument(
-        "--input-format", choices=FORMAT_MAP.keys(), help="Input format"
+        "--input-format", choices=LOG_FORMAT_MAP.keys(), help="Input format"
     )
     convert_log_parser.add_argument(
-        "--output-format", choices=FORMAT_MAP.keys(), help="Output format"
+        "--output-format", choices=LOG_FORMAT_MAP.keys(), help="Output format"
+    )
+
+    serve_parser = subparsers.add_parser(
+        "serve", help="Run a conversion server on a Unix socket"
+    )
+    serve_parser.set_defaults(func=serve_command)
+    serve_parser.add_argument("--socket", type=Path, help="Socket path")
+    serve_parser.add_argument(
+        "--layout", type=str, action="append", help="Keyboard layout to preload"
+    )
+
+    lsp_parser = subparsers.add_parser(
+        "lsp", help="Run a language server for text configs on stdio"
+    )
+    lsp_parser.set_defaults(func=lsp_command)
+    lsp_parser.add_argument(
+        "--layout", type=str, default="default", help="Keyboard layout"
+    )
+
+    optimize_parser = subparsers.add_parser(
+        "optimize", help="Generate chords optimized for untethered recordings"
+    )
+    optimize_parser.set_defaults(func=optimize_command)
+    optimize_parser.add_argument("input", type=Path, nargs="+", help="Input files")
+    optimize_parser.add_argument(
+        "-o", "--output", type=Path, required=True, help="Output file"
+    )
+    optimize_parser.add_argument(
+        "--layout", type=str, default="default", help="Keyboard layout"
+    )
+    optimize_parser.add_argument(
+        "--input-format", choices=LOG_FORMAT_MAP.keys(), help="Input format"
+    )
+    optimize_parser.add_argument(
+        "--iterations", type=int, default=1_000_000, help="Annealing iterations"
+    )
+    optimize_parser.add_argument(
+        "--max-buttons", type=int, default=2, help="Maximum buttons per chord"
+    )
+    optimize_parser.add_argument("--seed", type=int, help="Random seed")
+
+    encode_parser = subparsers.add_parser(
+        "encode", help="Find the shortest chord sequence for some text"
+    )
+    encode_parser.set_defaults(func=encode_command)
+    encode_parser.add_argument("config", type=Path, help="Config file")
+    encode_parser.add_argument("text", type=Path, help="Text file, or - for stdin")
+    encode_parser.add_argument(
+        "--layout", type=str, default="default", help="Keyboard layout"
+    )
+    encode_parser.add_argument(
+        "--input-format", choices=FORMAT_MAP.keys(), help="Config format"
+    )
+    encode_parser.add_argument(
+        "--log", type=Path, help="Also write the keystrokes as a datalog"
     )
 
     args = parser.parse_args()
@@ -78,12 +329,26 @@ def main() -> None:
         parser.print_usage()
         sys.exit(0)
 
+    prof = None
+    if args.profile or args.profile_output:
+        profiling.enable()
+    if args.profile_output:
+        prof = cProfile.Profile()
+        prof.enable()
+
     try:
-        args.func(args)
+        with profiling.phase(f"command.{args.command}"):
+            args.func(args)
     except Exception as e:
         raise e
         print(f"Unhandled error: {args.func}, {e}", file=sys.stderr)
         sys.exit(1)
+    finally:
+        if prof is not None:
+            prof.disable()
+            prof.dump_stats(args.profile_output)
+        if profiling.enabled():
+            sys.stderr.write(profiling.summary())
 
 
 if __name__ == "__main__":
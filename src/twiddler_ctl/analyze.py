@@ -0,0 +1,74 @@
+import itertools
+from dataclasses import dataclass, field
+
+from .config.config7 import Config7
+from .models import Config
+
+
+@dataclass
+class Analysis:
+    # chord -> indices of every mapping bound to it, for chords bound more than once
+    duplicates: dict[int, list[int]] = field(default_factory=lambda: {})
+    # (dedicated offset, mapping index) for chords that are a lone dedicated key
+    dedicated: list[tuple[int, int]] = field(default_factory=lambda: [])
+    # (subset chord, superset chord) pairs that differ by only a few keys
+    subsets: list[tuple[int, int]] = field(default_factory=lambda: [])
+
+
+def chord_index(config: Config) -> dict[int, list[int]]:
+    index: dict[int, list[int]] = {}
+    for i, mapping in enumerate(config.mappings):
+        index.setdefault(Config7._chord_to_int(mapping.chord), []).append(i)
+    return index
+
+
+def dedicated_mask(config: Config) -> int:
+    # Dedicated offsets line up with chord bit positions
+    mask = 0
+    for i, val in enumerate(config.dedicated):
+        if val:
+            mask |= 1 << i
+    return mask
+
+
+def _set_bits(value: int) -> list[int]:
+    bits = []
+    while value:
+        low = value & -value
+        bits.append(low)
+        value ^= low
+    return bits
+
+
+def analyze_config(config: Config, max_distance: int = 1) -> Analysis:
+    """
+    Find duplicate chords, chords shadowed by dedicated keys and chords that are
+    within `max_distance` keys of another mapped chord
+    """
+
+    result = Analysis()
+    index = chord_index(config)
+
+    ded = dedicated_mask(config)
+    for chord, idxs in index.items():
+        if len(idxs) > 1:
+            result.duplicates[chord] = idxs
+
+        # A single bit set in both means the chord is exactly one dedicated key
+        if chord & (chord - 1) == 0 and chord & ded:
+            off = chord.bit_length() - 1
+            result.dedicated.extend((off, i) for i in idxs)
+
+    # Rather than comparing every pair of chords, enumerate each chord's subsets
+    # formed by dropping up to `max_distance` keys and probe the index for them.
+    # Chords rarely use more than a handful of keys, so this is close to linear.
+    subsets = result.subsets
+    for chord in index:
+        bits = _set_bits(chord)
+        for n in range(1, min(max_distance, len(bits) - 1) + 1):
+            for dropped in itertools.combinations(bits, n):
+                sub = chord ^ sum(dropped)
+                if sub in index:
+                    subsets.append((sub, chord))
+
+    return result
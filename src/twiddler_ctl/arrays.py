@@ -0,0 +1,179 @@
+"""
+Mapping tables of Config7 images as NumPy arrays, for analysis
+
+NumPy is an optional dependency and is only imported when these functions are
+called.
+"""
+
+import functools
+import io
+from pathlib import Path
+from typing import TYPE_CHECKING, Iterable
+
+from .config.config7 import Config7
+from .config.schema import VERSION_OFFSET
+from .config.text import DEDICATED_ORDER
+from .models import CommandType, Config
+
+if TYPE_CHECKING:
+    import numpy as np
+
+# Chords use the low 20 bits of their word; the readers ignore the rest
+CHORD_MASK = (1 << 20) - 1
+
+
+@functools.cache
+def _numpy():
+    try:
+        import numpy
+    except ImportError:
+        raise ImportError("NumPy is required for array export") from None
+    return numpy
+
+
+@functools.cache
+def command_dtype() -> "np.dtype":
+    """A command word exactly as stored on the device"""
+
+    return _numpy().dtype([("type", "u1"), ("a", "<u2"), ("b", "u1")])
+
+
+@functools.cache
+def _record_dtype() -> "np.dtype":
+    return _numpy().dtype([("chord", "<u4"), ("command", command_dtype())])
+
+
+@functools.cache
+def mapping_dtype() -> "np.dtype":
+    """
+    One row per mapping: the config it came from, the chord word and one
+    column per button (chord bit `i` is `DEDICATED_ORDER[i]`), the first
+    command, and where its commands sit in the flat command array
+    """
+
+    return _numpy().dtype(
+        [
+            ("config", "<u4"),
+            ("chord", "<u4"),
+            *((name, "?") for name in DEDICATED_ORDER),
+            ("list", "?"),
+            ("type", "u1"),
+            ("a", "<u2"),
+            ("b", "u1"),
+            ("length", "<u4"),
+            ("offset", "<u8"),
+        ]
+    )
+
+
+def image_table(image: bytes) -> tuple["np.ndarray", "np.ndarray"]:
+    """
+    Decode a Config7 image into a mapping array and a flat command array, where
+    mapping `i` has the commands at `offset[i]:offset[i] + length[i]`. The
+    mapping table and command lists are read with `np.frombuffer` rather than
+    row by row.
+    """
+
+    np = _numpy()
+
+    if len(image) <= VERSION_OFFSET:
+        raise ValueError("Unexpected end of file while reading header")
+    codec = Config7._codec(image[VERSION_OFFSET])
+    header_end = codec.header.size
+    if len(image) < header_end:
+        raise ValueError("Unexpected end of file while reading header")
+
+    count = codec.unpack(Config(), image)
+    region = header_end + count * codec.record.size
+    if len(image) < region:
+        raise ValueError("Unexpected end of file while reading mappings")
+
+    table = np.frombuffer(image, _record_dtype(), count, header_end)
+    commands = table["command"]
+
+    is_list = commands["type"] == CommandType.COMMAND_LIST
+    list_rows = np.flatnonzero(is_list)
+    starts = commands["a"][list_rows].astype(np.int64)
+    lengths = np.ones(count, np.int64)
+
+    # List offsets are in bytes. Lists sharing an alignment are looked up in
+    # one view of the region as words, with the end of each list found by
+    # searching for the NONE terminators that follow it.
+    groups = []
+    for align in np.unique(starts % 4):
+        sel = np.flatnonzero(starts % 4 == align)
+        size = max(0, (len(image) - region - align) // 4)
+        words = np.frombuffer(image, "<u4", size, region + align)
+        view = np.frombuffer(image, command_dtype(), size, region + align)
+
+        first = starts[sel] // 4
+        terminators = np.flatnonzero(words == 0)
+        pos = np.searchsorted(terminators, first)
+        if (pos == len(terminators)).any():
+            raise ValueError("Unexpected end of file while reading commands")
+
+        lengths[list_rows[sel]] = terminators[pos] - first
+        groups.append((list_rows[sel], first, view))
+
+    offsets = np.zeros(count, np.int64)
+    np.cumsum(lengths[:-1], out=offsets[1:])
+
+    flat = np.empty(int(lengths.sum()), command_dtype())
+    flat[offsets[~is_list]] = commands[~is_list]
+    for rows, first, view in groups:
+        sizes = lengths[rows]
+        within = np.arange(sizes.sum()) - np.repeat(np.cumsum(sizes) - sizes, sizes)
+        flat[np.repeat(offsets[rows], sizes) + within] = view[
+            np.repeat(first, sizes) + within
+        ]
+
+    if len(flat) and flat["type"].max() >= len(CommandType):
+        raise ValueError(f"Unknown command type: {flat['type'].max()}")
+
+    out = np.zeros(count, mapping_dtype())
+    chords = table["chord"] & CHORD_MASK
+    out["chord"] = chords
+    for bit, name in enumerate(DEDICATED_ORDER):
+        out[name] = (chords >> bit) & 1
+
+    nonempty = np.flatnonzero(lengths)
+    out["list"] = is_list
+    for name in ("type", "a", "b"):
+        out[name][nonempty] = flat[name][offsets[nonempty]]
+    out["length"] = lengths
+    out["offset"] = offsets
+
+    return out, flat
+
+
+def load_tables(
+    sources: Iterable[bytes | str | Path | Config],
+) -> tuple["np.ndarray", "np.ndarray"]:
+    """
+    Decode many configs into a single mapping array and command array, with the
+    `config` column holding each mapping's position in `sources`. Sources are
+    Config7 images, paths to them, or decoded configs.
+    """
+
+    np = _numpy()
+
+    mappings = [np.zeros(0, mapping_dtype())]
+    commands = [np.zeros(0, command_dtype())]
+    base = 0
+    for i, source in enumerate(sources):
+        if isinstance(source, Config):
+            buf = io.BytesIO()
+            Config7.write(source, buf, "default")
+            source = buf.getvalue()
+        elif not isinstance(source, bytes):
+            source = Path(source).read_bytes()
+
+        table, flat = image_table(source)
+        table["config"] = i
+        table["offset"] += base
+        base += len(flat)
+
+        mappings.append(table)
+        commands.append(flat)
+
+    return np.concatenate(mappings), np.concatenate(commands)
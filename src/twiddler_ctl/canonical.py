@@ -0,0 +1,151 @@
+import array
+import hashlib
+import io
+import itertools
+import struct
+import sys
+from typing import BinaryIO
+
+from .config.config7 import HEADER_LENGTH, MAPPING_LENGTH, NONE_COMMAND, Config7
+from .models import Command, CommandType, Config, Mapping
+
+# Header bytes that carry settings: version, flags and nav, idle time and repeat
+# delay, and the dedicated keys. Reserved bits of the nav byte are masked off.
+_HEADER_SPANS = ((4, 7), (10, 13), (0x40, 0x40 + 20))
+_NAV_OFFSET = 2
+_NAV_MASK = 0x3F
+
+# Chords use the low 20 bits of their word; the readers ignore the rest
+_CHORD_MASK = (1 << 20) - 1
+
+
+def canonical_commands(commands: list[Command]) -> list[Command]:
+    """
+    Commands as the device sees them. A command list ends at its first NONE, so
+    anything after it is dropped. Equal commands are interned to one object.
+    """
+
+    if len(commands) > 1:
+        commands = list(
+            itertools.takewhile(
+                lambda cmd: cmd.command_type != CommandType.NONE, commands
+            )
+        )
+    return [Config7._intern_command(cmd) for cmd in commands]
+
+
+def canonicalize(config: Config) -> Config:
+    """
+    Copy of a config in canonical form: mappings sorted by chord with later
+    duplicates of a chord winning, command lists normalized, and settings
+    coerced to the types the text and binary readers produce.
+    """
+
+    mappings: dict[int, list[Command]] = {}
+    for mapping in config.mappings:
+        mappings[Config7._chord_to_int(mapping.chord)] = canonical_commands(
+            mapping.commands
+        )
+
+    return Config(
+        version=config.version,
+        repeat=bool(config.repeat),
+        bluetooth=bool(config.bluetooth),
+        direct=bool(config.direct),
+        haptic=bool(config.haptic),
+        sticky_num=bool(config.sticky_num),
+        sticky_alt=bool(config.sticky_alt),
+        sticky_ctrl=bool(config.sticky_ctrl),
+        sticky_shift=bool(config.sticky_shift),
+        nav_up_direction=config.nav_up_direction & 0x3,
+        nav_invert_x=bool(config.nav_invert_x),
+        nav_sensitivity=config.nav_sensitivity & 0x7,
+        idle_time=config.idle_time,
+        repeat_delay=config.repeat_delay,
+        dedicated=[int(v) for v in config.dedicated],
+        mappings=[
+            Mapping(Config7._chord_from_int(chord), mappings[chord])
+            for chord in sorted(mappings)
+        ],
+    )
+
+
+def image_digest(fh: BinaryIO) -> str:
+    """
+    Digest of a Config7 image that only depends on what the device would do
+    with it. Mapping order, duplicate chords, command list layout and unused
+    header bytes do not affect the result, so two configs have the same digest
+    exactly when their canonical forms are equal.
+
+    Mappings are hashed straight from the wire encoding without decoding them.
+    """
+
+    header = fh.read(HEADER_LENGTH)
+    if len(header) < HEADER_LENGTH:
+        raise ValueError("Unexpected end of file while reading header")
+    if header[4] != 7:
+        raise ValueError(f"Unsupported version: {header[4]}, expected 7")
+
+    h = hashlib.sha256()
+    settings = bytearray()
+    for start, end in _HEADER_SPANS:
+        settings += header[start:end]
+    settings[_NAV_OFFSET] &= _NAV_MASK
+    h.update(settings)
+
+    mapping_count = struct.unpack_from("<H", header, 8)[0]
+    table = fh.read(mapping_count * MAPPING_LENGTH)
+    if len(table) < mapping_count * MAPPING_LENGTH:
+        raise ValueError("Unexpected end of file while reading mappings")
+
+    words = array.array("I")
+    words.frombytes(table)
+    if sys.byteorder != "little":
+        words.byteswap()
+
+    # Later duplicates of a chord win, matching the readers
+    chords = (word & _CHORD_MASK for word in words[0::2])
+    entries = dict(zip(chords, range(4, len(table), MAPPING_LENGTH)))
+
+    region = None
+    for chord in sorted(entries):
+        off = entries[chord]
+        word = table[off : off + 4]
+        h.update(struct.pack("<I", chord))
+
+        if word[0] != CommandType.COMMAND_LIST:
+            h.update(word)
+        else:
+            if region is None:
+                region = fh.read()
+            start = struct.unpack_from("<H", word, 1)[0]
+            end = start
+            while True:
+                chunk = region[end : end + 4]
+                if len(chunk) < 4:
+                    raise ValueError("Unexpected end of file while reading commands")
+                if chunk == NONE_COMMAND:
+                    break
+                end += 4
+
+            # Matches `canonical_commands`: a list ends at its first NONE
+            if end - start > 4:
+                for pos in range(start, end, 4):
+                    if region[pos] == CommandType.NONE:
+                        end = pos
+                        break
+            h.update(region[start:end])
+
+        # Terminates every mapping so single commands and lists hash alike
+        h.update(NONE_COMMAND)
+
+    return h.hexdigest()
+
+
+def config_digest(config: Config) -> str:
+    """Digest of a decoded config, equal to `image_digest` of its encoding"""
+
+    buf = io.BytesIO()
+    Config7.write(canonicalize(config), buf, "default")
+    buf.seek(0)
+    return image_digest(buf)
@@ -0,0 +1,78 @@
+import json
+import socket
+
+from .protocol import (
+    FRAME_HEADER,
+    ServerError,
+    decode_length,
+    encode_message,
+    socket_path,
+)
+
+# Generous enough for large conversions, but a wedged server must not hang the CLI
+TIMEOUT = 30
+
+
+def _recv_exact(sock: socket.socket, n: int) -> bytes:
+    buf = bytearray()
+    while len(buf) < n:
+        chunk = sock.recv(n - len(buf))
+        if not chunk:
+            raise ServerError("Connection closed by server")
+        buf += chunk
+    return bytes(buf)
+
+
+def _recv_frame(sock: socket.socket) -> bytes:
+    length = decode_length(_recv_exact(sock, FRAME_HEADER.size))
+    return _recv_exact(sock, length)
+
+
+def connect() -> socket.socket | None:
+    """Connect to a running server, if there is one"""
+
+    if not hasattr(socket, "AF_UNIX"):
+        return None
+
+    path = socket_path()
+    if not path.exists():
+        return None
+
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    sock.settimeout(TIMEOUT)
+    try:
+        sock.connect(str(path))
+    except OSError:
+        sock.close()
+        return None
+
+    return sock
+
+
+def exchange(
+    sock: socket.socket, header: dict, body: bytes = b""
+) -> tuple[dict, bytes]:
+    """Send a request over an open connection and wait for the response"""
+
+    with sock:
+        try:
+            sock.sendall(encode_message(header, body))
+            resp = json.loads(_recv_frame(sock))
+            data = _recv_frame(sock)
+        except TimeoutError:
+            raise ServerError("Timed out waiting for the server") from None
+
+    if not resp.get("ok"):
+        raise ServerError(resp.get("error", "Unknown error"))
+
+    return resp, data
+
+
+def request(header: dict, body: bytes = b"") -> tuple[dict, bytes] | None:
+    """Send a request to the server. Returns None if no server is running"""
+
+    sock = connect()
+    if sock is None:
+        return None
+
+    return exchange(sock, header, body)
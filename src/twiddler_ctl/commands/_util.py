@@ -1,27 +1,127 @@
+import configparser
 import io
+import struct
+import sys
 from pathlib import Path
 
 from ..config import Serdes
+from ..models import Config
 from ..config.text import Text
 from ..config.config7 import Config7
+from ..config.columnar import Columnar
 
 FORMAT_MAP: dict[str, tuple[bool, type[Serdes]]] = {
     "text": (False, Text),
     "binary": (True, Config7),
+    "json": (False, Columnar),
 }
 
+# What reading or writing a malformed config, or one using keys a layout lacks,
+# can raise
+CONFIG_ERRORS = (ValueError, KeyError, OSError, struct.error, configparser.Error)
+
+STDIO_PATH = Path("-")
+SNIFF_LENGTH = 5
+
+
+class _PrefixedStream(io.RawIOBase):
+    """Replays bytes consumed while sniffing before reading the rest of a stream"""
+
+    def __init__(self, prefix: bytes, stream: io.BufferedIOBase):
+        self._prefix = prefix
+        self._stream = stream
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, b) -> int:
+        if self._prefix:
+            n = min(len(b), len(self._prefix))
+            b[:n] = self._prefix[:n]
+            self._prefix = self._prefix[n:]
+            return n
+
+        data = self._stream.read1(len(b))
+        b[: len(data)] = data
+        return len(data)
+
+
+def is_stdio(path: Path) -> bool:
+    return path == STDIO_PATH
+
 
 def detect_format(path: Path) -> str:
     suf = path.suffix.lower()
     if suf == ".cfg":
         return "binary"
+    if suf == ".json":
+        return "json"
     return "text"
 
 
-def open_config(path: Path, fmt: str | None, mode: str) -> tuple[io.FileIO, Serdes]:
+def sniff_format(head: bytes) -> str:
+    # Config7 images carry their version number at offset 4
+    if len(head) >= SNIFF_LENGTH and head[4] == 7:
+        return "binary"
+    if head.lstrip().startswith(b"{"):
+        return "json"
+    return "text"
+
+
+def _open_stdio(fmt: str | None, mode: str) -> tuple[io.IOBase, Serdes]:
+    if "w" in mode:
+        if fmt is None:
+            raise ValueError("An output format is required when writing to stdout")
+
+        binary, cls = FORMAT_MAP[fmt]
+        return open(sys.stdout.fileno(), "wb" if binary else "w", closefd=False), cls
+
+    stream = open(sys.stdin.fileno(), "rb", closefd=False)
+    if fmt is None:
+        head = b""
+        while len(head) < SNIFF_LENGTH:
+            chunk = stream.read1(SNIFF_LENGTH - len(head))
+            if not chunk:
+                break
+            head += chunk
+
+        fmt = sniff_format(head)
+        stream = io.BufferedReader(_PrefixedStream(head, stream))
+
+    binary, cls = FORMAT_MAP[fmt]
+    if binary:
+        return stream, cls
+
+    return io.TextIOWrapper(stream, encoding="utf-8"), cls
+
+
+def open_config(path: Path, fmt: str | None, mode: str) -> tuple[io.IOBase, Serdes]:
+    if is_stdio(path):
+        return _open_stdio(fmt, mode)
+
     binary, cls = FORMAT_MAP[fmt or detect_format(path)]
 
     if binary:
         mode += "b"
 
     return open(path, mode), cls
+
+
+def load_config(path: Path, fmt: str | None, layout: str) -> Config:
+    fh, des = open_config(path, fmt, "r")
+    with fh:
+        return des.read(fh, layout)
+
+
+def read_input(path: Path) -> bytes:
+    if is_stdio(path):
+        return sys.stdin.buffer.read()
+    return path.read_bytes()
+
+
+def write_output(path: Path, data: bytes) -> None:
+    if is_stdio(path):
+        sys.stdout.buffer.write(data)
+        sys.stdout.buffer.flush()
+        return
+    path.write_bytes(data)
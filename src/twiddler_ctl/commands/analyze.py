@@ -0,0 +1,52 @@
+import sys
+import argparse
+
+from ..analyze import analyze_config
+from ..config.config7 import Config7
+from ..config.text import DEDICATED_CODES, DEDICATED_ORDER, Text
+from ..models import Config
+from ..util import normalize_str, layout_exists
+from ._util import load_config
+
+
+def _mapping_text(config: Config, idx: int, layout: str) -> str:
+    mapping = config.mappings[idx]
+    notation = Text._chord_to_text(mapping.chord)
+    cmds = " ".join(Text._command_to_display(cmd, layout) for cmd in mapping.commands)
+    return f"{notation} = {cmds}"
+
+
+def _chord_text(chord: int) -> str:
+    return Text._chord_to_text(Config7._chord_from_int(chord))
+
+
+def analyze_command(args: argparse.Namespace) -> None:
+    """Report conflicting and easily confused chords"""
+
+    layout = normalize_str(args.layout)
+
+    if not layout_exists(layout):
+        print(f"Layout not found: {args.layout}")
+        sys.exit(1)
+
+    config = load_config(args.input, args.input_format, layout)
+    result = analyze_config(config, args.max_distance)
+
+    for chord, idxs in sorted(result.duplicates.items()):
+        print(f"Duplicate chord {_chord_text(chord)}:")
+        for idx in idxs:
+            print(f"  {_mapping_text(config, idx, layout)}")
+
+    for off, idx in result.dedicated:
+        key = DEDICATED_ORDER[off].upper()
+        action = DEDICATED_CODES.get(config.dedicated[off], config.dedicated[off])
+        print(
+            f"Chord shadowed by dedicated key {key} ({action}): "
+            f"{_mapping_text(config, idx, layout)}"
+        )
+
+    for sub, chord in result.subsets:
+        print(f"Chord {_chord_text(sub)} is a subset of {_chord_text(chord)}")
+
+    if result.duplicates or result.dedicated:
+        sys.exit(1)
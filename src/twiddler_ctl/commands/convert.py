@@ -1,25 +1,163 @@
+import os
 import sys
 import argparse
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
 
+from .. import client
+from ..config.text import SymbolicConfig, Text
+from ..models import Config
+from ..protocol import ServerError
 from ..util import normalize_str, layout_exists
-from ._util import open_config
+from ._util import detect_format, is_stdio, open_config, read_input, write_output
+
+# Replaced by the layout name in output paths when converting for several layouts
+LAYOUT_PLACEHOLDER = "{layout}"
+
+# Parsed input shared by the fan-out workers, set once per process
+_shared_config: Config | SymbolicConfig | None = None
+
+
+def _init_worker(config: Config | SymbolicConfig) -> None:
+    global _shared_config
+    _shared_config = config
+
+
+def _write_layout(layout: str, output: Path, output_format: str) -> str | None:
+    config = _shared_config
+    if isinstance(config, SymbolicConfig):
+        try:
+            config = config.resolve(layout)
+        except ValueError as e:
+            return f"{layout}: {e}"
+
+    try:
+        fh, ser = open_config(output, output_format, "w")
+    except OSError as e:
+        return f"{layout}: {e}"
+
+    try:
+        with fh:
+            ser.write(config, fh, layout)
+    except (ValueError, OSError) as e:
+        output.unlink(missing_ok=True)
+        return f"{layout}: {e}"
+    except KeyError as e:
+        # Codes the layout has no name for
+        output.unlink(missing_ok=True)
+        return f"{layout}: Unknown code: {e}"
+    return None
+
+
+def _fan_out(
+    args: argparse.Namespace,
+    layouts: list[str],
+    input_format: str | None,
+    output_format: str | None,
+) -> None:
+    """Parse the input once, then write one output per layout in parallel"""
+
+    template = str(args.output)
+    if is_stdio(args.output) or LAYOUT_PLACEHOLDER not in template:
+        print(f"The output path must contain {LAYOUT_PLACEHOLDER} for several layouts")
+        sys.exit(1)
+
+    for layout in layouts:
+        if not layout_exists(layout):
+            print(f"Layout not found: {layout}")
+            sys.exit(1)
+
+    # Text configs are read without a layout so that keys stay symbolic; the
+    # other formats store key codes and do not depend on the layout
+    fh, des = open_config(args.input, input_format, "r")
+    try:
+        with fh:
+            if des is Text:
+                config = Text.read_symbolic(fh)
+            else:
+                config = des.read(fh, layouts[0])
+    except ValueError as e:
+        print(e)
+        sys.exit(1)
+
+    outputs = [Path(template.replace(LAYOUT_PLACEHOLDER, name)) for name in layouts]
+    jobs = min(len(layouts), os.cpu_count() or 1)
+    with ProcessPoolExecutor(
+        jobs, initializer=_init_worker, initargs=(config,)
+    ) as pool:
+        errors = pool.map(
+            _write_layout,
+            layouts,
+            outputs,
+            [output_format or detect_format(path) for path in outputs],
+        )
+
+        failed = False
+        for output, error in zip(outputs, errors):
+            if error is not None:
+                print(error)
+                failed = True
+            else:
+                print(f"Wrote config to {output}")
+
+    if failed:
+        sys.exit(1)
 
 
 def convert_command(args: argparse.Namespace) -> None:
     """Convert config files between formats"""
 
-    layout = normalize_str(args.layout)
+    names = args.layout or ["default"]
+    layouts = list(dict.fromkeys(normalize_str(name) for name in names))
+
+    # Input from stdin is sniffed when no format is given, output needs one
+    input_format = args.input_format
+    if input_format is None and not is_stdio(args.input):
+        input_format = detect_format(args.input)
+
+    if len(layouts) > 1 or LAYOUT_PLACEHOLDER in str(args.output):
+        _fan_out(args, layouts, input_format, args.output_format)
+        return
+    layout = layouts[0]
+
+    output_format = args.output_format
+    if output_format is None:
+        if is_stdio(args.output):
+            print("--output-format is required when writing to stdout")
+            sys.exit(1)
+        output_format = detect_format(args.output)
+
+    sock = client.connect()
+    if sock is not None:
+        header = {
+            "op": "convert",
+            "input_format": input_format,
+            "output_format": output_format,
+            "layout": layout,
+            "path": None if is_stdio(args.input) else str(args.input.resolve()),
+        }
+        try:
+            _, data = client.exchange(sock, header, read_input(args.input))
+        except ServerError as e:
+            print(e)
+            sys.exit(1)
+
+        write_output(args.output, data)
+        if not is_stdio(args.output):
+            print(f"Wrote config to {args.output}")
+        return
 
     if not layout_exists(layout):
-        print(f"Layout not found: {args.layout}")
+        print(f"Layout not found: {names[0]}")
         sys.exit(1)
 
-    fh, des = open_config(args.input, args.input_format, "r")
+    fh, des = open_config(args.input, input_format, "r")
     with fh:
         config = des.read(fh, layout)
 
-    fh, ser = open_config(args.output, args.output_format, "w")
+    fh, ser = open_config(args.output, output_format, "w")
     with fh:
-        ser.write(config, fh, args.layout)
+        ser.write(config, fh, layout)
 
-    print(f"Wrote config to {args.output}")
+    if not is_stdio(args.output):
+        print(f"Wrote config to {args.output}")
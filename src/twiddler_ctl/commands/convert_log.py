@@ -5,6 +5,7 @@ from pathlib import Path
 
 from ..util import normalize_str, layout_exists
 from ..log import Serdes
+from ..log.archive import Archive
 from ..log.binary import Binary
 from ..log.text import Text
 
@@ -12,13 +13,20 @@ from ..log.text import Text
 FORMAT_MAP: dict[str, tuple[bool, type[Serdes]]] = {
     "text": (False, Text),
     "binary": (True, Binary),
+    "archive": (True, Archive),
 }
 
+# Formats that store raw key codes. Converting between them skips the layout,
+# so codes the layout does not know survive the round trip.
+CODE_FORMATS = {"binary", "archive"}
+
 
 def detect_log_format(path: Path) -> str:
     suf = path.suffix.lower()
     if suf == ".log":
         return "binary"
+    if suf == ".lga":
+        return "archive"
     return "text"
 
 
@@ -40,6 +48,18 @@ def convert_log_command(args: argparse.Namespace) -> None:
         print(f"Layout not found: {layout}")
         sys.exit(1)
 
+    input_format = args.input_format or detect_log_format(args.input)
+    output_format = args.output_format or detect_log_format(args.output)
+    if input_format in CODE_FORMATS and output_format in CODE_FORMATS:
+        des, fh = open_log(args.input, input_format, "r")
+        with fh:
+            codes = des.read_codes(fh)
+
+        ser, fh = open_log(args.output, output_format, "w")
+        with fh:
+            ser.write_codes(codes, fh)
+        return
+
     des, fh = open_log(args.input, args.input_format, "r")
     with fh:
         text = des.read(fh, layout)
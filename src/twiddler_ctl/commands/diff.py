@@ -0,0 +1,71 @@
+import sys
+import argparse
+
+from ..config.config7 import Config7
+from ..config.text import DEDICATED_CODES, DEDICATED_ORDER, Text
+from ..diff import diff_configs
+from ..models import Mapping
+from ..util import normalize_str, layout_exists
+from ._util import load_config
+
+
+def _commands_text(mapping: Mapping, layout: str) -> str:
+    return " ".join(Text._command_to_display(cmd, layout) for cmd in mapping.commands)
+
+
+def _dedicated_text(val: int) -> str:
+    return DEDICATED_CODES.get(val, "none") if val else "none"
+
+
+def diff_command(args: argparse.Namespace) -> None:
+    """Show semantic differences between two configs"""
+
+    layout = normalize_str(args.layout)
+
+    if not layout_exists(layout):
+        print(f"Layout not found: {args.layout}")
+        sys.exit(1)
+
+    old = load_config(args.a, args.a_format, layout)
+    new = load_config(args.b, args.b_format, layout)
+    result = diff_configs(old, new)
+
+    for path, chords in (
+        (args.a, result.old_duplicates),
+        (args.b, result.new_duplicates),
+    ):
+        for chord in chords:
+            notation = Text._chord_to_text(Config7._chord_from_int(chord))
+            print(
+                f"{path}: {notation} is bound more than once, comparing the last one",
+                file=sys.stderr,
+            )
+
+    lines = []
+    for name, a, b in result.header:
+        lines.append(f"~ [config] {name}: {a} -> {b}")
+
+    for off, a, b in result.dedicated:
+        key = DEDICATED_ORDER[off].upper()
+        lines.append(
+            f"~ [dedicated] {key}: {_dedicated_text(a)} -> {_dedicated_text(b)}"
+        )
+
+    for mapping in result.removed:
+        notation = Text._chord_to_text(mapping.chord)
+        lines.append(f"- {notation} = {_commands_text(mapping, layout)}")
+
+    for mapping in result.added:
+        notation = Text._chord_to_text(mapping.chord)
+        lines.append(f"+ {notation} = {_commands_text(mapping, layout)}")
+
+    for a, b in result.changed:
+        notation = Text._chord_to_text(a.chord)
+        lines.append(
+            f"~ {notation} = {_commands_text(a, layout)} -> {_commands_text(b, layout)}"
+        )
+
+    if lines:
+        sys.stdout.write("\n".join(lines) + "\n")
+
+    sys.exit(1 if result else 0)
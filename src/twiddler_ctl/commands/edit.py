@@ -0,0 +1,38 @@
+import sys
+import argparse
+
+from ..config.editable import EditableConfig7
+from ..config.text import Text
+from ..util import normalize_str, layout_exists
+from ._util import read_input, write_output
+
+
+def edit_command(args: argparse.Namespace) -> None:
+    """Change mappings in a binary config, leaving everything else untouched"""
+
+    layout = normalize_str(args.layout)
+    if not layout_exists(layout):
+        print(f"Layout not found: {args.layout}")
+        sys.exit(1)
+
+    try:
+        cfg = EditableConfig7(read_input(args.input))
+
+        for item in args.set:
+            chord, sep, cmds = item.partition("=")
+            if not sep:
+                raise ValueError(f"Expected CHORD=COMMANDS: {item}")
+            cfg.set(
+                Text._chord_from_text(chord.strip()),
+                [Text._command_from_text(c, layout) for c in cmds.split()],
+            )
+
+        for chord in args.remove:
+            cfg.remove(Text._chord_from_text(chord))
+
+        data = cfg.to_bytes()
+    except ValueError as e:
+        print(e)
+        sys.exit(1)
+
+    write_output(args.output or args.input, data)
@@ -0,0 +1,40 @@
+import sys
+import argparse
+
+from ..config.config7 import Config7
+from ..config.text import Text
+from ..encode import ChordEncoder
+from ..log.binary import Binary
+from ..util import normalize_str, layout_exists
+from ._util import load_config, read_input
+
+
+def encode_command(args: argparse.Namespace) -> None:
+    """Find the shortest chord sequence to type some text"""
+
+    layout = normalize_str(args.layout)
+
+    if not layout_exists(layout):
+        print(f"Layout not found: {args.layout}")
+        sys.exit(1)
+
+    config = load_config(args.config, args.input_format, layout)
+    text = read_input(args.text).decode()
+    encoder = ChordEncoder(config, layout)
+
+    try:
+        chords = encoder.encode(text)
+    except ValueError as e:
+        print(e)
+        sys.exit(1)
+
+    if args.log:
+        with open(args.log, "wb") as fh:
+            Binary.write_codes(encoder.keystrokes(chords), fh)
+
+    lines = []
+    for chord, segment in chords:
+        notation = Text._chord_to_text(Config7._chord_from_int(chord))
+        lines.append(f"{notation} {segment!r}")
+    lines.append(f"{len(text)} characters in {len(chords)} chords")
+    sys.stdout.write("\n".join(lines) + "\n")
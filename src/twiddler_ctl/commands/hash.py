@@ -0,0 +1,32 @@
+import sys
+import argparse
+
+from ..canonical import config_digest, image_digest
+from ..config.config7 import Config7
+from ..util import normalize_str, layout_exists
+from ._util import open_config
+
+
+def hash_command(args: argparse.Namespace) -> None:
+    """Print a digest of each config that ignores formatting and ordering"""
+
+    layout = normalize_str(args.layout)
+
+    if not layout_exists(layout):
+        print(f"Layout not found: {args.layout}")
+        sys.exit(1)
+
+    for path in args.input:
+        try:
+            fh, des = open_config(path, args.input_format, "r")
+            with fh:
+                # Binary configs are hashed without decoding them
+                if des is Config7:
+                    digest = image_digest(fh)
+                else:
+                    digest = config_digest(des.read(fh, layout))
+        except ValueError as e:
+            print(f"{path}: {e}")
+            sys.exit(1)
+
+        print(f"{digest}  {path}")
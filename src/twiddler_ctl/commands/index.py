@@ -0,0 +1,67 @@
+import sys
+import argparse
+from pathlib import Path
+
+from ..config.config7 import Config7
+from ..config.text import Text
+from ..index import ConfigIndex, config_files
+from ..util import normalize_str, layout_exists
+from ._util import load_config
+
+
+def _load_index(args: argparse.Namespace) -> tuple[ConfigIndex, str]:
+    layout = normalize_str(args.layout)
+
+    if not layout_exists(layout):
+        print(f"Layout not found: {args.layout}")
+        sys.exit(1)
+
+    return ConfigIndex.load(args.index, layout), layout
+
+
+def index_build_command(args: argparse.Namespace) -> None:
+    """Index configs for fast lookup, only decoding files that changed"""
+
+    index, layout = _load_index(args)
+
+    def load(path: Path):
+        return load_config(path, None, layout)
+
+    # The index may live inside an indexed directory
+    files = [p for p in config_files(args.input) if p != args.index.resolve()]
+    updated, removed, failed = index.update(files, load)
+    for name, err in failed:
+        print(f"Skipping {name}: {err}", file=sys.stderr)
+
+    index.save(args.index)
+    print(
+        f"Indexed {len(index.files)} files "
+        f"({len(updated)} updated, {len(removed)} removed)"
+    )
+
+
+def index_query_command(args: argparse.Namespace) -> None:
+    """Find mappings by chord or command in an index"""
+
+    index, layout = _load_index(args)
+
+    if args.chord:
+        chord = Text._chord_value(args.chord)
+        if not chord:
+            print(f"Invalid chord: {args.chord}")
+            sys.exit(1)
+        results = index.query_chord(chord)
+    else:
+        try:
+            cmd = Text._command_from_text(args.command, layout)
+        except ValueError as e:
+            print(e)
+            sys.exit(1)
+        results = index.query_command(Text._command_to_text(cmd, layout))
+
+    for name, chord, cmds in results:
+        notation = Text._chord_to_text(Config7._chord_from_int(chord))
+        print(f"{name}: {notation} = {cmds}")
+
+    if not results:
+        sys.exit(1)
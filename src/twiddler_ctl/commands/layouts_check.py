@@ -0,0 +1,69 @@
+import csv
+import sys
+import argparse
+
+from ..config.text import Text
+from ..models import Config
+from ..reachability import Reach, check_layouts
+from ..util import normalize_str, layout_exists
+from ._util import load_config
+
+REACH_NAMES = {Reach.CHANGED: "changed", Reach.UNREACHABLE: "unreachable"}
+
+
+def _mapping_text(config: Config, idx: int, layout: str) -> str:
+    mapping = config.mappings[idx]
+
+    cmd_txts = []
+    for cmd in mapping.commands:
+        try:
+            cmd_txts.append(Text._command_to_text(cmd, layout))
+        except (KeyError, ValueError):
+            cmd_txts.append(f"{cmd.command_type.name.lower()}:{cmd.a:#x}")
+
+    return f"{Text._chord_to_text(mapping.chord)} = {' '.join(cmd_txts)}"
+
+
+def layouts_check_command(args: argparse.Namespace) -> None:
+    """Report mappings that type other keys or nothing under each layout"""
+
+    layout = normalize_str(args.layout)
+
+    if not layout_exists(layout):
+        print(f"Layout not found: {args.layout}")
+        sys.exit(1)
+
+    config = load_config(args.input, args.input_format, layout)
+    result = check_layouts(config, layout, jobs=args.jobs)
+
+    if result.unknown:
+        codes = ", ".join(f"{code:#04x}" for code in sorted(result.unknown))
+        print(f"Keys unknown to {args.layout}, not checked: {codes}", file=sys.stderr)
+
+    width = max(len(name) for name in result.layouts)
+    print(f"{'Layout':<{width}}  Changed  Unreachable")
+    for name in result.layouts:
+        row = result.matrix[name]
+        changed = sum(1 for status in row.values() if status == Reach.CHANGED)
+        unreachable = len(row) - changed
+        print(f"{name:<{width}}  {changed:>7}  {unreachable:>11}")
+
+        if args.details:
+            for idx, status in sorted(row.items()):
+                text = _mapping_text(config, idx, layout)
+                print(f"  {REACH_NAMES[status]}: {text}")
+
+    if args.output:
+        with open(args.output, "w", newline="") as fh:
+            writer = csv.writer(fh)
+            writer.writerow(["mapping", *result.layouts])
+            for idx in range(len(config.mappings)):
+                writer.writerow(
+                    [
+                        _mapping_text(config, idx, layout),
+                        *(
+                            REACH_NAMES.get(result.matrix[name].get(idx), "")
+                            for name in result.layouts
+                        ),
+                    ]
+                )
@@ -0,0 +1,17 @@
+import sys
+import argparse
+
+from ..lsp import serve_stdio
+from ..util import normalize_str, layout_exists
+
+
+def lsp_command(args: argparse.Namespace) -> None:
+    """Run a language server for text configs on stdio"""
+
+    layout = normalize_str(args.layout)
+
+    if not layout_exists(layout):
+        print(f"Layout not found: {args.layout}", file=sys.stderr)
+        sys.exit(1)
+
+    sys.exit(serve_stdio(layout))
@@ -0,0 +1,66 @@
+import sys
+import argparse
+import time
+from collections import Counter
+
+from ..config.text import Text
+from ..optimize import (
+    EffortModel,
+    candidate_chords,
+    config_from_assignment,
+    key_commands,
+    key_frequencies,
+    optimize_assignment,
+)
+from ..util import normalize_str, layout_exists
+from .convert_log import open_log
+
+
+def optimize_command(args: argparse.Namespace) -> None:
+    """Generate a chord set optimized for recorded typing"""
+
+    layout = normalize_str(args.layout)
+
+    if not layout_exists(layout):
+        print(f"Layout not found: {args.layout}")
+        sys.exit(1)
+
+    unigrams: Counter = Counter()
+    bigrams: Counter = Counter()
+    for path in args.input:
+        des, fh = open_log(path, args.input_format, "r")
+        with fh:
+            uni, bi = key_frequencies(des.read(fh, layout))
+        unigrams.update(uni)
+        bigrams.update(bi)
+
+    commands = key_commands(unigrams.keys(), layout)
+    unigrams = Counter({k: v for k, v in unigrams.items() if k in commands})
+    bigrams = Counter(
+        {k: v for k, v in bigrams.items() if k[0] in commands and k[1] in commands}
+    )
+
+    start = time.perf_counter()
+    try:
+        result = optimize_assignment(
+            unigrams,
+            bigrams,
+            candidate_chords(args.max_buttons),
+            EffortModel(),
+            args.iterations,
+            args.seed,
+        )
+    except ValueError as e:
+        print(e)
+        sys.exit(1)
+    elapsed = time.perf_counter() - start
+
+    with open(args.output, "w") as fh:
+        Text.write(config_from_assignment(result.assignment, commands), fh, layout)
+
+    rate = result.iterations / elapsed if elapsed else 0
+    print(
+        f"Cost {result.initial_cost:.0f} -> {result.cost:.0f} "
+        f"({result.iterations} iterations, {rate:.0f}/s)"
+    )
+    print(f"Wrote config to {args.output}")
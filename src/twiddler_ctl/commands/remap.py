@@ -0,0 +1,42 @@
+import sys
+import argparse
+
+from ..remap import build_translation, remap_image
+from ..util import normalize_str, layout_exists
+from ._util import read_input, write_output
+
+
+def remap_command(args: argparse.Namespace) -> None:
+    """Translate a binary config from one keyboard layout to another"""
+
+    src = normalize_str(args.src)
+    dst = normalize_str(args.dst)
+
+    for layout in (src, dst):
+        if not layout_exists(layout):
+            print(f"Layout not found: {layout}")
+            sys.exit(1)
+
+    table, missing = build_translation(src, dst)
+
+    try:
+        data, used = remap_image(read_input(args.input), table)
+    except ValueError as e:
+        print(e)
+        sys.exit(1)
+
+    # Only keys the config types matter. Left as they are, they would type
+    # something else under the target layout, so this is an error unless asked
+    missing = {code: name for code, name in missing.items() if code in used}
+    if missing:
+        names = ", ".join(sorted(missing.values()))
+        if not args.keep_missing:
+            print(
+                f"Keys missing from {args.dst}: {names}. "
+                "Use --keep-missing to leave them unchanged",
+                file=sys.stderr,
+            )
+            sys.exit(1)
+        print(f"Keys missing from {args.dst}, left unchanged: {names}", file=sys.stderr)
+
+    write_output(args.output, data)
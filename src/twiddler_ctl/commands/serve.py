@@ -0,0 +1,23 @@
+import argparse
+import asyncio
+import sys
+
+from ..protocol import socket_path
+from ..server import serve
+from ..util import normalize_str
+
+
+def serve_command(args: argparse.Namespace) -> None:
+    """Run a conversion server on a local Unix socket"""
+
+    path = args.socket or socket_path()
+    layouts = [normalize_str(layout) for layout in args.layout or ["default"]]
+
+    print(f"Listening on {path}")
+    try:
+        asyncio.run(serve(path, layouts))
+    except KeyboardInterrupt:
+        pass
+    except (RuntimeError, ValueError) as e:
+        print(e)
+        sys.exit(1)
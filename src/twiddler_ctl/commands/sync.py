@@ -5,6 +5,7 @@ import configparser
 import io
 from pathlib import Path
 
+from .. import profiling
 from ..config.config7 import Config7
 from ..util import normalize_str, layout_exists
 from ._util import detect_format, open_config
@@ -37,9 +38,11 @@ def sync_command(args: argparse.Namespace) -> None:
         target_path = os.path.join(path, f"{i}.cfg")
 
         curr = None
-        if os.path.exists(target_path):
-            with open(target_path, "rb") as fh:
-                curr = fh.read()
+        with profiling.phase("sync.device_read"):
+            if os.path.exists(target_path):
+                with open(target_path, "rb") as fh:
+                    curr = fh.read()
+                profiling.add_bytes("sync.device_read", read=len(curr))
 
         input_format = detect_format(Path(fn))
         if input_format == "binary":
@@ -56,6 +59,12 @@ def sync_command(args: argparse.Namespace) -> None:
         if new == curr:
             continue
 
+        if args.dry_run:
+            print(f"Would update {i}.cfg with {fn}")
+            continue
+
         print(f"Updating {i}.cfg with {fn}")
-        with open(target_path, "wb") as fh:
-            fh.write(new)
+        with profiling.phase("sync.device_write"):
+            with open(target_path, "wb") as fh:
+                fh.write(new)
+        profiling.add_bytes("sync.device_write", written=len(new))
@@ -0,0 +1,55 @@
+import io
+import sys
+import argparse
+
+from .. import client
+from ..config.config7 import Config7
+from ..models import Config
+from ..protocol import ServerError
+from ..util import normalize_str, layout_exists
+from ._util import CONFIG_ERRORS, detect_format, open_config
+
+
+def validate_config(config: Config, layout: str) -> None:
+    # Encoding catches values that parse but cannot be represented on the device
+    Config7.write(config, io.BytesIO(), layout)
+
+
+def validate_command(args: argparse.Namespace) -> None:
+    """Check that a config file can be loaded and encoded"""
+
+    layout = normalize_str(args.layout)
+    fmt = args.input_format or detect_format(args.input)
+
+    try:
+        resp = client.request(
+            {
+                "op": "validate",
+                "input_format": fmt,
+                "layout": layout,
+                "path": str(args.input.resolve()),
+            },
+            args.input.read_bytes(),
+        )
+    except ServerError as e:
+        print(f"Invalid config: {e}")
+        sys.exit(1)
+
+    if resp is not None:
+        print(f"Valid config: {resp[0]['mappings']} mappings")
+        return
+
+    if not layout_exists(layout):
+        print(f"Layout not found: {args.layout}")
+        sys.exit(1)
+
+    try:
+        fh, des = open_config(args.input, fmt, "r")
+        with fh:
+            config = des.read(fh, layout)
+        validate_config(config, layout)
+    except CONFIG_ERRORS as e:
+        print(f"Invalid config: {e}")
+        sys.exit(1)
+
+    print(f"Valid config: {len(config.mappings)} mappings")
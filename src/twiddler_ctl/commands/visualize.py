@@ -1,8 +1,19 @@
 import argparse
+import functools
+import io
+import itertools
 import shutil
+import struct
+import sys
+from typing import BinaryIO, Iterable, Iterator, TextIO
 
-from ..config.config7 import Config7
-from ._util import open_config
+from .. import client
+from ..config.config7 import HEADER_LENGTH, MAPPING_LENGTH, Config7
+from ..models import Config
+from ..protocol import ServerError
+from ..sheet import SHEET_WRITERS
+from ..util import normalize_str, layout_exists
+from ._util import detect_format, is_stdio, load_config, open_config
 
 
 KEY_BRAILLE_MAP = [
@@ -28,61 +39,160 @@ KEY_BRAILLE_MAP = [
     (0, 0x02),  # t0
 ]
 
+# Mappings read from a binary config at a time
+CHUNK_MAPPINGS = 4096
 
-def _generate_chart(offsets: list[str]) -> tuple[str, str]:
-    chart = [0x2800] * 6
 
-    for key in offsets:
-        idx, val = KEY_BRAILLE_MAP[key]
-        chart[idx] |= val
+def _segment_tables() -> list[list[int]]:
+    # Chords are rendered five bits at a time. Each entry holds the six braille
+    # cells contributed by one 5-bit segment, one byte per cell.
+    tables = []
+    for seg in range(0, len(KEY_BRAILLE_MAP), 5):
+        table = []
+        for bits in range(32):
+            cells = 0
+            for i in range(5):
+                if bits >> i & 1:
+                    idx, val = KEY_BRAILLE_MAP[seg + i]
+                    cells |= val << (8 * idx)
+            table.append(cells)
+        tables.append(table)
+    return tables
 
-    return (
-        "".join(map(chr, chart[:3])),
-        "".join(map(chr, chart[3:])),
-    )
 
+SEGMENT_TABLES = _segment_tables()
 
-def visualize_command(args: argparse.Namespace) -> None:
-    fh, des = open_config(args.input, None, "r")
-    with fh:
-        config = des.read(fh, "default")
+# Maps a cell byte (decoded as latin-1) to its braille character
+_BRAILLE = {i: 0x2800 + i for i in range(256)}
 
-    charts = []
 
-    for i, key in enumerate(config.dedicated):
-        if key == 0:
-            continue
+@functools.cache
+def chord_chart(chord: int) -> tuple[str, str]:
+    """Top and bottom rows of braille for a chord, memoized per chord"""
 
-        charts.append(_generate_chart([i]))
+    s0, s1, s2, s3 = SEGMENT_TABLES
+    cells = (
+        s0[chord & 0x1F]
+        | s1[chord >> 5 & 0x1F]
+        | s2[chord >> 10 & 0x1F]
+        | s3[chord >> 15 & 0x1F]
+    )
+    chart = cells.to_bytes(6, "little").decode("latin-1").translate(_BRAILLE)
+    return chart[:3], chart[3:]
+
+
+def config_chords(config: Config) -> Iterator[int]:
+    # Dedicated offsets line up with chord bit positions
+    for i, key in enumerate(config.dedicated):
+        if key:
+            yield 1 << i
 
     for mapping in config.mappings:
-        val = Config7._chord_to_int(mapping.chord)
+        yield Config7._chord_to_int(mapping.chord)
+
+
+def image_chords(fh: BinaryIO) -> Iterator[int]:
+    """Chords of a Config7 image, read incrementally without decoding commands"""
+
+    header = fh.read(HEADER_LENGTH)
+    if len(header) < HEADER_LENGTH:
+        raise ValueError("Unexpected end of file while reading header")
+    if header[4] != 7:
+        raise ValueError(f"Unsupported version: {header[4]}, expected 7")
+
+    for i, key in enumerate(header[0x40 : 0x40 + 20]):
+        if key:
+            yield 1 << i
+
+    remaining = struct.unpack_from("<H", header, 8)[0]
+    while remaining:
+        count = min(remaining, CHUNK_MAPPINGS)
+        chunk = fh.read(count * MAPPING_LENGTH)
+        if len(chunk) < count * MAPPING_LENGTH:
+            raise ValueError("Unexpected end of file while reading mappings")
+
+        for (chord,) in struct.iter_unpack("<I4x", chunk):
+            yield chord
+        remaining -= count
+
 
-        offsets = []
-        offset = 0
-        while val:
-            if val & 1:
-                offsets.append(offset)
-            val = val >> 1
-            offset += 1
+def write_charts(chords: Iterable[int], cols: int, out: TextIO) -> None:
+    """Lay out charts in rows that fit the width, then write them in one go"""
 
-        charts.append(_generate_chart(offsets))
+    per_row = max(cols // 4, 1)
+    buf = io.StringIO()
+
+    it = iter(chords)
+    while batch := [chord_chart(c) for c in itertools.islice(it, per_row)]:
+        top, bottom = zip(*batch)
+        buf.write("|".join(top))
+        buf.write("\n")
+        buf.write("|".join(bottom))
+        buf.write("\n")
+
+    out.write(buf.getvalue())
+    out.flush()
+
+
+def render_charts(config: Config, cols: int) -> str:
+    buf = io.StringIO()
+    write_charts(config_chords(config), cols, buf)
+    return buf.getvalue()
+
+
+def _write_sheet(args: argparse.Namespace, fmt: str) -> None:
+    layout = normalize_str(args.layout)
+    if not layout_exists(layout):
+        print(f"Layout not found: {args.layout}")
+        sys.exit(1)
+
+    config = load_config(args.input, fmt, layout)
+    write = SHEET_WRITERS[args.format]
+
+    # Written entry by entry so large sheets are never held in memory
+    if args.output is None or is_stdio(args.output):
+        write(config, layout, sys.stdout)
+        sys.stdout.flush()
+        return
+
+    with open(args.output, "w", encoding="utf-8") as fh:
+        write(config, layout, fh)
+
+
+def visualize_command(args: argparse.Namespace) -> None:
+    fmt = args.input_format or detect_format(args.input)
+    if args.format in SHEET_WRITERS:
+        _write_sheet(args, fmt)
+        return
 
     cols = shutil.get_terminal_size().columns
-    max_per_row = cols // 4
-
-    col_a = []
-    col_b = []
-    for a, b in charts:
-        if len(col_a) >= max_per_row:
-            print("|".join(col_a))
-            print("|".join(col_b))
-            col_a = []
-            col_b = []
-
-        col_a.append(a)
-        col_b.append(b)
-
-    if col_a:
-        print("|".join(col_a))
-        print("|".join(col_b))
+
+    try:
+        resp = client.request(
+            {
+                "op": "visualize",
+                "input_format": fmt,
+                "columns": cols,
+                "path": str(args.input.resolve()),
+            },
+            args.input.read_bytes(),
+        )
+    except ServerError as e:
+        print(e)
+        sys.exit(1)
+    if resp is not None:
+        sys.stdout.write(resp[1].decode())
+        return
+
+    fh, des = open_config(args.input, fmt, "r")
+    with fh:
+        if des is Config7:
+            chords = image_chords(fh)
+        else:
+            chords = config_chords(des.read(fh, "default"))
+
+        try:
+            write_charts(chords, cols, sys.stdout)
+        except ValueError as e:
+            print(e)
+            sys.exit(1)
@@ -0,0 +1,156 @@
+import itertools
+import json
+import struct
+from dataclasses import fields
+from typing import Iterator, TextIO
+
+from . import Serdes
+from .config7 import Config7
+from .schema import Schema
+from ..models import Command, CommandType, Config, Mapping
+
+SETTINGS: list[str] = [
+    f.name for f in fields(Config) if f.name not in ("version", "dedicated", "mappings")
+]
+
+
+def _setting_limits(schema: Schema) -> dict[str, tuple[type, int]]:
+    """Type and largest value of each setting, from where the image stores it"""
+
+    limits: dict[str, tuple[type, int]] = {}
+    for f in schema.fields:
+        if f.name in SETTINGS:
+            limits[f.name] = (int, (1 << 8 * struct.calcsize(f.fmt)) - 1)
+        for bits in f.bits:
+            limits[bits.name] = (
+                (bool, 1) if bits.width == 1 else (int, (1 << bits.width) - 1)
+            )
+    return limits
+
+
+class Columnar(Serdes):
+    """
+    JSON document with mappings stored column-wise: one array of chord ints,
+    and the commands of every mapping flattened into parallel type/a/b arrays.
+    The commands of mapping i are at offsets[i]:offsets[i + 1].
+    """
+
+    @staticmethod
+    def to_document(cfg: Config) -> dict:
+        chords = []
+        offsets = [0]
+        types = []
+        a = []
+        b = []
+
+        for mapping in cfg.mappings:
+            chords.append(Config7._chord_to_int(mapping.chord))
+            for cmd in mapping.commands:
+                types.append(int(cmd.command_type))
+                a.append(cmd.a)
+                b.append(cmd.b)
+            offsets.append(len(types))
+
+        return {
+            "version": cfg.version,
+            "settings": {name: getattr(cfg, name) for name in SETTINGS},
+            "dedicated": list(cfg.dedicated),
+            "chords": chords,
+            "offsets": offsets,
+            "types": types,
+            "a": a,
+            "b": b,
+        }
+
+    @staticmethod
+    def load(fh: TextIO) -> dict:
+        """The raw document, for tools that work on the columns directly"""
+
+        doc = json.load(fh)
+        columns = ("chords", "offsets", "types", "a", "b")
+        if not isinstance(doc, dict) or any(
+            not isinstance(doc.get(name), list) for name in columns
+        ):
+            raise ValueError("Not a columnar config document")
+
+        offsets = doc["offsets"]
+        if len(offsets) != len(doc["chords"]) + 1:
+            raise ValueError("Expected one more offset than chords")
+        if not len(doc["types"]) == len(doc["a"]) == len(doc["b"]):
+            raise ValueError("Command columns differ in length")
+        if (
+            any(type(offset) is not int for offset in offsets)
+            or offsets[0] != 0
+            or any(a > b for a, b in itertools.pairwise(offsets))
+        ):
+            raise ValueError("Offsets must start at 0 and never decrease")
+        if doc["offsets"] and doc["offsets"][-1] != len(doc["types"]):
+            raise ValueError("Offsets do not cover the command columns")
+
+        # Settings are checked against the binary layout they end up in
+        version = doc.get("version", 7)
+        if type(version) is not int:
+            raise ValueError(f"Unsupported version: {version!r}")
+        limits = _setting_limits(Config7._codec(version).schema)
+        settings = doc.get("settings", {})
+        if not isinstance(settings, dict):
+            raise ValueError("Settings must be an object")
+        for name, value in settings.items():
+            if name not in limits:
+                continue
+            kind, largest = limits[name]
+            if type(value) is not kind or not 0 <= value <= largest:
+                raise ValueError(f"Invalid value for {name}: {value!r}")
+
+        return doc
+
+    @staticmethod
+    def iter_mappings(doc: dict) -> Iterator[Mapping]:
+        """
+        Build mappings on demand from a loaded document. Every mapping is a new
+        object, but each distinct command is only constructed once.
+        """
+
+        # Commands are immutable and typically repeat, so each distinct
+        # (type, a, b) triple is looked up rather than constructed again
+        commands: dict[tuple[int, int, int], Command] = {}
+
+        def command(key: tuple[int, int, int]) -> Command:
+            cmd = commands.get(key)
+            if cmd is None:
+                cmd = Config7._intern_command(
+                    Command(CommandType(key[0]), key[1], key[2])
+                )
+                commands[key] = cmd
+            return cmd
+
+        types, a, b = doc["types"], doc["a"], doc["b"]
+        for chord, (start, end) in zip(
+            doc["chords"], itertools.pairwise(doc["offsets"])
+        ):
+            yield Mapping(
+                Config7._chord_from_int(chord),
+                [
+                    command(key)
+                    for key in zip(types[start:end], a[start:end], b[start:end])
+                ],
+            )
+
+    @staticmethod
+    def read(fh: TextIO, layout: str) -> Config:
+        doc = Columnar.load(fh)
+
+        cfg = Config(version=doc.get("version", 7))
+        settings = doc.get("settings", {})
+        for name in SETTINGS:
+            if name in settings:
+                setattr(cfg, name, settings[name])
+        if "dedicated" in doc:
+            cfg.dedicated = list(doc["dedicated"])
+
+        cfg.mappings = list(Columnar.iter_mappings(doc))
+        return cfg
+
+    @staticmethod
+    def write(cfg: Config, fh: TextIO, layout: str) -> None:
+        json.dump(Columnar.to_document(cfg), fh, separators=(",", ":"))
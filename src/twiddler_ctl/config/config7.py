@@ -2,17 +2,115 @@ from typing import BinaryIO
 from io import BytesIO
 from ..models import Config, Chord, Command, Mapping, CommandType
 from . import Serdes
+from .schema import (
+    MAPPING_COUNT,
+    VERSION_OFFSET,
+    Bits,
+    Codec,
+    Field,
+    Schema,
+    compile_schema,
+)
+from .. import profiling
+import itertools
+import operator
 import struct
 
-HEADER_LENGTH = 0x80
-MAPPING_LENGTH = 8
+CONFIG7_SCHEMA = Schema(
+    version=7,
+    header_length=0x80,
+    fields=(
+        Field(VERSION_OFFSET, "B", "version"),
+        Field(
+            5,
+            "B",
+            bits=(
+                Bits("repeat", 0),
+                Bits("bluetooth", 1),
+                Bits("direct", 2),
+                Bits("haptic", 3),
+                Bits("sticky_num", 4),
+                Bits("sticky_alt", 5),
+                Bits("sticky_ctrl", 6),
+                Bits("sticky_shift", 7),
+            ),
+        ),
+        Field(
+            6,
+            "B",
+            bits=(
+                Bits("nav_up_direction", 0, 2),
+                Bits("nav_invert_x", 2),
+                Bits("nav_sensitivity", 3, 3),
+            ),
+        ),
+        Field(8, "H", MAPPING_COUNT),
+        Field(10, "H", "idle_time"),
+        Field(12, "B", "repeat_delay"),
+        Field(0x40, "20s", "dedicated"),
+        Field(
+            0x60,
+            "32s",
+            const=(
+                b"\x00\x01\x02\x03\x04\x05\x06\x07"
+                b"\x08\x09\x0a\x0c\x0d\x0f\x11\x14"
+                b"\x16\x18\x1a\x1d\x80\x80\x80\x80"
+                b"\x80\x80\x80\x80\x80\x80\x80\x80"
+            ),
+        ),
+    ),
+)
+
+# Compiled codecs for every supported version, keyed by the version byte
+CODECS = {schema.version: compile_schema(schema) for schema in (CONFIG7_SCHEMA,)}
+
+HEADER_LENGTH = CONFIG7_SCHEMA.header_length
+MAPPING_LENGTH = CODECS[7].record.size
 NONE_COMMAND = b"\x00\x00\x00\x00"
 
+THUMB_SHIFTS = (0x13, 0x00, 0x04, 0x08, 0x0C)
+FINGER_SHIFTS = (
+    (0x10, 0x11, 0x12),
+    (0x01, 0x02, 0x03),
+    (0x05, 0x06, 0x07),
+    (0x09, 0x0A, 0x0B),
+    (0x0D, 0x0E, 0x0F),
+)
+
+
+def _bit_table(shifts: tuple[int, ...]) -> dict[tuple[bool, ...], int]:
+    return {
+        combo: sum(int(on) << shift for on, shift in zip(combo, shifts))
+        for combo in itertools.product((False, True), repeat=len(shifts))
+    }
+
+
+# Decoded commands keyed by their packed 4-byte word. Commands are immutable, so
+# identical words share a single object. The size cap only guards against
+# pathological inputs; real configs use a few hundred distinct commands.
+COMMAND_CACHE_SIZE = 1 << 16
+_COMMAND_CACHE: dict[bytes, Command] = {}
+
+# Precomputed chord bits for every thumb/finger row combination
+THUMB_TABLE = _bit_table(THUMB_SHIFTS)
+FINGER_TABLES = [_bit_table(shifts) for shifts in FINGER_SHIFTS]
+
 
 class Config7(Serdes):
+    @staticmethod
+    def _codec(version: int) -> Codec:
+        codec = CODECS.get(version)
+        if codec is None:
+            expected = ", ".join(str(v) for v in CODECS)
+            raise ValueError(f"Unsupported version: {version}, expected {expected}")
+        return codec
+
     @staticmethod
     def _chord_from_bytes(data: bytes) -> Chord:
-        value = struct.unpack("<I", data)[0]
+        return Config7._chord_from_int(struct.unpack("<I", data)[0])
+
+    @staticmethod
+    def _chord_from_int(value: int) -> Chord:
         return Chord(
             thumbs=(
                 bool(value & (1 << 0x13)),
@@ -52,34 +150,33 @@ class Config7(Serdes):
 
     @staticmethod
     def _chord_to_int(c: Chord) -> int:
-        value = 0
-
-        value |= int(c.thumbs[0]) << 0x13
-        value |= int(c.thumbs[1]) << 0x00
-        value |= int(c.thumbs[2]) << 0x04
-        value |= int(c.thumbs[3]) << 0x08
-        value |= int(c.thumbs[4]) << 0x0C
-
-        value |= int(c.fingers[0][0]) << 0x10
-        value |= int(c.fingers[0][1]) << 0x11
-        value |= int(c.fingers[0][2]) << 0x12
-
-        value |= int(c.fingers[1][0]) << 0x01
-        value |= int(c.fingers[1][1]) << 0x02
-        value |= int(c.fingers[1][2]) << 0x03
-
-        value |= int(c.fingers[2][0]) << 0x05
-        value |= int(c.fingers[2][1]) << 0x06
-        value |= int(c.fingers[2][2]) << 0x07
-
-        value |= int(c.fingers[3][0]) << 0x09
-        value |= int(c.fingers[3][1]) << 0x0A
-        value |= int(c.fingers[3][2]) << 0x0B
-
-        value |= int(c.fingers[4][0]) << 0x0D
-        value |= int(c.fingers[4][1]) << 0x0E
-        value |= int(c.fingers[4][2]) << 0x0F
-
+        f = c.fingers
+        r0, r1, r2, r3, r4 = FINGER_TABLES
+        if len(f) == len(FINGER_TABLES):
+            try:
+                return (
+                    THUMB_TABLE[c.thumbs]
+                    | r0[f[0]]
+                    | r1[f[1]]
+                    | r2[f[2]]
+                    | r3[f[3]]
+                    | r4[f[4]]
+                )
+            except (KeyError, TypeError):
+                pass
+
+        # Chords built by hand may use lists or non-bool values
+        thumbs = tuple(bool(v) for v in c.thumbs)
+        fingers = [tuple(bool(v) for v in row) for row in f]
+        if len(thumbs) != len(THUMB_SHIFTS) or len(fingers) != len(FINGER_SHIFTS):
+            raise ValueError(f"Malformed chord: {c}")
+
+        try:
+            value = THUMB_TABLE[thumbs]
+            for table, row in zip(FINGER_TABLES, fingers):
+                value |= table[row]
+        except KeyError:
+            raise ValueError(f"Malformed chord: {c}") from None
         return value
 
     @staticmethod
@@ -88,25 +185,40 @@ class Config7(Serdes):
 
     @staticmethod
     def _command_from_bytes(data: bytes) -> Command:
-        cmd_type, a, b = struct.unpack("<BHB", data)
-        return Command(CommandType(cmd_type), a, b)
+        cmd = _COMMAND_CACHE.get(data)
+        if cmd is None:
+            cmd_type, a, b = struct.unpack("<BHB", data)
+            cmd = Command(CommandType(cmd_type), a, b)
+            if len(_COMMAND_CACHE) < COMMAND_CACHE_SIZE:
+                _COMMAND_CACHE[bytes(data)] = cmd
+        return cmd
+
+    @staticmethod
+    def _intern_command(cmd: Command) -> Command:
+        try:
+            data = Config7._command_to_bytes(cmd)
+        except struct.error:
+            # Not representable on the device; left for the encoder to reject
+            return cmd
+        return Config7._command_from_bytes(data)
 
     @staticmethod
     def _command_to_bytes(cmd: Command) -> bytes:
         return struct.pack("<BHB", cmd.command_type, cmd.a, cmd.b)
 
     @staticmethod
-    def _command_list_from_stream(fh: BinaryIO) -> list[Command]:
+    def _command_list_from_bytes(data: bytes, off: int) -> list[Command]:
         commands: list[Command] = []
 
         while True:
-            chunk = fh.read(4)
+            chunk = data[off : off + 4]
             if len(chunk) < 4:
                 raise ValueError("Unexpected end of file while reading commands")
             if chunk == NONE_COMMAND:
                 break
 
             commands.append(Config7._command_from_bytes(chunk))
+            off += 4
 
         return commands
 
@@ -121,114 +233,83 @@ class Config7(Serdes):
         return out.getvalue()
 
     @staticmethod
+    @profiling.timed("config7.read")
     def read(fh: BinaryIO, layout: str) -> Config:
         cfg = Config()
 
-        header = fh.read(HEADER_LENGTH)
-        cfg.version = header[4]
-        if cfg.version != 7:
-            raise ValueError(f"Unsupported version: {cfg.version}, expected 7")
-
-        a = header[5]
-        cfg.repeat = bool(a & (1 << 0))
-        cfg.bluetooth = bool(a & (1 << 1))
-        cfg.direct = bool(a & (1 << 2))
-        cfg.haptic = bool(a & (1 << 3))
-        cfg.sticky_num = bool(a & (1 << 4))
-        cfg.sticky_alt = bool(a & (1 << 5))
-        cfg.sticky_ctrl = bool(a & (1 << 6))
-        cfg.sticky_shift = bool(a & (1 << 7))
-
-        b = header[6]
-        cfg.nav_up_direction = b & 0x3
-        cfg.nav_invert_x = bool(b & (1 << 2))
-        cfg.nav_sensitivity = (b >> 3) & 0x7
-
-        mapping_count, cfg.idle_time = struct.unpack("<2H", header[8:12])
-        cfg.repeat_delay = header[12]
-
-        cfg.dedicated = header[0x40 : 0x40 + 20]
+        # The version byte picks the layout of the rest of the file
+        header = fh.read(VERSION_OFFSET + 1)
+        if len(header) <= VERSION_OFFSET:
+            raise ValueError("Unexpected end of file while reading header")
+        codec = Config7._codec(header[VERSION_OFFSET])
+
+        header += fh.read(codec.header.size - len(header))
+        if len(header) < codec.header.size:
+            raise ValueError("Unexpected end of file while reading header")
+        mapping_count = codec.unpack(cfg, header)
         cfg.mappings = []
-        for _ in range(mapping_count):
-            chunk = fh.read(MAPPING_LENGTH)
-            if len(chunk) < MAPPING_LENGTH:
-                raise ValueError("Unexpected end of file while reading mappings")
 
-            chord = Config7._chord_from_bytes(chunk[:4])
-            command = Config7._command_from_bytes(chunk[4:])
+        # Read sequentially so that non-seekable streams (e.g. stdin) work. The
+        # command list region is only pulled in once a mapping references it.
+        table = fh.read(mapping_count * codec.record.size)
+        if len(table) < mapping_count * codec.record.size:
+            raise ValueError("Unexpected end of file while reading mappings")
+
+        region = None
+        for chord, word in codec.record.iter_unpack(table):
+            command = Config7._command_from_bytes(word)
 
             commands = [command]
             if command.command_type == CommandType.COMMAND_LIST:
-                pos = fh.tell()
-                fh.seek(HEADER_LENGTH + mapping_count * MAPPING_LENGTH + command.a)
-                commands = Config7._command_list_from_stream(fh)
-                fh.seek(pos)
+                if region is None:
+                    region = fh.read()
+                commands = Config7._command_list_from_bytes(region, command.a)
 
-            cfg.mappings.append(Mapping(chord, commands))
+            cfg.mappings.append(Mapping(Config7._chord_from_int(chord), commands))
 
+        profiling.add_bytes(
+            "config7.read", read=len(header) + len(table) + len(region or b"")
+        )
         return cfg
 
     @staticmethod
+    @profiling.timed("config7.write")
     def write(cfg: Config, fh: BinaryIO, layout: str) -> None:
-        header = bytearray(HEADER_LENGTH)
-        header[4] = cfg.version
-        header[5] = (
-            (int(cfg.repeat) << 0)
-            | (int(cfg.bluetooth) << 1)
-            | (int(cfg.direct) << 2)
-            | (int(cfg.haptic) << 3)
-            | (int(cfg.sticky_num) << 4)
-            | (int(cfg.sticky_alt) << 5)
-            | (int(cfg.sticky_ctrl) << 6)
-            | (int(cfg.sticky_shift) << 7)
-        )
-        header[6] = (
-            ((cfg.nav_up_direction & 0x3) << 0)
-            | (int(cfg.nav_invert_x) << 2)
-            | ((cfg.nav_sensitivity & 0x7) << 3)
-        )
+        codec = Config7._codec(cfg.version)
+        header = codec.pack(cfg, len(cfg.mappings))
 
-        header[8:12] = struct.pack("<2H", len(cfg.mappings), cfg.idle_time)
-        header[12] = cfg.repeat_delay
-
-        header[0x40 : 0x40 + 20] = cfg.dedicated
-        header[0x60:0x80] = (
-            b"\x00\x01\x02\x03\x04\x05\x06\x07"
-            b"\x08\x09\x0a\x0c\x0d\x0f\x11\x14"
-            b"\x16\x18\x1a\x1d\x80\x80\x80\x80"
-            b"\x80\x80\x80\x80\x80\x80\x80\x80"
-        )
-
-        fh.write(header)
-
-        base = HEADER_LENGTH + len(cfg.mappings) * MAPPING_LENGTH
-        off = 0
+        table = bytearray()
+        region = bytearray()
         commands_map: dict[bytes, int] = {}
 
-        mappings = sorted(cfg.mappings, key=lambda m: Config7._chord_to_int(m.chord))
-
-        for mapping in mappings:
-            fh.write(Config7._chord_to_bytes(mapping.chord))
-            if len(mapping.commands) == 1:
-                fh.write(Config7._command_to_bytes(mapping.commands[0]))
-                continue
+        mappings = sorted(
+            ((Config7._chord_to_int(m.chord), m.commands) for m in cfg.mappings),
+            key=operator.itemgetter(0),
+        )
 
-            buf = Config7._command_list_to_bytes(mapping.commands)
-            existing_off = commands_map.get(buf)
-            if existing_off is not None:
-                fh.write(
-                    Config7._command_to_bytes(
-                        Command(CommandType.COMMAND_LIST, existing_off, 0)
-                    )
+        for chord, commands in mappings:
+            if len(commands) == 1:
+                table += codec.record.pack(
+                    chord, Config7._command_to_bytes(commands[0])
                 )
                 continue
 
-            fh.write(
-                Config7._command_to_bytes(Command(CommandType.COMMAND_LIST, off, 0))
+            buf = Config7._command_list_to_bytes(commands)
+            off = commands_map.get(buf)
+            if off is None:
+                off = len(region)
+                region += buf
+                commands_map[buf] = off
+
+            table += codec.record.pack(
+                chord,
+                Config7._command_to_bytes(Command(CommandType.COMMAND_LIST, off, 0)),
             )
-            pos = fh.tell()
-            fh.seek(base + off)
-            fh.write(buf)
-            commands_map[buf] = off
-            off = fh.tell() - base
-            fh.seek(pos)
+
+        # Written strictly in order so the output does not need to be seekable
+        fh.write(header)
+        fh.write(table)
+        fh.write(region)
+        profiling.add_bytes(
+            "config7.write", written=len(header) + len(table) + len(region)
+        )
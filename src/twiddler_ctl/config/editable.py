@@ -0,0 +1,156 @@
+import array
+import bisect
+import operator
+import struct
+import sys
+from typing import BinaryIO
+
+from ..models import Chord, Command, CommandType
+from .config7 import HEADER_LENGTH, MAPPING_LENGTH, Config7
+
+
+def _chord_ints(table: bytes) -> array.array:
+    words = array.array("I")
+    words.frombytes(table)
+    if sys.byteorder != "little":
+        words.byteswap()
+    return words[0::2]
+
+
+class EditableConfig7:
+    """
+    A Config7 image that can be edited in place. Edits are recorded against
+    chords and spliced into the original image on save, so unchanged entries,
+    command lists and header bytes are preserved exactly.
+
+    Command lists that are no longer referenced are left in place rather than
+    compacted; rewriting with `Config7.write` produces a minimal image.
+    """
+
+    def __init__(self, image: bytes):
+        if len(image) < HEADER_LENGTH:
+            raise ValueError("Unexpected end of file while reading header")
+        if image[4] != 7:
+            raise ValueError(f"Unsupported version: {image[4]}, expected 7")
+
+        self._image = bytearray(image)
+        count = struct.unpack_from("<H", self._image, 8)[0]
+        table = self._image[HEADER_LENGTH : HEADER_LENGTH + count * MAPPING_LENGTH]
+        if len(table) < count * MAPPING_LENGTH:
+            raise ValueError("Unexpected end of file while reading mappings")
+
+        self._chords = _chord_ints(table)
+        if not all(map(operator.le, self._chords, self._chords[1:])):
+            raise ValueError("Mapping table is not sorted by chord")
+
+        self._pending: dict[int, list[Command] | None] = {}
+
+    @staticmethod
+    def read(fh: BinaryIO) -> "EditableConfig7":
+        return EditableConfig7(fh.read())
+
+    def __len__(self) -> int:
+        count = len(self._chords)
+        for chord, commands in self._pending.items():
+            exists = self._find(chord) is not None
+            if commands is None and exists:
+                count -= 1
+            elif commands is not None and not exists:
+                count += 1
+        return count
+
+    @property
+    def dirty(self) -> set[int]:
+        return set(self._pending)
+
+    def _region_base(self) -> int:
+        return HEADER_LENGTH + len(self._chords) * MAPPING_LENGTH
+
+    def _find(self, chord: int) -> int | None:
+        idx = bisect.bisect_left(self._chords, chord)
+        if idx < len(self._chords) and self._chords[idx] == chord:
+            return idx
+        return None
+
+    def get(self, chord: Chord) -> list[Command] | None:
+        key = Config7._chord_to_int(chord)
+        if key in self._pending:
+            return self._pending[key]
+
+        idx = self._find(key)
+        if idx is None:
+            return None
+
+        off = HEADER_LENGTH + idx * MAPPING_LENGTH + 4
+        command = Config7._command_from_bytes(bytes(self._image[off : off + 4]))
+        if command.command_type != CommandType.COMMAND_LIST:
+            return [command]
+
+        return Config7._command_list_from_bytes(
+            bytes(self._image[self._region_base() :]), command.a
+        )
+
+    def set(self, chord: Chord, commands: list[Command]) -> None:
+        self._pending[Config7._chord_to_int(chord)] = list(commands)
+
+    def remove(self, chord: Chord) -> None:
+        self._pending[Config7._chord_to_int(chord)] = None
+
+    def _command_word(self, commands: list[Command]) -> bytes:
+        if len(commands) == 1:
+            return Config7._command_to_bytes(commands[0])
+
+        base = self._region_base()
+        buf = Config7._command_list_to_bytes(commands)
+
+        # Reuse any aligned copy of the list, including the tail of a longer one
+        off = self._image.find(buf, base)
+        while off != -1 and (off - base) % 4:
+            off = self._image.find(buf, off + 1)
+
+        if off == -1:
+            # Trailing bytes that do not form a whole command are dropped
+            end = base + (len(self._image) - base) // 4 * 4
+            del self._image[end:]
+            off = len(self._image)
+            self._image += buf
+
+        if off - base > 0xFFFF:
+            raise ValueError("Command list region is full")
+
+        return Config7._command_to_bytes(
+            Command(CommandType.COMMAND_LIST, off - base, 0)
+        )
+
+    def _apply(self) -> None:
+        for chord, commands in sorted(self._pending.items()):
+            idx = self._find(chord)
+            if commands is None:
+                if idx is not None:
+                    off = HEADER_LENGTH + idx * MAPPING_LENGTH
+                    del self._image[off : off + MAPPING_LENGTH]
+                    del self._chords[idx]
+                continue
+
+            word = self._command_word(commands)
+            if idx is not None:
+                off = HEADER_LENGTH + idx * MAPPING_LENGTH + 4
+                self._image[off : off + 4] = word
+                continue
+
+            # Command list offsets are relative to the end of the mapping table,
+            # so inserting an entry does not invalidate them
+            idx = bisect.bisect_left(self._chords, chord)
+            off = HEADER_LENGTH + idx * MAPPING_LENGTH
+            self._image[off:off] = struct.pack("<I", chord) + word
+            self._chords.insert(idx, chord)
+
+        struct.pack_into("<H", self._image, 8, len(self._chords))
+        self._pending = {}
+
+    def to_bytes(self) -> bytes:
+        self._apply()
+        return bytes(self._image)
+
+    def write(self, fh: BinaryIO) -> None:
+        fh.write(self.to_bytes())
@@ -0,0 +1,169 @@
+"""
+Declarative layouts for binary config images.
+
+A `Schema` describes one firmware version: where each header field lives, how
+bitfields are packed into flag bytes, and the layout of a mapping record.
+`compile_schema` turns it into a `Codec` holding a single `struct.Struct` for
+the whole header and generated functions that move values between that struct
+and a `Config`, so a header is decoded with one `unpack_from` call instead of
+slicing and shifting field by field.
+"""
+
+import keyword
+import struct
+from dataclasses import dataclass
+from typing import Callable
+
+from ..models import Config
+
+# Offset of the version byte, which must be the same in every version so that
+# the schema can be picked before the rest of the header is known
+VERSION_OFFSET = 4
+
+# Pseudo attribute for the mapping count, which comes from the mapping table
+# rather than from a `Config` field
+MAPPING_COUNT = "mapping_count"
+
+
+@dataclass(frozen=True)
+class Bits:
+    """A `Config` attribute packed into part of an integer field"""
+
+    name: str
+    shift: int
+    width: int = 1  # single bits are booleans
+
+
+@dataclass(frozen=True)
+class Field:
+    """
+    A header field. `fmt` is a single struct format code such as `H` or `20s`.
+    A field maps to one `Config` attribute, to several bitfields, or to a
+    constant that is written as-is and ignored when reading.
+    """
+
+    offset: int
+    fmt: str
+    name: str | None = None
+    bits: tuple[Bits, ...] = ()
+    const: bytes | int | None = None
+
+
+@dataclass(frozen=True)
+class Schema:
+    version: int
+    header_length: int
+    fields: tuple[Field, ...]
+    # Chord bits followed by the raw command word
+    record: str = "<I4s"
+
+
+@dataclass(frozen=True)
+class Codec:
+    schema: Schema
+    header: struct.Struct
+    record: struct.Struct
+    # Stores the header fields on a config and returns the mapping count
+    unpack: Callable[[Config, bytes], int]
+    # Builds a header for a config with the given mapping count
+    pack: Callable[[Config, int], bytes]
+
+
+def _layout(schema: Schema) -> str:
+    """Struct format for the whole header, with padding between fields"""
+
+    fmt = "<"
+    pos = 0
+    for f in sorted(schema.fields, key=lambda f: f.offset):
+        if f.offset < pos:
+            raise ValueError(f"Overlapping header field at {f.offset:#x}")
+        if f.offset > pos:
+            fmt += f"{f.offset - pos}x"
+        fmt += f.fmt
+        pos = f.offset + struct.calcsize("<" + f.fmt)
+
+    if pos > schema.header_length:
+        raise ValueError("Header fields exceed the header length")
+    if pos < schema.header_length:
+        fmt += f"{schema.header_length - pos}x"
+    return fmt
+
+
+def _unpack_source(fields: list[Field]) -> str:
+    lines = ["def unpack(cfg, buf):"]
+    names = [f"v{i}" for i in range(len(fields))]
+    lines.append(f"    {', '.join(names)}, = header.unpack_from(buf)")
+
+    count = "0"
+    for name, f in zip(names, fields):
+        if f.const is not None:
+            continue
+        if f.name == MAPPING_COUNT:
+            count = name
+        elif f.name is not None:
+            lines.append(f"    cfg.{f.name} = {name}")
+        for b in f.bits:
+            value = f"{name} >> {b.shift} & {(1 << b.width) - 1}"
+            if b.width == 1:
+                value = f"bool({value})"
+            lines.append(f"    cfg.{b.name} = {value}")
+
+    lines.append(f"    return {count}")
+    return "\n".join(lines)
+
+
+def _pack_source(fields: list[Field]) -> str:
+    values = []
+    for i, f in enumerate(fields):
+        if f.const is not None:
+            values.append(f"const{i}")
+        elif f.name == MAPPING_COUNT:
+            values.append("count")
+        elif f.name is not None:
+            cast = "bytes" if f.fmt.endswith("s") else "int"
+            values.append(f"{cast}(cfg.{f.name})")
+        else:
+            values.append(
+                " | ".join(
+                    f"(int(cfg.{b.name}) & {(1 << b.width) - 1}) << {b.shift}"
+                    for b in f.bits
+                )
+                or "0"
+            )
+
+    return "def pack(cfg, count):\n    return header.pack(\n{}\n    )".format(
+        "".join(f"        {v},\n" for v in values)
+    )
+
+
+def compile_schema(schema: Schema) -> Codec:
+    for f in schema.fields:
+        for name in [f.name, *(b.name for b in f.bits)]:
+            if name is not None and (
+                not name.isidentifier() or keyword.iskeyword(name)
+            ):
+                raise ValueError(f"Invalid field name: {name!r}")
+        for b in f.bits:
+            if not isinstance(b.shift, int) or not isinstance(b.width, int):
+                raise ValueError(f"Invalid bitfield: {b.name!r}")
+
+    header = struct.Struct(_layout(schema))
+    fields = sorted(schema.fields, key=lambda f: f.offset)
+
+    namespace = {"header": header}
+    namespace.update(
+        (f"const{i}", f.const) for i, f in enumerate(fields) if f.const is not None
+    )
+    source = _unpack_source(fields) + "\n\n" + _pack_source(fields)
+    # The generated source only contains the attribute names checked above and
+    # integers from the schema, which is defined in code rather than loaded
+    # from anywhere. Constants are passed through the namespace.
+    exec(compile(source, f"<schema v{schema.version}>", "exec"), namespace)  # noqa: S102
+
+    return Codec(
+        schema=schema,
+        header=header,
+        record=struct.Struct(schema.record),
+        unpack=namespace["unpack"],
+        pack=namespace["pack"],
+    )
@@ -1,10 +1,16 @@
-from typing import TextIO
+from dataclasses import dataclass, field, replace
+from pathlib import Path
+from typing import Iterable, TextIO
 import configparser
+import functools
+import re
 
 
 from . import Serdes
+from .. import profiling
 from ..util import normalize_str, get_backward_mapping, get_forward_mapping
 from ..models import Config, Chord, Command, CommandType, Mapping
+from .config7 import FINGER_SHIFTS, THUMB_SHIFTS, Config7
 
 
 KEY_MACROS = {
@@ -75,6 +81,16 @@ DEDICATED_KEYS = {
 }
 DEDICATED_CODES: dict[int, str] = {v: k for k, v in DEDICATED_KEYS.items()}
 
+# Tokens of chord notation: a thumb block, a finger row (with or without its
+# 'F') followed by its columns, or a single character to skip
+CHORD_TOKEN_RE = re.compile(r"T([0-4]*)|(F?)([0-4])([LMR]*)|.", re.DOTALL)
+THUMB_BITS = {str(i): 1 << shift for i, shift in enumerate(THUMB_SHIFTS)}
+FINGER_BITS = {
+    (str(row), col): 1 << shifts[i]
+    for row, shifts in enumerate(FINGER_SHIFTS)
+    for i, col in enumerate("RML")
+}
+
 NAV_DIRECTIONS: dict[str, int] = {
     "north": 0,
     "east": 1,
@@ -130,20 +146,75 @@ MOUSE_COMMANDS: dict[str, int] = {
 MOUSE_CODES: dict[int, str] = {v: k for k, v in MOUSE_COMMANDS.items()}
 
 
-def _keycode_from_text(cmd_txt: str, layout: str) -> int:
-    mapping = get_backward_mapping(layout)
+@dataclass(frozen=True, slots=True)
+class KeyName:
+    """A keyboard command whose key has not been looked up in a layout yet"""
+
+    name: str
+    modifiers: int
+
+
+@dataclass
+class SymbolicConfig:
+    """
+    A text config read without a layout, see `Text.read_symbolic`. Its keyboard
+    commands are `KeyName`s until `resolve` looks them up in a layout, so it is
+    kept apart from `Config`, whose mappings only hold `Command`s.
+    """
+
+    # Settings and dedicated keys, without mappings
+    config: Config
+    mappings: list[tuple[Chord, list[Command | KeyName]]]
+
+    def resolve(self, layout: str) -> Config:
+        """Copy of the config with its keys looked up in `layout`"""
+
+        resolved: dict[KeyName, Command] = {}
 
+        def resolve_command(cmd: Command | KeyName) -> Command:
+            if not isinstance(cmd, KeyName):
+                return cmd
+
+            command = resolved.get(cmd)
+            if command is None:
+                code = _resolve_key(cmd, layout)
+                if code is None:
+                    raise ValueError(f"Invalid key: {cmd.name}")
+                command = Config7._intern_command(
+                    Command(CommandType.KEYBOARD, code, 0)
+                )
+                resolved[cmd] = command
+            return command
+
+        return replace(
+            self.config,
+            mappings=[
+                Mapping(chord, [resolve_command(cmd) for cmd in commands])
+                for chord, commands in self.mappings
+            ],
+        )
+
+
+def _key_from_text(cmd_txt: str) -> KeyName:
     mod = 0
     parts = cmd_txt.split("+")
     key = parts.pop()
     for part in parts:
         mod |= MODIFIER_KEYS.get(normalize_str(part), 0)
 
-    code = mapping.get(normalize_str(key))
+    return KeyName(normalize_str(key), mod)
+
+
+def _resolve_key(key: KeyName, layout: str) -> int | None:
+    code = get_backward_mapping(layout).get(key.name)
     if code is None:
         return None
 
-    return (code << 8) | mod
+    return (code << 8) | key.modifiers
+
+
+def _keycode_from_text(cmd_txt: str, layout: str) -> int:
+    return _resolve_key(_key_from_text(cmd_txt), layout)
 
 
 def _keycode_to_text(val: int, layout: str) -> str:
@@ -165,72 +236,62 @@ def _keycode_to_text(val: int, layout: str) -> str:
     return text
 
 
-class Text(Serdes):
-    COL_CODES = ["R", "M", "L"]
-    COL_OFFSETS = {v: k for k, v in enumerate(COL_CODES)}
+@dataclass
+class _Layer:
+    """The entries of a config file, or of a file merged with what it extends"""
 
-    @classmethod
-    def set_row(cls, fingers, thumbs, row: str, cols: str) -> None:
-        idx = int(row)
-        for col in cols:
-            idxx = cls.COL_OFFSETS.get(col)
+    settings: dict[str, str] = field(default_factory=lambda: {})
+    dedicated: dict[int, int] = field(default_factory=lambda: {})
+    # Every mapping of a chord, in file order. A layer replaces all of them.
+    mappings: dict[int, list[Mapping]] = field(default_factory=lambda: {})
 
-            if idx is None:
-                continue
+    def update(self, other: "_Layer") -> None:
+        self.settings.update(other.settings)
+        self.dedicated.update(other.dedicated)
+        self.mappings.update(other.mappings)
 
-            fingers[idx][idxx] = True
 
-    @staticmethod
-    def _chord_from_text(notation: str) -> Chord:
-        s = notation.strip().upper()
-        i = 0
-        n = len(s)
-        seen_first_finger = False
-        thumbs = [False, False, False, False, False]
-        fingers = [[False, False, False] for _ in range(5)]
+# Number of parsed files kept, so that many configs sharing a base only parse it
+# once
+LAYER_CACHE_SIZE = 256
 
-        while i < n:
-            ch = s[i]
-            # Thumb block: T followed by digits 0..4
-            if ch == "T":
-                i += 1
-                while i < n and s[i] in "01234":
-                    thumbs[int(s[i])] = True
-                    i += 1
-                continue
 
-            # First finger section must start with 'F'
-            if ch == "F" and not seen_first_finger:
-                i += 1
-                if i < n and s[i] in "01234":
-                    row = s[i]
-                    i += 1
-                    start = i
-                    while i < n and s[i] in "LMR":
-                        i += 1
-                    cols = s[start:i]
-                    Text.set_row(fingers, thumbs, row, cols)
-                    seen_first_finger = True
-                continue
+@functools.lru_cache(maxsize=LAYER_CACHE_SIZE)
+def _parse_layer(
+    data: bytes, layout: str | None, source: str
+) -> tuple[tuple[str, ...], _Layer]:
+    # Only a file's own entries are cached, keyed by its content. Bases are
+    # merged on every read, so an edit anywhere in an `extends` chain is seen
+    # by long-lived processes.
+    parser = configparser.ConfigParser()
+    parser.read_string(data.decode(), source=source)
+    return Text._own_layer(parser, layout)
 
-            # Subsequent finger sections: digit then L/M/R+
-            if seen_first_finger and ch in "01234":
-                row = ch
-                i += 1
-                start = i
-                while i < n and s[i] in "LMR":
-                    i += 1
-                cols = s[start:i]
-                Text.set_row(fingers, thumbs, row, cols)
-                continue
 
-            # Unknown token; skip one char
-            i += 1
+class Text(Serdes):
+    @staticmethod
+    def _chord_value(notation: str) -> int:
+        """Chord bits, as stored by Config7, of a notation like T1F2M3R"""
 
-        # Convert fingers to tuple of tuples
-        fingers_tuple = tuple(tuple(row) for row in fingers)
-        thumbs_tuple = tuple(thumbs)
-        return Chord(thumbs=thumbs_tuple, fingers=fingers_tuple)
+        value = 0
+        seen_first_finger = False
+        for thumbs, f, row, cols in CHORD_TOKEN_RE.findall(notation.strip().upper()):
+            # Thumb block: T followed by digits 0..4
+            if thumbs:
+                for digit in thumbs:
+                    value |= THUMB_BITS[digit]
+            # The first finger section must start with 'F', later ones may not.
+            # Anything else is skipped.
+            elif row and (f or seen_first_finger):
+                seen_first_finger = True
+                for col in cols:
+                    value |= FINGER_BITS[row, col]
+
+        return value
+
+    @staticmethod
+    def _chord_from_text(notation: str) -> Chord:
+        return Config7._chord_from_int(Text._chord_value(notation))
 
     @staticmethod
     def _chord_to_text(c: Chord) -> str:
@@ -262,7 +323,7 @@ class Text(Serdes):
         return "".join(parts) if parts else "_"
 
     @staticmethod
-    def _command_from_text(val: str, layout: str) -> Command:
+    def _command_from_text(val: str, layout: str | None) -> Command | KeyName:
         typ_, *rest = val.split(":", 1)
         if rest:
             val = rest[0]
@@ -279,7 +340,12 @@ class Text(Serdes):
             if val in KEY_MACROS:
                 val = KEY_MACROS[val]
 
-            code = _keycode_from_text(val, layout)
+            # Without a layout the key is kept by name, see `SymbolicConfig`
+            key = _key_from_text(val)
+            if layout is None:
+                return key
+
+            code = _resolve_key(key, layout)
             if code is None:
                 raise ValueError(f"Invalid key: {val}")
             command = Command(CommandType.KEYBOARD, code, 0)
@@ -300,68 +366,181 @@ class Text(Serdes):
         else:
             raise ValueError(f"Unknown command type: {typ_}")
 
-        return command
+        return Config7._intern_command(command)
 
     @staticmethod
-    def read(fh: TextIO, layout: str) -> Config:
-        parser = configparser.ConfigParser()
-        parser.read_file(fh)
-        cfg = Config()
+    def _read_settings(cfg: Config, section: configparser.SectionProxy) -> None:
+        cfg.repeat = section.getboolean("repeat", fallback=cfg.repeat)
+        cfg.bluetooth = section.getboolean("bluetooth", fallback=cfg.bluetooth)
+        cfg.direct = section.getboolean("direct", fallback=cfg.direct)
+        cfg.haptic = section.getboolean("haptic", fallback=cfg.haptic)
+        cfg.sticky_num = section.getboolean("sticky_num", fallback=cfg.sticky_num)
+        cfg.sticky_alt = section.getboolean("sticky_alt", fallback=cfg.sticky_alt)
+        cfg.sticky_ctrl = section.getboolean("sticky_ctrl", fallback=cfg.sticky_ctrl)
+        cfg.sticky_shift = section.getboolean("sticky_shift", fallback=cfg.sticky_shift)
+        cfg.nav_up_direction = NAV_DIRECTIONS.get(
+            normalize_str(section.get("nav_up_direction", "")), cfg.nav_up_direction
+        )
+        cfg.nav_invert_x = section.getboolean("nav_invert_x", fallback=cfg.nav_invert_x)
+        cfg.nav_sensitivity = section.getint(
+            "nav_sensitivity", fallback=cfg.nav_sensitivity
+        )
+
+        cfg.idle_time = section.getint("idle_time", fallback=cfg.idle_time)
+        cfg.repeat_delay = (
+            section.getint("repeat_delay", fallback=cfg.repeat_delay * 10) // 10
+        )
 
-        if "config" in parser:
-            section = parser["config"]
-
-            cfg.repeat = section.getboolean("repeat", fallback=cfg.repeat)
-            cfg.bluetooth = section.getboolean("bluetooth", fallback=cfg.bluetooth)
-            cfg.direct = section.getboolean("direct", fallback=cfg.direct)
-            cfg.haptic = section.getboolean("haptic", fallback=cfg.haptic)
-            cfg.sticky_num = section.getboolean("sticky_num", fallback=cfg.sticky_num)
-            cfg.sticky_alt = section.getboolean("sticky_alt", fallback=cfg.sticky_alt)
-            cfg.sticky_ctrl = section.getboolean(
-                "sticky_ctrl", fallback=cfg.sticky_ctrl
-            )
-            cfg.sticky_shift = section.getboolean(
-                "sticky_shift", fallback=cfg.sticky_shift
-            )
-            cfg.nav_up_direction = NAV_CODES.get(
-                section.get("nav_up_direction"), cfg.nav_up_direction
-            )
-            cfg.nav_invert_x = section.getboolean(
-                "nav_invert_x", fallback=cfg.nav_invert_x
-            )
-            cfg.nav_sensitivity = section.getint(
-                "nav_sensitivity", fallback=cfg.nav_sensitivity
-            )
-
-            cfg.idle_time = section.getint("idle_time", fallback=cfg.idle_time)
-            cfg.repeat_delay = (
-                section.getint("repeat_delay", fallback=cfg.repeat_delay * 10) // 10
-            )
+    @staticmethod
+    def _read_dedicated(items: Iterable[tuple[str, str]]) -> dict[int, int]:
+        dedicated: dict[int, int] = {}
 
-        if "dedicated" in parser:
-            for key, val in parser["dedicated"].items():
-                key = normalize_str(key)
-                if key not in DEDICATED_ORDER:
-                    raise ValueError(f"Unknown key: {key}")
+        for key, val in items:
+            key = normalize_str(key)
+            if key not in DEDICATED_ORDER:
+                raise ValueError(f"Unknown key: {key}")
+
+            val = normalize_str(val)
+            if val not in DEDICATED_KEYS:
+                raise ValueError(f"Unknown action: {val}")
+
+            dedicated[DEDICATED_OFFSETS[key]] = DEDICATED_KEYS[val]
+
+        return dedicated
+
+    @staticmethod
+    def _read_mappings(
+        items: Iterable[tuple[str, str]], layout: str | None
+    ) -> list[Mapping]:
+        mappings: list[Mapping] = []
+
+        for key, val in items:
+            chord = Text._chord_from_text(key)
+
+            cmds = []
+            for cmd_txt in val.split():
+                cmds.append(Text._command_from_text(cmd_txt, layout))
 
-                val = normalize_str(val)
-                if val not in DEDICATED_KEYS:
-                    raise ValueError(f"Unknown action: {val}")
+            mappings.append(Mapping(chord, cmds))
 
-                cfg.dedicated[DEDICATED_OFFSETS[key]] = DEDICATED_KEYS[val]
+        return mappings
+
+    @staticmethod
+    def _own_layer(
+        parser: configparser.ConfigParser, layout: str | None
+    ) -> tuple[tuple[str, ...], _Layer]:
+        """The files a config extends, and its own entries"""
 
+        own = _Layer()
+        if "config" in parser:
+            own.settings = {k: v for k, v in parser["config"].items() if k != "extends"}
+        if "dedicated" in parser:
+            own.dedicated = Text._read_dedicated(parser["dedicated"].items())
         if "mappings" in parser:
-            cfg.mappings = []
+            for m in Text._read_mappings(parser["mappings"].items(), layout):
+                own.mappings.setdefault(Config7._chord_to_int(m.chord), []).append(m)
+
+        return tuple(parser.get("config", "extends", fallback="").split()), own
+
+    @staticmethod
+    def _merge_layers(
+        extends: tuple[str, ...],
+        own: _Layer,
+        layout: str | None,
+        base_dir: Path,
+        stack: frozenset[Path],
+    ) -> _Layer:
+        layer = _Layer()
+
+        # Bases are applied in order, followed by this file's own entries
+        for base in extends:
+            layer.update(Text._load_layer(base_dir / base, layout, stack))
+        layer.update(own)
+
+        return layer
+
+    @staticmethod
+    def _load_layer(path: Path, layout: str | None, stack: frozenset[Path]) -> _Layer:
+        path = path.resolve()
+        if path in stack:
+            raise ValueError(f"Circular extends: {path}")
+
+        extends, own = _parse_layer(path.read_bytes(), layout, str(path))
+        return Text._merge_layers(extends, own, layout, path.parent, stack | {path})
+
+    @staticmethod
+    def extended_files(path: Path) -> list[Path]:
+        """Files a config extends, directly or through its bases"""
+
+        path = path.resolve()
+        found: list[Path] = []
+        pending = [path]
+        while pending:
+            current = pending.pop()
+            parser = configparser.ConfigParser()
+            try:
+                parser.read_string(current.read_text(), source=str(current))
+            except (OSError, ValueError, configparser.Error):
+                # Reported when the config itself is loaded
+                continue
+
+            for base in parser.get("config", "extends", fallback="").split():
+                base_path = (current.parent / base).resolve()
+                if base_path != path and base_path not in found:
+                    found.append(base_path)
+                    pending.append(base_path)
+
+        return found
 
-            for key, val in parser["mappings"].items():
-                chord = Text._chord_from_text(key)
+    @staticmethod
+    @profiling.timed("text.read")
+    def read(fh: TextIO, layout: str) -> Config:
+        return Text._read(fh, layout)
 
-                cmds = []
-                for cmd_txt in val.split():
-                    cmds.append(Text._command_from_text(cmd_txt, layout))
+    @staticmethod
+    @profiling.timed("text.read")
+    def read_symbolic(fh: TextIO) -> SymbolicConfig:
+        """
+        Read a config without a layout, keeping keys by name so that one read
+        can be resolved against any number of layouts
+        """
+
+        cfg = Text._read(fh, None)
+        mappings = [(m.chord, m.commands) for m in cfg.mappings]
+        cfg.mappings = []
+        return SymbolicConfig(cfg, mappings)
 
-                cfg.mappings.append(Mapping(chord, cmds))
+    @staticmethod
+    def _read(fh: TextIO, layout: str | None) -> Config:
+        # Without a layout, keyboard commands are KeyNames, see read_symbolic
+        data = fh.read()
+        profiling.add_bytes("text.read", read=len(data))
 
+        parser = configparser.ConfigParser()
+        parser.read_string(data, source=getattr(fh, "name", "<???>"))
+        cfg = Config()
+
+        # A config without `extends` is a single layer, so that duplicate chords
+        # and interpolation are handled the same way with or without bases
+        name = getattr(fh, "name", None)
+        base_dir = Path(name).parent if isinstance(name, str) else Path.cwd()
+        extends, own = Text._own_layer(parser, layout)
+        layer = Text._merge_layers(extends, own, layout, base_dir, frozenset())
+
+        # Values were interpolated within their own file when it was parsed
+        settings = configparser.ConfigParser(interpolation=None)
+        settings.read_dict({"config": layer.settings})
+        Text._read_settings(cfg, settings["config"])
+
+        for off, val in layer.dedicated.items():
+            cfg.dedicated[off] = val
+
+        # Layers may be cached and shared, so hand out fresh mappings
+        cfg.mappings = [
+            Mapping(m.chord, list(m.commands))
+            for mappings in layer.mappings.values()
+            for m in mappings
+        ]
         return cfg
 
     @staticmethod
@@ -387,6 +566,24 @@ class Text(Serdes):
         return cmd_txt
 
     @staticmethod
+    def _command_to_display(command: Command, layout: str) -> str:
+        """
+        Text form of a command for reports. Commands the text format can't
+        express, such as keys the layout has no name for in a binary config,
+        are shown by type and value instead.
+        """
+
+        if command.b == 0:
+            try:
+                return Text._command_to_text(command, layout)
+            except (KeyError, ValueError):
+                pass
+
+        raw = f"{command.command_type.name.lower()}:{command.a:#x}"
+        return f"{raw}/{command.b:#x}" if command.b else raw
+
+    @staticmethod
+    @profiling.timed("text.write")
     def write(cfg: Config, f: TextIO, layout: str) -> None:
         lines: list[str] = []
         lines.append("[config]")
@@ -425,4 +622,6 @@ class Text(Serdes):
 
             lines.append(f"{notation} = {' '.join(cmd_txts)}")
 
-        f.write("\n".join(lines))
+        out = "\n".join(lines)
+        f.write(out)
+        profiling.add_bytes("text.write", written=len(out))
@@ -0,0 +1,82 @@
+from dataclasses import dataclass, field, fields
+from typing import Any
+
+from .config.config7 import Config7
+from .models import Config, Mapping
+
+HEADER_FIELDS: list[str] = [
+    f.name for f in fields(Config) if f.name not in ("dedicated", "mappings")
+]
+
+
+@dataclass
+class ConfigDiff:
+    header: list[tuple[str, Any, Any]] = field(default_factory=lambda: [])
+    dedicated: list[tuple[int, int, int]] = field(default_factory=lambda: [])
+    added: list[Mapping] = field(default_factory=lambda: [])
+    removed: list[Mapping] = field(default_factory=lambda: [])
+    changed: list[tuple[Mapping, Mapping]] = field(default_factory=lambda: [])
+    # Chords bound more than once in either config. Only the last mapping of
+    # such a chord is compared, as it is the one that takes effect.
+    old_duplicates: list[int] = field(default_factory=lambda: [])
+    new_duplicates: list[int] = field(default_factory=lambda: [])
+
+    def __bool__(self) -> bool:
+        # Duplicates are not differences by themselves
+        return bool(
+            self.header or self.dedicated or self.added or self.removed or self.changed
+        )
+
+
+def index_mappings(mappings: list[Mapping]) -> tuple[dict[int, Mapping], list[int]]:
+    """
+    Index mappings by chord, with later duplicates of a chord winning. Also
+    returns the chords that have duplicates, sorted.
+    """
+
+    index: dict[int, Mapping] = {}
+    duplicates: set[int] = set()
+    for m in mappings:
+        chord = Config7._chord_to_int(m.chord)
+        if chord in index:
+            duplicates.add(chord)
+        index[chord] = m
+    return index, sorted(duplicates)
+
+
+def diff_configs(old: Config, new: Config) -> ConfigDiff:
+    result = ConfigDiff()
+
+    for name in HEADER_FIELDS:
+        a, b = getattr(old, name), getattr(new, name)
+        if a != b:
+            result.header.append((name, a, b))
+
+    for i, (a, b) in enumerate(zip(old.dedicated, new.dedicated)):
+        if a != b:
+            result.dedicated.append((i, a, b))
+
+    old_idx, result.old_duplicates = index_mappings(old.mappings)
+    new_idx, result.new_duplicates = index_mappings(new.mappings)
+
+    for key, mapping in old_idx.items():
+        other = new_idx.get(key)
+        if other is None:
+            result.removed.append(mapping)
+        elif mapping.commands != other.commands:
+            result.changed.append((mapping, other))
+
+    for key, mapping in new_idx.items():
+        if key not in old_idx:
+            result.added.append(mapping)
+
+    # Only the (usually small) set of differences is sorted, so output is stable
+    # regardless of the order mappings appear in either file
+    def chord_key(m: Mapping) -> int:
+        return Config7._chord_to_int(m.chord)
+
+    result.added.sort(key=chord_key)
+    result.removed.sort(key=chord_key)
+    result.changed.sort(key=lambda pair: chord_key(pair[0]))
+
+    return result
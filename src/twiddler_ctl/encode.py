@@ -0,0 +1,115 @@
+from .config.config7 import Config7
+from .config.text import _keycode_to_text
+from .log.binary import NAME_MAP
+from .models import Command, CommandType, Config
+
+CONTROL_CHARS: dict[str, str] = {
+    "enter": "\n",
+    "tab": "\t",
+}
+
+
+def _command_char(cmd: Command, layout: str) -> str | None:
+    if cmd.command_type != CommandType.KEYBOARD:
+        return None
+
+    try:
+        text = _keycode_to_text(cmd.a, layout)
+    except KeyError:
+        return None
+
+    char = CONTROL_CHARS.get(text) or NAME_MAP.get(text, text)
+    return char if len(char) == 1 else None
+
+
+def typed_text(commands: list[Command], layout: str) -> str | None:
+    """The text produced by a list of commands, if they only type characters"""
+
+    chars = []
+    for cmd in commands:
+        char = _command_char(cmd, layout)
+        if char is None:
+            return None
+        chars.append(char)
+    return "".join(chars)
+
+
+class ChordEncoder:
+    """
+    Finds the shortest chord sequence for typing text with a config. Mappings that
+    type one or more characters are stored in a trie keyed by their output, so the
+    encoder only walks as far as the longest macro from each position.
+    """
+
+    def __init__(self, config: Config, layout: str):
+        # Trie nodes are dicts of char -> child, with the chord and commands for
+        # the sequence ending at a node stored under the None key
+        self.trie: dict = {}
+        self.depth = 0
+
+        for mapping in config.mappings:
+            text = typed_text(mapping.commands, layout)
+            if not text:
+                continue
+
+            chord = Config7._chord_to_int(mapping.chord)
+            node = self.trie
+            for char in text:
+                node = node.setdefault(char, {})
+
+            # Prefer chords with fewer buttons when several type the same text
+            best = node.get(None)
+            if best is None or chord.bit_count() < best[0].bit_count():
+                node[None] = (chord, mapping.commands)
+            self.depth = max(self.depth, len(text))
+
+    def encode(self, text: str) -> list[tuple[int, str]]:
+        """Returns (chord, typed text) pairs, raising if text cannot be typed"""
+
+        n = len(text)
+        # best[i] is the fewest chords to type text[:i], back[i] the chord and
+        # start of the final segment on that path
+        best = [n + 1] * (n + 1)
+        back: list[tuple[int, int]] = [(0, 0)] * (n + 1)
+        best[0] = 0
+
+        for i in range(n):
+            if best[i] > n:
+                continue
+
+            cost = best[i] + 1
+            node = self.trie
+            for j in range(i, min(n, i + self.depth)):
+                node = node.get(text[j])
+                if node is None:
+                    break
+
+                leaf = node.get(None)
+                if leaf is not None and cost < best[j + 1]:
+                    best[j + 1] = cost
+                    back[j + 1] = (leaf[0], i)
+
+        if best[n] > n:
+            pos = max(i for i in range(n + 1) if best[i] <= n)
+            raise ValueError(f"Cannot type {text[pos]!r} at offset {pos}")
+
+        result = []
+        i = n
+        while i:
+            chord, start = back[i]
+            result.append((chord, text[start:i]))
+            i = start
+        result.reverse()
+
+        return result
+
+    def keystrokes(self, chords: list[tuple[int, str]]) -> list[int]:
+        """Key codes pressed by a chord sequence, as recorded in datalogs"""
+
+        codes = []
+        for _, segment in chords:
+            node = self.trie
+            for char in segment:
+                node = node[char]
+            codes.extend(cmd.a >> 8 for cmd in node[None][1])
+        return codes
@@ -0,0 +1,251 @@
+import hashlib
+import json
+import os
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Callable
+
+from .commands._util import CONFIG_ERRORS, detect_format
+from .config.config7 import Config7
+from .config.text import Text
+from .models import Config
+
+INDEX_VERSION = 2
+
+# Files picked up when indexing a directory
+CONFIG_SUFFIXES = (".cfg", ".txt", ".json")
+
+Posting = tuple[str, int]
+# mtime and size of a file, or None if it is missing
+Stamp = tuple[int, int] | None
+
+
+@dataclass
+class IndexedFile:
+    mtime_ns: int
+    size: int
+    digest: str
+    # (chord, normalized commands) for every mapping, in file order
+    mappings: list[tuple[int, str]] = field(default_factory=lambda: [])
+    # Stamps of the files a text config extends, which change its mappings too
+    bases: dict[str, Stamp] = field(default_factory=lambda: {})
+
+
+def _stamp(path: Path) -> Stamp:
+    try:
+        st = path.stat()
+    except OSError:
+        return None
+    return st.st_mtime_ns, st.st_size
+
+
+def _bases(path: Path) -> list[Path]:
+    return Text.extended_files(path) if detect_format(path) == "text" else []
+
+
+def _digest(path: Path, bases: list[Path]) -> str:
+    h = hashlib.sha256(path.read_bytes())
+    for base in bases:
+        try:
+            h.update(base.read_bytes())
+        except OSError:
+            pass
+    return h.hexdigest()
+
+
+def command_tokens(config: Config, layout: str) -> list[tuple[int, str]]:
+    """Mappings as chord ints and space separated normalized command text"""
+
+    return [
+        (
+            Config7._chord_to_int(m.chord),
+            " ".join(Text._command_to_text(cmd, layout) for cmd in m.commands),
+        )
+        for m in config.mappings
+    ]
+
+
+def config_files(paths: list[Path]) -> list[Path]:
+    files = []
+    for path in paths:
+        if path.is_dir():
+            files.extend(
+                p
+                for p in sorted(path.rglob("*"))
+                if p.suffix.lower() in CONFIG_SUFFIXES
+            )
+        else:
+            files.append(path)
+    return [p.resolve() for p in files]
+
+
+class ConfigIndex:
+    """
+    Inverted index from chords and command tokens to the mappings that use
+    them across many config files. Each file is keyed by its mtime, size and
+    content digest, and those of the files it extends, so rebuilding only
+    decodes files that actually changed.
+    """
+
+    def __init__(self, layout: str):
+        self.layout = layout
+        self.files: dict[str, IndexedFile] = {}
+        self.chords: dict[int, list[Posting]] = {}
+        self.tokens: dict[str, list[Posting]] = {}
+
+    @staticmethod
+    def load(path: Path, layout: str) -> "ConfigIndex":
+        """Load an index, or start an empty one if it is missing or stale"""
+
+        index = ConfigIndex(layout)
+        if not path.exists():
+            return index
+
+        with open(path, "r") as fh:
+            doc = json.load(fh)
+        if doc.get("version") != INDEX_VERSION or doc.get("layout") != layout:
+            return index
+
+        for name, entry in doc["files"].items():
+            index.files[name] = IndexedFile(
+                entry["mtime_ns"],
+                entry["size"],
+                entry["digest"],
+                [(chord, cmds) for chord, cmds in entry["mappings"]],
+                {
+                    base: tuple(stamp) if stamp else None
+                    for base, stamp in entry["bases"].items()
+                },
+            )
+        index.chords = {
+            int(chord): [(f, i) for f, i in postings]
+            for chord, postings in doc["chords"].items()
+        }
+        index.tokens = {
+            token: [(f, i) for f, i in postings]
+            for token, postings in doc["tokens"].items()
+        }
+        return index
+
+    def save(self, path: Path) -> None:
+        doc = {
+            "version": INDEX_VERSION,
+            "layout": self.layout,
+            "files": {
+                name: {
+                    "mtime_ns": entry.mtime_ns,
+                    "size": entry.size,
+                    "digest": entry.digest,
+                    "mappings": entry.mappings,
+                    "bases": entry.bases,
+                }
+                for name, entry in self.files.items()
+            },
+            "chords": {str(chord): postings for chord, postings in self.chords.items()},
+            "tokens": self.tokens,
+        }
+
+        # Replace atomically so an interrupted build never leaves a broken index
+        tmp = path.with_name(path.name + ".tmp")
+        with open(tmp, "w") as fh:
+            json.dump(doc, fh, separators=(",", ":"))
+        os.replace(tmp, path)
+
+    def _add_postings(self, name: str, entry: IndexedFile) -> None:
+        for i, (chord, cmds) in enumerate(entry.mappings):
+            self.chords.setdefault(chord, []).append((name, i))
+            for token in set(cmds.split()):
+                self.tokens.setdefault(token, []).append((name, i))
+
+    def remove(self, name: str) -> None:
+        entry = self.files.pop(name, None)
+        if entry is None:
+            return
+
+        # Only the keys this file contributed to need filtering
+        keys = [(self.chords, chord) for chord, _ in entry.mappings]
+        keys += [(self.tokens, t) for _, cmds in entry.mappings for t in cmds.split()]
+        for table, key in keys:
+            postings = table.get(key)
+            if postings is None:
+                continue
+            postings = [p for p in postings if p[0] != name]
+            if postings:
+                table[key] = postings
+            else:
+                del table[key]
+
+    def update(
+        self, files: list[Path], load: Callable[[Path], Config]
+    ) -> tuple[list[str], list[str], list[tuple[str, str]]]:
+        """
+        Bring the index up to date with the given files, dropping files that no
+        longer exist. Returns the names of re-indexed and removed files, and
+        files that could not be read or decoded along with the error.
+        """
+
+        updated = []
+        failed = []
+        for path in files:
+            name = str(path)
+            try:
+                st = path.stat()
+            except OSError as e:
+                # Missing, or gone since the directory was listed
+                self.remove(name)
+                failed.append((name, str(e)))
+                continue
+
+            entry = self.files.get(name)
+            if (
+                entry
+                and (entry.mtime_ns, entry.size) == (st.st_mtime_ns, st.st_size)
+                and all(_stamp(Path(b)) == s for b, s in entry.bases.items())
+            ):
+                continue
+
+            bases = _bases(path)
+            stamps = {str(base): _stamp(base) for base in bases}
+            try:
+                digest = _digest(path, bases)
+            except OSError as e:
+                self.remove(name)
+                failed.append((name, str(e)))
+                continue
+            if entry and entry.digest == digest:
+                entry.mtime_ns, entry.size = st.st_mtime_ns, st.st_size
+                entry.bases = stamps
+                continue
+
+            self.remove(name)
+            try:
+                mappings = command_tokens(load(path), self.layout)
+            except CONFIG_ERRORS as e:
+                failed.append((name, str(e)))
+                continue
+
+            new = IndexedFile(st.st_mtime_ns, st.st_size, digest, mappings, stamps)
+            self.files[name] = new
+            self._add_postings(name, new)
+            updated.append(name)
+
+        removed = [name for name in self.files if not Path(name).exists()]
+        for name in removed:
+            self.remove(name)
+
+        return updated, removed, failed
+
+    def lookup(self, postings: list[Posting]) -> list[tuple[str, int, str]]:
+        """(file, chord, commands) for each posting"""
+
+        result = []
+        for name, i in postings:
+            chord, cmds = self.files[name].mappings[i]
+            result.append((name, chord, cmds))
+        return result
+
+    def query_chord(self, chord: int) -> list[tuple[str, int, str]]:
+        return self.lookup(self.chords.get(chord, []))
+
+    def query_command(self, token: str) -> list[tuple[str, int, str]]:
+        return self.lookup(self.tokens.get(token, []))
@@ -0,0 +1,157 @@
+import io
+import struct
+from collections import Counter
+from typing import Any, Iterable
+
+from ..util import get_forward_mapping, get_backward_mapping
+from .. import profiling
+from . import Serdes
+from .binary import CHAR_MAP, NAME_MAP
+
+MAGIC = b"TWLA"
+VERSION = 1
+
+# magic, version, keystrokes per block, keystroke count, dictionary size
+HEADER = struct.Struct("<4sB3xIII")
+
+BLOCK_SIZE = 4096
+
+
+def _varint(n: int) -> bytes:
+    out = bytearray()
+    while n >= 0x80:
+        out.append(n & 0x7F | 0x80)
+        n >>= 7
+    out.append(n)
+    return bytes(out)
+
+
+def _decode_indices(data: bytes) -> bytes | list[int]:
+    # Dictionaries are ordered by frequency, so indices almost always fit in a
+    # single byte and the data can be used as-is
+    if data.isascii():
+        return data
+
+    indices = []
+    val = shift = 0
+    for byte in data:
+        val |= (byte & 0x7F) << shift
+        if byte & 0x80:
+            shift += 7
+            continue
+        indices.append(val)
+        val = shift = 0
+    return indices
+
+
+class Archive(Serdes):
+    """
+    Compact datalog archive. Key codes are replaced by their index in a
+    dictionary sorted by frequency and stored as varints, in blocks of a fixed
+    number of keystrokes. A block index allows decoding any range of keystrokes
+    without reading the blocks before it.
+
+    Layout: header, dictionary (u32 codes), block offsets (u32, one more than
+    there are blocks, relative to the start of the data), block data.
+    """
+
+    @staticmethod
+    def write_codes(
+        codes: Iterable[int], fh: Any, block_size: int = BLOCK_SIZE
+    ) -> None:
+        codes = list(codes)
+        dictionary = [code for code, _ in Counter(codes).most_common()]
+        encoded = {code: _varint(i) for i, code in enumerate(dictionary)}
+
+        offsets = [0]
+        blocks = []
+        for start in range(0, len(codes), block_size):
+            block = b"".join(
+                map(encoded.__getitem__, codes[start : start + block_size])
+            )
+            blocks.append(block)
+            offsets.append(offsets[-1] + len(block))
+
+        out = io.BytesIO()
+        out.write(HEADER.pack(MAGIC, VERSION, block_size, len(codes), len(dictionary)))
+        out.write(struct.pack(f"<{len(dictionary)}I", *dictionary))
+        out.write(struct.pack(f"<{len(offsets)}I", *offsets))
+        for block in blocks:
+            out.write(block)
+
+        data = out.getvalue()
+        fh.write(data)
+        profiling.add_bytes("log.archive.write", written=len(data))
+
+    @staticmethod
+    def _read_header(fh: Any) -> tuple[int, int, list[int], list[int]]:
+        raw = fh.read(HEADER.size)
+        if len(raw) < HEADER.size:
+            raise ValueError("Unexpected end of file while reading header")
+
+        magic, version, block_size, count, dict_size = HEADER.unpack(raw)
+        if magic != MAGIC:
+            raise ValueError("Not a datalog archive")
+        if version != VERSION:
+            raise ValueError(f"Unsupported archive version: {version}")
+
+        blocks = -(-count // block_size) if block_size else 0
+        raw = fh.read(4 * (dict_size + blocks + 1))
+        if len(raw) < 4 * (dict_size + blocks + 1):
+            raise ValueError("Unexpected end of file while reading index")
+
+        words = struct.unpack(f"<{dict_size + blocks + 1}I", raw)
+        return block_size, count, list(words[:dict_size]), list(words[dict_size:])
+
+    @staticmethod
+    def read_codes(fh: Any, start: int = 0, stop: int | None = None) -> list[int]:
+        """Key codes for keystrokes [start, stop), only decoding the blocks needed"""
+
+        block_size, count, dictionary, offsets = Archive._read_header(fh)
+        stop = count if stop is None else min(stop, count)
+        if start >= stop:
+            return []
+
+        first = start // block_size
+        last = (stop - 1) // block_size
+        if offsets[first]:
+            fh.seek(offsets[first], io.SEEK_CUR)
+
+        data = fh.read(offsets[last + 1] - offsets[first])
+        if len(data) < offsets[last + 1] - offsets[first]:
+            raise ValueError("Unexpected end of file while reading blocks")
+        profiling.add_bytes("log.archive.read", read=len(data))
+
+        skip = start - first * block_size
+        codes = list(map(dictionary.__getitem__, _decode_indices(data)))
+        return codes[skip : skip + stop - start]
+
+    @staticmethod
+    @profiling.timed("log.archive.write")
+    def write(text: str, fh: Any, layout: str) -> None:
+        mapping = get_backward_mapping(layout)
+
+        Archive.write_codes((mapping.get(CHAR_MAP.get(c, c)) for c in text), fh)
+
+    @staticmethod
+    @profiling.timed("log.archive.read")
+    def read(fh: Any, layout: str) -> str:
+        mapping = get_forward_mapping(layout)
+
+        _, count, dictionary, offsets = Archive._read_header(fh)
+        data = fh.read(offsets[-1])
+        if len(data) < offsets[-1]:
+            raise ValueError("Unexpected end of file while reading blocks")
+        profiling.add_bytes("log.archive.read", read=len(data))
+
+        # Blocks are contiguous, so the whole log decodes in one pass
+        indices = _decode_indices(data)
+        if len(indices) != count:
+            raise ValueError(f"Expected {count} keystrokes, found {len(indices)}")
+
+        names = []
+        for code in dictionary:
+            char = mapping.get(code, "_")
+            names.append(NAME_MAP.get(char, char))
+
+        return "".join(map(names.__getitem__, indices))
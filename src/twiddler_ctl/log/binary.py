@@ -1,10 +1,11 @@
 import io
 import struct
 
-from typing import Any
+from typing import Any, Iterable
 
 from ..util import get_forward_mapping, get_backward_mapping
 from . import Serdes
+from .. import profiling
 
 NAME_MAP = {
     "space": " ",
@@ -36,26 +37,39 @@ CHAR_MAP = {v:k for k, v in NAME_MAP.items()}
 
 class Binary(Serdes):
     @staticmethod
+    def read_codes(fh: Any) -> list[int]:
+        data = fh.read()
+        profiling.add_bytes("log.binary.read", read=len(data))
+
+        return [code for (code,) in struct.iter_unpack("<I", data)]
+
+    @staticmethod
+    def write_codes(codes: Iterable[int], fh: Any) -> None:
+        codes = list(codes)
+        data = struct.pack(f"<{len(codes)}I", *codes)
+        fh.write(data)
+        profiling.add_bytes("log.binary.write", written=len(data))
+
+    @staticmethod
+    @profiling.timed("log.binary.write")
     def write(text: str, fh: Any, layout: str) -> None:
         mapping = get_backward_mapping(layout)
 
-        for c in text:
-            val = mapping.get(CHAR_MAP.get(c, c))
-            fh.write(struct.pack("<I", val))
+        Binary.write_codes((mapping.get(CHAR_MAP.get(c, c)) for c in text), fh)
 
 
     @staticmethod
+    @profiling.timed("log.binary.read")
     def read(fh: Any, layout: str) -> str:
         buf = io.StringIO()
 
         mapping = get_forward_mapping(layout)
 
-        while True:
-            raw = fh.read(4)
-            if not raw:
-                break
+        data = fh.read()
+        profiling.add_bytes("log.binary.read", read=len(data))
 
-            char = mapping.get(struct.unpack("<I", raw)[0], "_")
+        for (code,) in struct.iter_unpack("<I", data):
+            char = mapping.get(code, "_")
             buf.write(NAME_MAP.get(char, char))
 
         return buf.getvalue()
@@ -0,0 +1,505 @@
+"""
+Language server for text configs
+
+Speaks the Language Server Protocol over stdio. Each open document is kept as a
+list of lines whose parse results are cached by line text, so an edit only
+re-parses the lines it touches. A chord index over the [mappings] section is
+updated alongside to report duplicate chords, and the lines with diagnostics
+are tracked as edits come in, so publishing costs in proportion to those lines
+rather than to the document.
+
+Character offsets are treated as code points, which matches UTF-16 offsets for
+the ASCII text configs are written in.
+"""
+
+import bisect
+import functools
+import json
+import re
+import struct
+import sys
+from dataclasses import dataclass
+from typing import BinaryIO
+
+from .config.config7 import Config7
+from .config.text import KEY_MACROS, MOUSE_COMMANDS, SYSTEM_COMMANDS, Text
+from .util import get_backward_mapping
+
+HEADER_RE = re.compile(r"\s*\[([^\]]*)\]")
+OPTION_RE = re.compile(r"([^=:\s][^=:]*?)\s*[=:]\s*")
+TOKEN_RE = re.compile(r"\S+")
+
+SEVERITY_ERROR = 1
+SEVERITY_WARNING = 2
+
+COMPLETION_KEYWORD = 14
+COMPLETION_LIMIT = 200
+
+# Other lines listed in a duplicate chord warning
+DUPLICATE_LINES = 5
+
+DIAGNOSTIC_JSON = (
+    '{"range":{"start":{"line":%d,"character":%d},"end":{"line":%d,"character":%d}},'
+    '"severity":%d,"source":"twiddler-ctl","message":%s}'
+)
+
+PARSE_ERROR = -32700
+METHOD_NOT_FOUND = -32601
+INTERNAL_ERROR = -32603
+
+MESSAGE_ERROR = 1
+
+MAPPINGS = "mappings"
+
+
+@dataclass(frozen=True, slots=True)
+class ParsedLine:
+    # Section name if the line is a header
+    header: str | None = None
+    # Chord int if the line is an option, only meaningful in [mappings]
+    chord: int | None = None
+    # (start, end, message) for problems, only reported in [mappings]
+    errors: tuple[tuple[int, int, str], ...] = ()
+
+
+@functools.lru_cache(maxsize=1 << 16)
+def check_command(token: str, layout: str) -> str | None:
+    """Error message for a command token, or None if it is valid"""
+
+    try:
+        cmd = Text._command_from_text(token, layout)
+        Config7._command_to_bytes(cmd)
+    except (ValueError, KeyError) as e:
+        return str(e)
+    except (struct.error, TypeError):
+        return f"Invalid command: {token}"
+    return None
+
+
+@functools.lru_cache(maxsize=1 << 16)
+def parse_line(text: str, layout: str) -> ParsedLine:
+    stripped = text.strip()
+    if not stripped or stripped[0] in "#;" or text[0].isspace():
+        # Blank, comment or continuation line
+        return ParsedLine()
+
+    m = HEADER_RE.match(text)
+    if m:
+        return ParsedLine(header=m.group(1).strip().lower())
+
+    m = OPTION_RE.match(text)
+    if m is None:
+        return ParsedLine(errors=((0, len(text), "Expected CHORD = COMMANDS"),))
+
+    errors = []
+    chord = Text._chord_value(m.group(1))
+    if not chord:
+        errors.append((m.start(1), m.end(1), f"Invalid chord: {m.group(1)}"))
+
+    tokens = list(TOKEN_RE.finditer(text, m.end()))
+    if not tokens:
+        errors.append((m.start(1), len(text), "Mapping has no commands"))
+    for tok in tokens:
+        err = check_command(tok.group(), layout)
+        if err is not None:
+            errors.append((tok.start(), tok.end(), err))
+
+    return ParsedLine(chord=chord or None, errors=tuple(errors))
+
+
+@dataclass(eq=False, slots=True)
+class Line:
+    text: str
+    parsed: ParsedLine
+    section: str | None = None
+    duplicate: bool = False
+    # Index in Document.lines, only kept up to date for flagged lines: it is
+    # current while `epoch` matches the document's
+    number: int = 0
+    epoch: int = 0
+    # Diagnostics as JSON, and what they were serialized for
+    serialized: str = ""
+    serialized_key: tuple = ()
+
+    @property
+    def mapping_chord(self) -> int | None:
+        return self.parsed.chord if self.section == MAPPINGS else None
+
+    @property
+    def has_diagnostics(self) -> bool:
+        return self.duplicate or bool(self.section == MAPPINGS and self.parsed.errors)
+
+
+class Document:
+    def __init__(self, text: str, layout: str):
+        self.layout = layout
+        self.lines = [self._line(t) for t in text.split("\n")]
+        self.chords: dict[int, list[Line]] = {}
+        # Lines with diagnostics, so publishing doesn't scan the document
+        self.flagged: set[Line] = set()
+        # Bumped whenever lines move, see Line.number
+        self.epoch = 0
+        self._assign_sections(0)
+
+    def _line(self, text: str) -> Line:
+        return Line(text, parse_line(text.rstrip("\r"), self.layout))
+
+    def _index(self, line: Line) -> None:
+        chord = line.mapping_chord
+        if chord is None:
+            return
+
+        lines = self.chords.setdefault(chord, [])
+        lines.append(line)
+        # Only the first duplicate changes the state of the existing line
+        if len(lines) == 2:
+            self._set_duplicate(lines[0], True)
+        if len(lines) > 1:
+            self._set_duplicate(line, True)
+
+    def _unindex(self, line: Line) -> None:
+        chord = line.mapping_chord
+        if chord is None:
+            return
+
+        lines = self.chords[chord]
+        lines.remove(line)
+        self._set_duplicate(line, False)
+        if len(lines) == 1:
+            self._set_duplicate(lines[0], False)
+        elif not lines:
+            del self.chords[chord]
+
+    def _set_duplicate(self, line: Line, duplicate: bool) -> None:
+        if line.duplicate != duplicate:
+            line.duplicate = duplicate
+            self._update_flag(line)
+
+    def _update_flag(self, line: Line) -> None:
+        if not line.has_diagnostics:
+            self.flagged.discard(line)
+        elif line not in self.flagged:
+            if line.epoch != self.epoch:
+                # Only when a line far from the edit becomes a duplicate
+                line.number = self.lines.index(line)
+                line.epoch = self.epoch
+            self.flagged.add(line)
+
+    def _assign_sections(self, start: int, stop: int | None = None) -> None:
+        """
+        Recompute sections and chord index entries from line `start` on, up to
+        the first header at or after line `stop`, as later sections can't
+        have changed
+        """
+
+        section = self.lines[start - 1].section if start else None
+        for i in range(start, len(self.lines)):
+            line = self.lines[i]
+            if line.parsed.header is not None:
+                if stop is not None and i >= stop:
+                    break
+                section = line.parsed.header
+            line.number, line.epoch = i, self.epoch
+            if line.section != section:
+                self._unindex(line)
+                line.section = section
+                self._index(line)
+            self._update_flag(line)
+
+    def apply_change(self, change: dict) -> None:
+        if "range" not in change:
+            self.lines = [self._line(t) for t in change["text"].split("\n")]
+            self.chords = {}
+            self.flagged = set()
+            self.epoch += 1
+            self._assign_sections(0)
+            return
+
+        start, end = change["range"]["start"], change["range"]["end"]
+        a, b = start["line"], min(end["line"], len(self.lines) - 1)
+
+        prefix = self.lines[a].text[: start["character"]]
+        suffix = self.lines[b].text[end["character"] :]
+        new = [self._line(t) for t in (prefix + change["text"] + suffix).split("\n")]
+
+        old = self.lines[a : b + 1]
+        for line in old:
+            self._unindex(line)
+            self.flagged.discard(line)
+        self.lines[a : b + 1] = new
+
+        shift = len(new) - len(old)
+        if shift:
+            self.epoch += 1
+            for line in self.flagged:
+                if line.number > b:
+                    line.number += shift
+                line.epoch = self.epoch
+
+        if any(line.parsed.header is not None for line in old + new):
+            # Sections of the following lines may have changed too
+            self._assign_sections(a, a + len(new))
+            return
+
+        section = self.lines[a - 1].section if a else None
+        for i, line in enumerate(new, a):
+            line.section = section
+            line.number, line.epoch = i, self.epoch
+            self._index(line)
+            self._update_flag(line)
+
+    def diagnostics(self) -> str:
+        """
+        Diagnostics as a JSON array. Each line's are serialized from a template
+        and kept until its number or duplicates change, since encoding them is
+        most of the cost of publishing.
+        """
+
+        flagged = sorted(self.flagged, key=lambda line: line.number)
+
+        # Duplicate lines are always flagged, so their line numbers are known
+        # here. Each group is collected once rather than per line.
+        groups: dict[int, list[int]] = {}
+        for line in flagged:
+            if line.duplicate:
+                groups.setdefault(line.parsed.chord, []).append(line.number)
+
+        result = []
+        for line in flagged:
+            if line.duplicate:
+                group = groups[line.parsed.chord]
+                key = (line.number, tuple(group[: DUPLICATE_LINES + 1]), len(group))
+            else:
+                key = (line.number, (), 0)
+            if line.serialized_key != key:
+                line.serialized = self._serialize(line, *key)
+                line.serialized_key = key
+            result.append(line.serialized)
+
+        return "[" + ",".join(result) + "]"
+
+    @staticmethod
+    def _serialize(line: Line, i: int, group: tuple[int, ...], count: int) -> str:
+        result = [
+            DIAGNOSTIC_JSON % (i, start, i, end, SEVERITY_ERROR, _json_string(message))
+            for start, end, message in line.parsed.errors
+        ]
+
+        if line.duplicate:
+            others = [n + 1 for n in group if n != i]
+            message = "Chord is also bound on line " + ", ".join(
+                str(n) for n in others[:DUPLICATE_LINES]
+            )
+            if count - 1 > DUPLICATE_LINES:
+                message += f" and {count - 1 - DUPLICATE_LINES} more"
+            result.append(
+                DIAGNOSTIC_JSON
+                % (i, 0, i, len(line.text), SEVERITY_WARNING, json.dumps(message))
+            )
+
+        return ",".join(result)
+
+
+_json_string = functools.lru_cache(maxsize=1 << 16)(json.dumps)
+
+
+class CompletionTable:
+    """Sorted command names, searched by prefix with bisection"""
+
+    def __init__(self, layout: str):
+        keys = set(get_backward_mapping(layout)) | set(KEY_MACROS)
+        groups = [
+            (("", "kb:", "keyboard:"), keys),
+            (("sys:", "system:"), SYSTEM_COMMANDS),
+            (("ms:", "mouse:"), MOUSE_COMMANDS),
+            (("con:", "application:"), get_backward_mapping("default", True)),
+        ]
+
+        # Every spelling of a command type gets its own entries, so completion
+        # is a plain prefix search whichever one is typed
+        self.names = sorted(
+            prefix + name
+            for prefixes, names in groups
+            for prefix in prefixes
+            for name in names
+        )
+
+    def complete(self, prefix: str) -> list[str]:
+        # Modifiers are joined with +, so only complete the last part
+        head, sep, tail = prefix.rpartition("+")
+
+        result = []
+        i = bisect.bisect_left(self.names, tail)
+        while i < len(self.names) and len(result) < COMPLETION_LIMIT:
+            name = self.names[i]
+            if not name.startswith(tail):
+                break
+            result.append(head + sep + name)
+            i += 1
+        return result
+
+
+class LanguageServer:
+    def __init__(self, layout: str, rfile: BinaryIO, wfile: BinaryIO):
+        self.layout = layout
+        self.rfile = rfile
+        self.wfile = wfile
+        self.documents: dict[str, Document] = {}
+        self.completions = CompletionTable(layout)
+        self.shutdown = False
+
+    def _read_message(self) -> dict | None:
+        length = None
+        while True:
+            line = self.rfile.readline()
+            if not line:
+                return None
+            line = line.strip()
+            if not line:
+                break
+            name, _, value = line.decode("ascii").partition(":")
+            if name.lower() == "content-length":
+                length = int(value)
+
+        if length is None:
+            raise ValueError("Message without Content-Length")
+        return json.loads(self.rfile.read(length))
+
+    def _send(self, msg: dict) -> None:
+        self._send_body(json.dumps(msg, separators=(",", ":")).encode())
+
+    def _send_body(self, body: bytes) -> None:
+        self.wfile.write(f"Content-Length: {len(body)}\r\n\r\n".encode() + body)
+        self.wfile.flush()
+
+    def _send_error(self, msg_id: int | str | None, code: int, message: str) -> None:
+        self._send(
+            {
+                "jsonrpc": "2.0",
+                "id": msg_id,
+                "error": {"code": code, "message": message},
+            }
+        )
+
+    def _publish(self, uri: str) -> None:
+        doc = self.documents.get(uri)
+        self._send_body(
+            (
+                '{"jsonrpc":"2.0","method":"textDocument/publishDiagnostics",'
+                f'"params":{{"uri":{json.dumps(uri)},'
+                f'"diagnostics":{doc.diagnostics() if doc else "[]"}}}}}'
+            ).encode()
+        )
+
+    def initialize(self, params: dict) -> dict:
+        return {
+            "capabilities": {
+                # Incremental sync
+                "textDocumentSync": {"openClose": True, "change": 2},
+                "completionProvider": {"triggerCharacters": [":", "+"]},
+            },
+            "serverInfo": {"name": "twiddler-ctl"},
+        }
+
+    def did_open(self, params: dict) -> None:
+        doc = params["textDocument"]
+        self.documents[doc["uri"]] = Document(doc["text"], self.layout)
+        self._publish(doc["uri"])
+
+    def did_change(self, params: dict) -> None:
+        uri = params["textDocument"]["uri"]
+        doc = self.documents.get(uri)
+        if doc is None:
+            return
+
+        for change in params["contentChanges"]:
+            doc.apply_change(change)
+        self._publish(uri)
+
+    def did_close(self, params: dict) -> None:
+        uri = params["textDocument"]["uri"]
+        self.documents.pop(uri, None)
+        self._publish(uri)
+
+    def completion(self, params: dict) -> list[dict]:
+        doc = self.documents.get(params["textDocument"]["uri"])
+        pos = params["position"]
+        if doc is None or pos["line"] >= len(doc.lines):
+            return []
+
+        line = doc.lines[pos["line"]]
+        text = line.text[: pos["character"]]
+        m = OPTION_RE.match(text)
+        if line.section != MAPPINGS or m is None:
+            return []
+
+        # Only the command being typed, not the chord or earlier commands
+        prefix = text[m.end() :].rpartition(" ")[2]
+        return [
+            {"label": name, "kind": COMPLETION_KEYWORD}
+            for name in self.completions.complete(prefix)
+        ]
+
+    def serve(self) -> int:
+        requests = {
+            "initialize": self.initialize,
+            "textDocument/completion": self.completion,
+            "shutdown": lambda params: setattr(self, "shutdown", True),
+        }
+        notifications = {
+            "textDocument/didOpen": self.did_open,
+            "textDocument/didChange": self.did_change,
+            "textDocument/didClose": self.did_close,
+        }
+
+        while True:
+            try:
+                msg = self._read_message()
+            except ValueError as e:
+                self._send_error(None, PARSE_ERROR, str(e))
+                continue
+            if msg is None or msg.get("method") == "exit":
+                return 0 if self.shutdown else 1
+
+            method = msg.get("method")
+            params = msg.get("params") or {}
+            if "id" not in msg:
+                handler = notifications.get(method)
+                if handler is None:
+                    continue
+                # Broad on purpose: whatever a malformed notification breaks,
+                # the editor keeps its server. There is no reply to carry the
+                # error, so it goes to the client's log.
+                try:
+                    handler(params)
+                except Exception as e:  # noqa: BLE001
+                    self._send(
+                        {
+                            "jsonrpc": "2.0",
+                            "method": "window/logMessage",
+                            "params": {
+                                "type": MESSAGE_ERROR,
+                                "message": f"{method} failed: {e!r}",
+                            },
+                        }
+                    )
+                continue
+
+            handler = requests.get(method)
+            if handler is None:
+                self._send_error(
+                    msg["id"], METHOD_NOT_FOUND, f"Unsupported method: {method}"
+                )
+                continue
+
+            # As above, but the error is returned in the response
+            try:
+                result = handler(params)
+            except Exception as e:  # noqa: BLE001
+                self._send_error(msg["id"], INTERNAL_ERROR, f"{method} failed: {e!r}")
+                continue
+            self._send({"jsonrpc": "2.0", "id": msg["id"], "result": result})
+
+
+def serve_stdio(layout: str) -> int:
+    return LanguageServer(layout, sys.stdin.buffer, sys.stdout.buffer).serve()
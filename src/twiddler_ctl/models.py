@@ -31,7 +31,7 @@ class Chord:
     )
 
 
-@dataclass
+@dataclass(frozen=True, slots=True)
 class Command:
     command_type: CommandType
     a: int
@@ -0,0 +1,207 @@
+import itertools
+import math
+import random
+from collections import Counter
+from dataclasses import dataclass
+from typing import Iterable
+
+from .config.config7 import FINGER_SHIFTS, THUMB_SHIFTS, Config7
+from .config.text import Text
+from .log.binary import CHAR_MAP
+from .models import Command, Config, Mapping
+
+
+@dataclass
+class EffortModel:
+    # Cost of pressing a single button on each finger row (F0..F4)
+    row_effort: tuple[float, float, float, float, float] = (2.0, 1.0, 1.0, 1.2, 1.5)
+    # Multiplier for the column within a row (R, M, L)
+    col_effort: tuple[float, float, float] = (1.1, 1.0, 1.1)
+    # Cost of holding each thumb button (T0..T4)
+    thumb_effort: tuple[float, float, float, float, float] = (2.0, 1.5, 1.5, 1.5, 1.5)
+    # Extra cost for every button beyond the first
+    chord_penalty: float = 0.5
+    # Cost of moving from one chord to the next with the same finger on another button
+    same_finger_penalty: float = 1.0
+
+
+@dataclass
+class OptimizeResult:
+    assignment: dict[str, int]
+    initial_cost: float
+    cost: float
+    iterations: int
+
+
+def _row_masks() -> list[int]:
+    return [sum(1 << s for s in shifts) for shifts in FINGER_SHIFTS]
+
+
+def chord_cost(chord: int, model: EffortModel) -> float:
+    cost = 0.0
+    buttons = 0
+
+    for row, shifts in enumerate(FINGER_SHIFTS):
+        for col, shift in enumerate(shifts):
+            if chord >> shift & 1:
+                cost += model.row_effort[row] * model.col_effort[col]
+                buttons += 1
+
+    for thumb, shift in enumerate(THUMB_SHIFTS):
+        if chord >> shift & 1:
+            cost += model.thumb_effort[thumb]
+            buttons += 1
+
+    return cost + model.chord_penalty * max(buttons - 1, 0)
+
+
+def transition_cost(a: int, b: int, model: EffortModel) -> float:
+    cost = 0.0
+    for mask in _row_masks():
+        ra, rb = a & mask, b & mask
+        if ra and rb and ra != rb:
+            cost += model.same_finger_penalty
+    return cost
+
+
+def candidate_chords(max_buttons: int = 2) -> list[int]:
+    """
+    Chords using at most one button per finger row and at most one thumb button,
+    so that every button the effort model prices can be proposed
+    """
+
+    rows = [[1 << shift for shift in shifts] for shifts in FINGER_SHIFTS]
+    rows.append([1 << shift for shift in THUMB_SHIFTS])
+
+    chords = []
+    for n in range(1, max_buttons + 1):
+        for used in itertools.combinations(rows, n):
+            for buttons in itertools.product(*used):
+                chords.append(sum(buttons))
+
+    return chords
+
+
+def key_frequencies(text: str) -> tuple[Counter, Counter]:
+    unigrams = Counter(text)
+    bigrams = Counter(zip(text, text[1:]))
+    return unigrams, bigrams
+
+
+def optimize_assignment(
+    unigrams: Counter,
+    bigrams: Counter,
+    chords: list[int],
+    model: EffortModel,
+    iterations: int,
+    seed: int | None = None,
+) -> OptimizeResult:
+    """
+    Assign each key to a chord by simulated annealing, starting from the
+    assignment that is optimal for single key effort alone.
+
+    Moves either swap the chords of two keys or move a key onto an unused chord.
+    The single key part of a move's delta is O(1); the transition part only
+    visits the move's keys' bigram neighbours.
+    """
+
+    keys = [k for k, _ in unigrams.most_common()]
+    if len(keys) > len(chords):
+        raise ValueError(f"Not enough chords ({len(chords)}) for {len(keys)} keys")
+
+    rng = random.Random(seed)
+
+    n, m = len(keys), len(chords)
+    key_idx = {k: i for i, k in enumerate(keys)}
+    freq = [float(unigrams[k]) for k in keys]
+
+    chords = sorted(chords, key=lambda c: chord_cost(c, model))
+    unit = [chord_cost(c, model) for c in chords]
+    trans = [[transition_cost(a, b, model) for b in chords] for a in chords]
+
+    # Symmetric bigram weights as sparse neighbour lists
+    weights: dict[tuple[int, int], float] = {}
+    for (a, b), count in bigrams.items():
+        if a == b or a not in key_idx or b not in key_idx:
+            continue
+        i, j = sorted((key_idx[a], key_idx[b]))
+        weights[i, j] = weights.get((i, j), 0.0) + count
+    nbrs: list[list[tuple[int, float]]] = [[] for _ in range(n)]
+    for (i, j), w in weights.items():
+        nbrs[i].append((j, w))
+        nbrs[j].append((i, w))
+
+    pos = list(range(n))
+    occupant = list(range(n)) + [-1] * (m - n)
+
+    def total() -> float:
+        cost = sum(freq[i] * unit[pos[i]] for i in range(n))
+        cost += sum(w * trans[pos[i]][pos[j]] for (i, j), w in weights.items())
+        return cost
+
+    def move_delta(i: int, src: int, dst: int, skip: int) -> float:
+        delta = freq[i] * (unit[dst] - unit[src])
+        ts, td = trans[src], trans[dst]
+        for j, w in nbrs[i]:
+            if j != skip:
+                cj = pos[j]
+                delta += w * (td[cj] - ts[cj])
+        return delta
+
+    cost = initial = total()
+    t0 = max(cost / max(n, 1) * 0.05, 1e-9)
+    t1 = t0 * 1e-4
+    decay = (t1 / t0) ** (1 / max(iterations, 1))
+    temp = t0
+
+    for _ in range(iterations):
+        i = rng.randrange(n)
+        d = rng.randrange(m)
+        ci = pos[i]
+        if d == ci:
+            continue
+
+        j = occupant[d]
+        delta = move_delta(i, ci, d, j)
+        if j >= 0:
+            delta += move_delta(j, d, ci, i)
+
+        if delta <= 0 or rng.random() < math.exp(-delta / temp):
+            pos[i] = d
+            occupant[d] = i
+            occupant[ci] = j
+            if j >= 0:
+                pos[j] = ci
+            cost += delta
+
+        temp *= decay
+
+    return OptimizeResult(
+        assignment={keys[i]: chords[pos[i]] for i in range(n)},
+        initial_cost=initial,
+        cost=total(),
+        iterations=iterations,
+    )
+
+
+def key_commands(keys: Iterable[str], layout: str) -> dict[str, Command]:
+    """Keyboard commands for every key that can be typed in the layout"""
+
+    commands = {}
+    for char in keys:
+        try:
+            commands[char] = Text._command_from_text(CHAR_MAP.get(char, char), layout)
+        except ValueError:
+            continue
+    return commands
+
+
+def config_from_assignment(
+    assignment: dict[str, int], commands: dict[str, Command]
+) -> Config:
+    cfg = Config()
+
+    for char, chord in assignment.items():
+        cfg.mappings.append(Mapping(Config7._chord_from_int(chord), [commands[char]]))
+
+    return cfg
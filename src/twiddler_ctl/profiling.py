@@ -0,0 +1,108 @@
+import contextlib
+import functools
+import time
+from dataclasses import dataclass
+from typing import Callable, ContextManager, TypeVar
+
+F = TypeVar("F", bound=Callable)
+
+
+@dataclass
+class PhaseStats:
+    calls: int = 0
+    wall: float = 0.0
+    cpu: float = 0.0
+    bytes_read: int = 0
+    bytes_written: int = 0
+
+
+# Per-phase totals, or None while profiling is off. Hooks check this first so
+# that they cost a single comparison when disabled.
+_stats: dict[str, PhaseStats] | None = None
+
+_NULL = contextlib.nullcontext()
+
+
+def enable() -> None:
+    global _stats
+    _stats = {}
+
+
+def enabled() -> bool:
+    return _stats is not None
+
+
+class _Phase:
+    __slots__ = ("name", "wall", "cpu")
+
+    def __init__(self, name: str):
+        self.name = name
+
+    def __enter__(self) -> None:
+        self.wall = time.perf_counter()
+        self.cpu = time.process_time()
+
+    def __exit__(self, *exc) -> None:
+        stats = _stats.setdefault(self.name, PhaseStats())
+        stats.calls += 1
+        stats.wall += time.perf_counter() - self.wall
+        stats.cpu += time.process_time() - self.cpu
+
+
+def phase(name: str) -> ContextManager:
+    """Time a block as part of the named phase"""
+
+    if _stats is None:
+        return _NULL
+    return _Phase(name)
+
+
+def timed(name: str) -> Callable[[F], F]:
+    """Time every call of a function as part of the named phase"""
+
+    def decorator(fn: F) -> F:
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            if _stats is None:
+                return fn(*args, **kwargs)
+            with _Phase(name):
+                return fn(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+def add_bytes(name: str, read: int = 0, written: int = 0) -> None:
+    if _stats is None:
+        return
+
+    stats = _stats.setdefault(name, PhaseStats())
+    stats.bytes_read += read
+    stats.bytes_written += written
+
+
+def summary() -> str:
+    """Table of phases, slowest first. Nested phases are included in their parents"""
+
+    rows = [("phase", "calls", "wall ms", "cpu ms", "read", "written")]
+    items = sorted((_stats or {}).items(), key=lambda item: -item[1].wall)
+    for name, s in items:
+        rows.append(
+            (
+                name,
+                str(s.calls),
+                f"{s.wall * 1000:.2f}",
+                f"{s.cpu * 1000:.2f}",
+                str(s.bytes_read),
+                str(s.bytes_written),
+            )
+        )
+
+    widths = [max(len(row[i]) for row in rows) for i in range(len(rows[0]))]
+    lines = []
+    for row in rows:
+        cells = [row[0].ljust(widths[0])]
+        cells += [cell.rjust(width) for cell, width in zip(row[1:], widths[1:])]
+        lines.append("  ".join(cells))
+    return "\n".join(lines) + "\n"
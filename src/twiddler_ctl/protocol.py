@@ -0,0 +1,42 @@
+"""
+Framing for the `twiddler-ctl serve` Unix socket protocol
+
+Every message is two frames, each prefixed by a big-endian u32 length: a JSON
+header describing the request/response, followed by a raw payload.
+"""
+
+import json
+import os
+import struct
+import tempfile
+from pathlib import Path
+
+FRAME_HEADER = struct.Struct(">I")
+MAX_FRAME_LENGTH = 64 * 1024 * 1024
+
+
+class ServerError(Exception):
+    pass
+
+
+def socket_path() -> Path:
+    path = os.environ.get("TWIDDLER_CTL_SOCKET")
+    if path:
+        return Path(path)
+
+    base = os.environ.get("XDG_RUNTIME_DIR") or tempfile.gettempdir()
+    return Path(base) / f"twiddler-ctl-{os.getuid()}.sock"
+
+
+def encode_message(header: dict, body: bytes = b"") -> bytes:
+    head = json.dumps(header).encode()
+    return b"".join(
+        [FRAME_HEADER.pack(len(head)), head, FRAME_HEADER.pack(len(body)), body]
+    )
+
+
+def decode_length(raw: bytes) -> int:
+    length = FRAME_HEADER.unpack(raw)[0]
+    if length > MAX_FRAME_LENGTH:
+        raise ValueError(f"Frame too large: {length}")
+    return length
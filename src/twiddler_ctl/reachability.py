@@ -0,0 +1,91 @@
+import itertools
+import os
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from enum import IntEnum
+
+from .models import CommandType, Config
+from .util import get_backward_mapping, get_forward_mapping, get_layout_map
+
+
+class Reach(IntEnum):
+    SAME = 0
+    # Types another key; translating the config with `remap` restores it
+    CHANGED = 1
+    # The key cannot be typed in the layout at all
+    UNREACHABLE = 2
+
+
+@dataclass
+class Reachability:
+    layouts: list[str]
+    # layout -> mapping index -> worst outcome, for affected mappings only
+    matrix: dict[str, dict[int, Reach]] = field(default_factory=lambda: {})
+    # Key codes the source layout has no name for
+    unknown: set[int] = field(default_factory=lambda: set())
+
+
+def key_uses(config: Config) -> dict[int, list[int]]:
+    """Key code -> indices of the mappings typing it"""
+
+    uses: dict[int, list[int]] = {}
+    for i, mapping in enumerate(config.mappings):
+        for cmd in mapping.commands:
+            # Key code in the upper byte, modifiers in the lower one
+            if cmd.command_type == CommandType.KEYBOARD:
+                idxs = uses.setdefault(cmd.a >> 8, [])
+                if not idxs or idxs[-1] != i:
+                    idxs.append(i)
+    return uses
+
+
+def code_reach(layout: str, names: dict[int, str]) -> dict[int, Reach]:
+    """How each key code, named as in the source layout, fares under `layout`"""
+
+    forward = get_forward_mapping(layout)
+    typeable = get_backward_mapping(layout).keys()
+
+    reach = {}
+    for code, name in names.items():
+        if forward.get(code) != name:
+            reach[code] = Reach.CHANGED if name in typeable else Reach.UNREACHABLE
+    return reach
+
+
+def check_layouts(
+    config: Config,
+    source: str,
+    layouts: list[str] | None = None,
+    jobs: int | None = None,
+) -> Reachability:
+    """
+    Which mappings of a config written against `source` type something else,
+    or cannot be typed, under each of `layouts` (all known layouts by default).
+    Each layout only needs the distinct key codes of the config, so the config
+    is scanned once and the layouts are checked in parallel.
+    """
+
+    result = Reachability(layouts or sorted(get_layout_map()))
+
+    uses = key_uses(config)
+    forward = get_forward_mapping(source)
+    names = {code: forward[code] for code in uses if code in forward}
+    result.unknown = uses.keys() - names.keys()
+
+    jobs = max(1, min(jobs or os.cpu_count() or 1, len(result.layouts)))
+    with ProcessPoolExecutor(jobs) as pool:
+        reaches = pool.map(
+            code_reach,
+            result.layouts,
+            itertools.repeat(names),
+            chunksize=max(1, len(result.layouts) // (jobs * 4)),
+        )
+
+        for layout, reach in zip(result.layouts, reaches):
+            row: dict[int, Reach] = {}
+            for code, status in reach.items():
+                for i in uses[code]:
+                    row[i] = max(row.get(i, Reach.SAME), status)
+            result.matrix[layout] = row
+
+    return result
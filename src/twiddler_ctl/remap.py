@@ -0,0 +1,93 @@
+from .config.config7 import Config7
+from .config.schema import VERSION_OFFSET
+from .models import CommandType, Config
+from .util import get_backward_mapping, get_forward_mapping
+
+# 0xFF for keyboard command type bytes, 0x00 for anything else
+_KEYBOARD_MASK = bytes(0xFF if i == CommandType.KEYBOARD else 0 for i in range(256))
+
+
+def build_translation(src: str, dst: str) -> tuple[bytes, dict[int, str]]:
+    """
+    Translation table from key codes in layout `src` to the codes for the same
+    key names in layout `dst`. Codes unknown to `src` are left untouched; those
+    with no equivalent in `dst` are returned as missing.
+    """
+
+    forward = get_forward_mapping(src)
+    backward = get_backward_mapping(dst)
+
+    table = bytearray(range(256))
+    missing = {}
+    for code, name in forward.items():
+        if code > 0xFF:
+            continue
+
+        new = backward.get(name)
+        if new is None or new > 0xFF:
+            missing[code] = name
+            continue
+        table[code] = new
+
+    return bytes(table), missing
+
+
+def _translate_keys(
+    buf: bytearray, start: int, end: int, step: int, table: bytes
+) -> set[int]:
+    """
+    Translate the key byte of every keyboard command word in a region, and
+    return the key codes found
+    """
+
+    # Within a command word the type is at offset 0 and the key code at offset 2
+    types = buf[start:end:step]
+    keys = bytes(buf[start + 2 : end : step])
+    if not keys:
+        return set()
+
+    # Blend translated and original keys using the command types as a byte mask
+    mask = int.from_bytes(types.translate(_KEYBOARD_MASK), "little")
+    orig = int.from_bytes(keys, "little")
+    new = int.from_bytes(keys.translate(table), "little")
+    blended = (orig & ~mask) | (new & mask)
+
+    buf[start + 2 : end : step] = blended.to_bytes(len(keys), "little")
+
+    # Keys of other commands are blanked to 0x00 in one copy and to 0xFF in the
+    # other, so the codes found in both are the keys of keyboard commands
+    ones = (1 << 8 * len(keys)) - 1
+    low = (orig & mask).to_bytes(len(keys), "little")
+    high = (orig | ones & ~mask).to_bytes(len(keys), "little")
+    return set(low) & set(high)
+
+
+def remap_image(data: bytes, table: bytes) -> tuple[bytes, set[int]]:
+    """
+    Rewrite the keyboard commands of a Config7 image without decoding it. Also
+    returns the key codes the image used, so that only keys that matter are
+    reported as missing.
+    """
+
+    if len(data) <= VERSION_OFFSET:
+        raise ValueError("Unexpected end of file while reading header")
+    codec = Config7._codec(data[VERSION_OFFSET])
+    header_end = codec.header.size
+    if len(data) < header_end:
+        raise ValueError("Unexpected end of file while reading header")
+
+    buf = bytearray(data)
+    mapping_count = codec.unpack(Config(), data)
+    record = codec.record.size
+    table_end = header_end + mapping_count * record
+    if len(buf) < table_end:
+        raise ValueError("Unexpected end of file while reading mappings")
+
+    # Each mapping entry ends with its command word
+    used = _translate_keys(buf, header_end + record - 4, table_end, record, table)
+
+    # The command list region is a flat run of command words
+    region_end = table_end + (len(buf) - table_end) // 4 * 4
+    used |= _translate_keys(buf, table_end, region_end, 4, table)
+
+    return bytes(buf), used
@@ -0,0 +1,170 @@
+"""
+Long-lived conversion server
+
+Keeps the serdes and layout tables resident and answers requests framed as
+described in `protocol`, so that short-lived CLI invocations avoid the startup
+cost of loading layouts.
+"""
+
+import asyncio
+import io
+import json
+import os
+import signal
+import socket
+from pathlib import Path
+from typing import Callable
+
+from .commands._util import CONFIG_ERRORS, FORMAT_MAP, sniff_format
+from .commands.validate import validate_config
+from .commands.visualize import render_charts
+from .models import Config
+from .protocol import FRAME_HEADER, decode_length, encode_message
+from .util import get_backward_mapping, get_forward_mapping, layout_exists
+
+
+def _decode(header: dict, data: bytes, layout: str) -> Config:
+    binary, cls = FORMAT_MAP[header["input_format"] or sniff_format(data)]
+    if binary:
+        return cls.read(io.BytesIO(data), layout)
+
+    fh = io.StringIO(data.decode())
+    # Lets text configs resolve `extends` relative to the client's file
+    if header.get("path"):
+        fh.name = header["path"]
+    return cls.read(fh, layout)
+
+
+def _encode(fmt: str, config: Config, layout: str) -> bytes:
+    binary, cls = FORMAT_MAP[fmt]
+    fh = io.BytesIO() if binary else io.StringIO()
+    cls.write(config, fh, layout)
+    out = fh.getvalue()
+    return out if binary else out.encode()
+
+
+def _check_layout(layout: str) -> None:
+    if not layout_exists(layout):
+        raise ValueError(f"Layout not found: {layout}")
+
+
+def _convert(header: dict, body: bytes) -> tuple[dict, bytes]:
+    layout = header["layout"]
+    _check_layout(layout)
+
+    config = _decode(header, body, layout)
+    return {}, _encode(header["output_format"], config, layout)
+
+
+def _validate(header: dict, body: bytes) -> tuple[dict, bytes]:
+    layout = header["layout"]
+    _check_layout(layout)
+
+    config = _decode(header, body, layout)
+    validate_config(config, layout)
+    return {"mappings": len(config.mappings)}, b""
+
+
+def _visualize(header: dict, body: bytes) -> tuple[dict, bytes]:
+    config = _decode(header, body, "default")
+    return {}, render_charts(config, header["columns"]).encode()
+
+
+OPERATIONS: dict[str, Callable[[dict, bytes], tuple[dict, bytes]]] = {
+    "convert": _convert,
+    "validate": _validate,
+    "visualize": _visualize,
+}
+
+
+def _dispatch(header: object, body: bytes) -> bytes:
+    if not isinstance(header, dict):
+        return encode_message({"ok": False, "error": "Header must be an object"})
+
+    op = OPERATIONS.get(header.get("op"))
+    if op is None:
+        return encode_message(
+            {"ok": False, "error": f"Unknown operation: {header.get('op')}"}
+        )
+
+    try:
+        resp, data = op(header, body)
+    except CONFIG_ERRORS as e:
+        return encode_message({"ok": False, "error": str(e)})
+    # Anything else is a bug or a malformed request, but the client still gets
+    # a response instead of a closed connection
+    except Exception as e:  # noqa: BLE001
+        return encode_message(
+            {"ok": False, "error": f"Internal error: {type(e).__name__}: {e}"}
+        )
+
+    resp["ok"] = True
+    return encode_message(resp, data)
+
+
+async def _read_frame(reader: asyncio.StreamReader) -> bytes:
+    length = decode_length(await reader.readexactly(FRAME_HEADER.size))
+    return await reader.readexactly(length)
+
+
+async def _handle(reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+    try:
+        while True:
+            try:
+                header = json.loads(await _read_frame(reader))
+                body = await _read_frame(reader)
+            except asyncio.IncompleteReadError:
+                break
+
+            # Conversions are CPU bound; running them off the loop keeps one
+            # large request from stalling every other client
+            loop = asyncio.get_running_loop()
+            writer.write(await loop.run_in_executor(None, _dispatch, header, body))
+            await writer.drain()
+    except (ConnectionError, ValueError):
+        pass
+    finally:
+        writer.close()
+
+
+def _remove_stale_socket(path: Path) -> None:
+    if not path.exists():
+        return
+
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        sock.connect(str(path))
+    except OSError:
+        path.unlink()
+        return
+    finally:
+        sock.close()
+
+    raise RuntimeError(f"Server already running on {path}")
+
+
+async def serve(path: Path, layouts: list[str]) -> None:
+    # Warm the layout tables up front so the first request is as fast as the rest
+    for layout in layouts:
+        _check_layout(layout)
+        for consumer in (False, True):
+            get_forward_mapping(layout, consumer)
+            get_backward_mapping(layout, consumer)
+
+    _remove_stale_socket(path)
+    # The socket is created owner-only rather than chmodded after the bind,
+    # which would leave it open to other users in between
+    umask = os.umask(0o177)
+    try:
+        server = await asyncio.start_unix_server(_handle, path=str(path))
+    finally:
+        os.umask(umask)
+
+    stop = asyncio.Event()
+    asyncio.get_running_loop().add_signal_handler(signal.SIGTERM, stop.set)
+
+    try:
+        async with server:
+            await stop.wait()
+    finally:
+        path.unlink(missing_ok=True)
@@ -0,0 +1,114 @@
+import functools
+import html
+from typing import Iterator, TextIO
+
+from .config.config7 import Config7
+from .config.text import DEDICATED_CODES, DEDICATED_ORDER, Text
+from .models import Config
+
+# Glyph geometry: a row of five thumb buttons above the 5x3 finger grid
+CELL = 10
+PITCH = 12
+GLYPH_WIDTH = 5 * PITCH
+GLYPH_HEIGHT = 6 * PITCH + 4
+
+CARD_WIDTH = 240
+CARD_HEIGHT = GLYPH_HEIGHT + 8
+SHEET_COLUMNS = 4
+
+HTML_STYLE = (
+    "body{font-family:sans-serif}"
+    ".sheet{display:flex;flex-wrap:wrap;gap:8px}"
+    "figure{display:flex;align-items:center;gap:8px;margin:0;width:240px}"
+    "figcaption code{white-space:pre-wrap}"
+)
+
+
+def _cell(x: int, y: int, on: bool) -> str:
+    fill = "#333" if on else "#fff"
+    return (
+        f'<rect x="{x}" y="{y}" width="{CELL}" height="{CELL}" '
+        f'fill="{fill}" stroke="#333"/>'
+    )
+
+
+@functools.cache
+def chord_glyph(chord: int) -> str:
+    """SVG fragment drawing the buttons of a chord, memoized per chord"""
+
+    c = Config7._chord_from_int(chord)
+    parts = [_cell(i * PITCH, 0, on) for i, on in enumerate(c.thumbs)]
+    for row, vals in enumerate(c.fingers):
+        # Rows are stored R, M, L; draw them left to right
+        for col, on in enumerate(reversed(vals)):
+            parts.append(_cell((col + 1) * PITCH, (row + 1) * PITCH + 4, on))
+    return "".join(parts)
+
+
+def sheet_entries(config: Config, layout: str) -> Iterator[tuple[int, str, str]]:
+    """(chord, chord notation, action) for every dedicated key and mapping"""
+
+    # Dedicated offsets line up with chord bit positions
+    for off, val in enumerate(config.dedicated):
+        if val:
+            action = DEDICATED_CODES.get(val, str(val))
+            yield 1 << off, DEDICATED_ORDER[off].upper(), action
+
+    for mapping in config.mappings:
+        cmds = " ".join(
+            Text._command_to_display(cmd, layout) for cmd in mapping.commands
+        )
+        yield (
+            Config7._chord_to_int(mapping.chord),
+            Text._chord_to_text(mapping.chord),
+            cmds,
+        )
+
+
+def write_svg(config: Config, layout: str, fh: TextIO) -> None:
+    count = sum(1 for v in config.dedicated if v) + len(config.mappings)
+    rows = -(-count // SHEET_COLUMNS)
+    width = SHEET_COLUMNS * CARD_WIDTH
+    height = max(rows, 1) * CARD_HEIGHT
+
+    fh.write(
+        f'<svg xmlns="http://www.w3.org/2000/svg" width="{width}" '
+        f'height="{height}" font-family="monospace" font-size="12">\n'
+    )
+
+    for i, (chord, label, action) in enumerate(sheet_entries(config, layout)):
+        x = i % SHEET_COLUMNS * CARD_WIDTH
+        y = i // SHEET_COLUMNS * CARD_HEIGHT
+        fh.write(
+            f'<g transform="translate({x},{y})">{chord_glyph(chord)}'
+            f'<text x="{GLYPH_WIDTH + 8}" y="16" font-weight="bold">'
+            f"{html.escape(label)}</text>"
+            f'<text x="{GLYPH_WIDTH + 8}" y="32">{html.escape(action)}</text></g>\n'
+        )
+
+    fh.write("</svg>\n")
+
+
+def write_html(config: Config, layout: str, fh: TextIO) -> None:
+    fh.write(
+        "<!DOCTYPE html>\n"
+        '<html><head><meta charset="utf-8"><title>Chords</title>'
+        f"<style>{HTML_STYLE}</style></head>\n"
+        '<body><div class="sheet">\n'
+    )
+
+    for chord, label, action in sheet_entries(config, layout):
+        fh.write(
+            f'<figure><svg width="{GLYPH_WIDTH}" height="{GLYPH_HEIGHT}">'
+            f"{chord_glyph(chord)}</svg>"
+            f"<figcaption><b>{html.escape(label)}</b><br>"
+            f"<code>{html.escape(action)}</code></figcaption></figure>\n"
+        )
+
+    fh.write("</div></body></html>\n")
+
+
+SHEET_WRITERS = {
+    "svg": write_svg,
+    "html": write_html,
+}
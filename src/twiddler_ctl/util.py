@@ -1,8 +1,16 @@
 import functools
-import layouts
 
+from . import profiling
 
-_layouts = layouts.Layouts()
+
+@functools.cache
+@profiling.timed("util.import_layouts")
+def _get_layouts():
+    # Deferred so that commands which never touch a layout (or are served by a
+    # running `twiddler-ctl serve`) do not pay for loading the layouts database
+    import layouts
+
+    return layouts.Layouts()
 
 
 def normalize_str(val: str) -> str:
@@ -13,19 +21,29 @@ def _ignore(i: int) -> bool:
     return i >= 0xF0 and i <= 0x121
 
 
-LAYOUT_MAP = {normalize_str(v): v for v in _layouts.list_layouts()}
+@functools.cache
+@profiling.timed("util.layout_map")
+def get_layout_map() -> dict[str, str]:
+    return {normalize_str(v): v for v in _get_layouts().list_layouts()}
+
+
+def __getattr__(name: str):
+    if name == "LAYOUT_MAP":
+        return get_layout_map()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 
 @functools.cache
+@profiling.timed("util.mapping_tables")
 def get_forward_mapping(name: str, consumer: bool = False) -> dict | None:
-    key = LAYOUT_MAP.get(name)
+    key = get_layout_map().get(name)
     if key is None:
         return None
 
     table = "to_hid_consumer" if consumer else "to_hid_keyboard"
 
     mapping = {}
-    for k, v in _layouts.get_layout(key).dict(table).items():
+    for k, v in _get_layouts().get_layout(key).dict(table).items():
         code = int(k, 16)
         if _ignore(code):
             continue
@@ -36,15 +54,16 @@ def get_forward_mapping(name: str, consumer: bool = False) -> dict | None:
 
 
 @functools.cache
+@profiling.timed("util.mapping_tables")
 def get_backward_mapping(name: str, consumer: bool = False) -> dict | None:
-    key = LAYOUT_MAP.get(name)
+    key = get_layout_map().get(name)
     if key is None:
         return None
 
     table = "from_hid_consumer" if consumer else "from_hid_keyboard"
 
     mapping = {}
-    for k, v in _layouts.get_layout(key).dict(table).items():
+    for k, v in _get_layouts().get_layout(key).dict(table).items():
         code = int(v, 16)
         if _ignore(code):
             continue
@@ -55,4 +74,4 @@ def get_backward_mapping(name: str, consumer: bool = False) -> dict | None:
 
 
 def layout_exists(name: str) -> dict | None:
-    return LAYOUT_MAP.get(name) is not None
+    return get_layout_map().get(name) is not None
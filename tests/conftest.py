@@ -0,0 +1,34 @@
+import pytest
+
+from twiddler_ctl.config.config7 import Config7
+from twiddler_ctl.models import Command, CommandType, Config, Mapping
+
+# Key codes every layout names, so that tests pass whatever the default is
+KEY_A = 0x04
+KEY_B = 0x05
+KEY_Z = 0x1D
+
+
+def key(code: int, modifiers: int = 0) -> Command:
+    return Command(CommandType.KEYBOARD, code << 8 | modifiers, 0)
+
+
+def mapping(chord: int, *commands: Command) -> Mapping:
+    return Mapping(Config7._chord_from_int(chord), list(commands))
+
+
+@pytest.fixture
+def config() -> Config:
+    """A small config with single commands, a shared command list and a delay"""
+
+    return Config(
+        idle_time=300,
+        dedicated=[1 + i % 8 for i in range(20)],
+        mappings=[
+            mapping(1 << 0, key(KEY_A)),
+            mapping(1 << 1, key(KEY_B, 0x02)),
+            mapping(1 << 0 | 1 << 5, key(KEY_A), key(KEY_B), key(KEY_Z)),
+            mapping(1 << 19 | 1 << 9, key(KEY_A), key(KEY_B), key(KEY_Z)),
+            mapping(1 << 13, Command(CommandType.DELAY, 250, 0)),
+        ],
+    )
@@ -0,0 +1,51 @@
+from twiddler_ctl.analyze import analyze_config
+from twiddler_ctl.models import Config
+
+from conftest import KEY_A, KEY_B, key, mapping
+
+F1R = 1 << 1
+F2R = 1 << 5
+F3R = 1 << 9
+
+
+def build() -> Config:
+    dedicated = [0] * 20
+    dedicated[2] = 1
+    return Config(
+        dedicated=dedicated,
+        mappings=[
+            mapping(F1R, key(KEY_A)),
+            mapping(F1R | F2R, key(KEY_B)),
+            mapping(F1R | F2R | F3R, key(KEY_A)),
+            mapping(F1R, key(KEY_B)),
+            # Bit 2 is a dedicated key, bit 3 is not
+            mapping(1 << 2, key(KEY_A)),
+            mapping(1 << 3, key(KEY_A)),
+        ],
+    )
+
+
+def test_duplicates():
+    assert analyze_config(build()).duplicates == {F1R: [0, 3]}
+
+
+def test_dedicated():
+    assert analyze_config(build()).dedicated == [(2, 4)]
+
+
+def test_subsets_within_distance():
+    assert sorted(analyze_config(build()).subsets) == [
+        (F1R, F1R | F2R),
+        (F1R | F2R, F1R | F2R | F3R),
+    ]
+
+
+def test_subsets_max_distance():
+    # Dropping two keys finds F1R under the three key chord too, but single
+    # keys are never compared against the empty chord
+    assert sorted(analyze_config(build(), max_distance=2).subsets) == [
+        (F1R, F1R | F2R),
+        (F1R, F1R | F2R | F3R),
+        (F1R | F2R, F1R | F2R | F3R),
+    ]
+    assert analyze_config(build(), max_distance=0).subsets == []
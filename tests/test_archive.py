@@ -0,0 +1,69 @@
+import io
+import random
+import struct
+
+import pytest
+
+from twiddler_ctl.log.archive import HEADER, Archive
+from twiddler_ctl.log.binary import Binary
+
+
+def archive(codes: list[int], block_size: int = 64) -> bytes:
+    buf = io.BytesIO()
+    Archive.write_codes(codes, buf, block_size)
+    return buf.getvalue()
+
+
+@pytest.fixture
+def codes() -> list[int]:
+    rng = random.Random(0)
+    # Enough distinct codes that some indices need two varint bytes
+    return [rng.choice(range(4, 4 + 200)) for _ in range(1000)]
+
+
+def test_codes_round_trip(codes):
+    assert Archive.read_codes(io.BytesIO(archive(codes))) == codes
+
+
+@pytest.mark.parametrize("start, stop", [(0, 1), (63, 65), (100, 700), (990, 2000)])
+def test_read_range(codes, start, stop):
+    data = io.BytesIO(archive(codes))
+    assert Archive.read_codes(data, start, stop) == codes[start:stop]
+
+
+def test_empty():
+    assert Archive.read_codes(io.BytesIO(archive([]))) == []
+
+
+def test_text_round_trip():
+    text = "hello world"
+    buf = io.BytesIO()
+    Archive.write(text, buf, "default")
+    buf.seek(0)
+    assert Archive.read(buf, "default") == text
+
+
+def test_matches_binary_log():
+    text = "abc abc"
+    log = io.BytesIO()
+    Binary.write(text, log, "default")
+    codes = list(struct.unpack(f"<{len(log.getvalue()) // 4}I", log.getvalue()))
+
+    assert Archive.read(io.BytesIO(archive(codes)), "default") == text
+
+
+def test_rejects_truncated(codes):
+    data = archive(codes)
+    with pytest.raises(ValueError, match="Unexpected end of file"):
+        Archive.read_codes(io.BytesIO(data[:-1]))
+    with pytest.raises(ValueError, match="Unexpected end of file"):
+        Archive.read(io.BytesIO(data[: HEADER.size + 4]), "default")
+
+
+def test_rejects_wrong_count():
+    data = bytearray(archive([4, 5, 4]))
+    magic, version, block_size, count, dict_size = HEADER.unpack_from(data)
+    HEADER.pack_into(data, 0, magic, version, block_size, count - 1, dict_size)
+
+    with pytest.raises(ValueError, match="Expected 2 keystrokes, found 3"):
+        Archive.read(io.BytesIO(bytes(data)), "default")
@@ -0,0 +1,96 @@
+import io
+
+import pytest
+
+from twiddler_ctl.arrays import image_table, load_tables
+from twiddler_ctl.config.config7 import Config7
+from twiddler_ctl.models import Config
+
+from benchmarks.generate import generate_config
+
+# NumPy is optional, see twiddler_ctl.arrays
+pytest.importorskip("numpy")
+
+
+def encode(cfg: Config) -> bytes:
+    buf = io.BytesIO()
+    Config7.write(cfg, buf, "default")
+    return buf.getvalue()
+
+
+def rows(data: bytes) -> list[tuple[int, list[tuple[int, int, int]]]]:
+    """Chord and commands of each mapping, from the array tables"""
+
+    table, flat = image_table(data)
+    return [
+        (
+            int(row["chord"]),
+            [
+                (int(cmd["type"]), int(cmd["a"]), int(cmd["b"]))
+                for cmd in flat[row["offset"] : row["offset"] + row["length"]]
+            ],
+        )
+        for row in table
+    ]
+
+
+def expected_rows(data: bytes) -> list[tuple[int, list[tuple[int, int, int]]]]:
+    cfg = Config7.read(io.BytesIO(data), "default")
+    return [
+        (
+            Config7._chord_to_int(m.chord),
+            [(cmd.command_type.value, cmd.a, cmd.b) for cmd in m.commands],
+        )
+        for m in cfg.mappings
+    ]
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_agrees_with_config7(seed):
+    data = encode(generate_config(300, 0.3, "default", seed))
+    assert rows(data) == expected_rows(data)
+
+
+def test_fixture(config):
+    data = encode(config)
+    assert rows(data) == expected_rows(data)
+
+    table, _ = image_table(data)
+    decoded = Config7.read(io.BytesIO(data), "default")
+    assert table["list"].tolist() == [len(m.commands) > 1 for m in decoded.mappings]
+
+
+def test_truncated(config):
+    data = encode(config)
+    for size in (0x40, len(data) - 1):
+        with pytest.raises(ValueError):
+            Config7.read(io.BytesIO(data[:size]), "default")
+        with pytest.raises(ValueError):
+            image_table(data[:size])
+    for size in (0, 4, 5):
+        with pytest.raises(ValueError):
+            image_table(data[:size])
+
+
+def test_unsupported_version(config):
+    data = bytearray(encode(config))
+    data[4] = 6
+    with pytest.raises(ValueError, match="Unsupported version") as error:
+        image_table(bytes(data))
+    with pytest.raises(ValueError, match=str(error.value)):
+        Config7.read(io.BytesIO(data), "default")
+
+
+def test_load_tables(config):
+    first, first_flat = image_table(encode(config))
+    second, second_flat = image_table(encode(generate_config(50, 0.3, "default")))
+
+    mappings, commands = load_tables(
+        [encode(config), generate_config(50, 0.3, "default")]
+    )
+    assert mappings["config"].tolist() == [0] * len(first) + [1] * len(second)
+    assert commands.tolist() == first_flat.tolist() + second_flat.tolist()
+    # Offsets of the second config point past the first one's commands
+    assert mappings["offset"].tolist() == (
+        first["offset"].tolist() + (second["offset"] + len(first_flat)).tolist()
+    )
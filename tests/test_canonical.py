@@ -0,0 +1,99 @@
+import io
+from dataclasses import replace
+
+import pytest
+
+from twiddler_ctl.canonical import canonicalize, config_digest, image_digest
+from twiddler_ctl.config.config7 import HEADER_LENGTH, Config7
+from twiddler_ctl.config.text import Text
+from twiddler_ctl.models import Command, CommandType, Config
+
+from conftest import KEY_A, KEY_B, key, mapping
+
+
+def encode(cfg: Config) -> bytes:
+    buf = io.BytesIO()
+    Config7.write(cfg, buf, "default")
+    return buf.getvalue()
+
+
+def test_image_digest_matches_config_digest(config):
+    assert image_digest(io.BytesIO(encode(config))) == config_digest(config)
+
+
+def test_digest_ignores_order_and_shadowed_duplicates(config):
+    shuffled = replace(
+        config,
+        mappings=[
+            mapping(1 << 0, key(KEY_A, 0x01)),
+            *reversed(config.mappings),
+        ],
+    )
+    assert config_digest(shuffled) == config_digest(config)
+    assert canonicalize(shuffled) == canonicalize(config)
+
+
+def test_digest_same_for_text_and_binary(config):
+    buf = io.StringIO()
+    Text.write(config, buf, "default")
+    buf.seek(0)
+    assert config_digest(Text.read(buf, "default")) == image_digest(
+        io.BytesIO(encode(config))
+    )
+
+
+@pytest.mark.parametrize(
+    "changes",
+    [
+        {"nav_up_direction": 3},
+        {"nav_invert_x": True},
+        {"nav_sensitivity": 5},
+        # Differ in the high byte of idle_time only
+        {"idle_time": 536},
+        {"idle_time": 600 + 1},
+        {"repeat_delay": 7},
+        {"sticky_shift": True},
+    ],
+)
+def test_digest_differs_per_setting(config, changes):
+    base = replace(config, idle_time=600)
+    changed = replace(base, **changes)
+
+    assert config_digest(changed) != config_digest(base)
+    assert image_digest(io.BytesIO(encode(changed))) != image_digest(
+        io.BytesIO(encode(base))
+    )
+
+
+def test_digest_differs_per_mapping(config):
+    changed = replace(config, mappings=config.mappings[:-1])
+    assert config_digest(changed) != config_digest(config)
+
+
+def test_image_digest_ignores_unused_chord_bits(config):
+    data = bytearray(encode(config))
+    # The readers only use the low 20 bits of a chord word
+    data[HEADER_LENGTH + 3] |= 0x80
+
+    assert image_digest(io.BytesIO(bytes(data))) == config_digest(config)
+
+
+def test_image_digest_ends_lists_at_none(config):
+    # A NONE with a value, so that it does not also terminate the list
+    none = Command(CommandType.NONE, 1 << 8, 0)
+    cut = replace(
+        config,
+        mappings=[
+            mapping(1 << 0, key(KEY_A), key(KEY_B), none, key(KEY_A)),
+            *config.mappings[1:],
+        ],
+    )
+    short = replace(
+        config,
+        mappings=[mapping(1 << 0, key(KEY_A), key(KEY_B)), *config.mappings[1:]],
+    )
+
+    assert config_digest(cut) == config_digest(short)
+    assert image_digest(io.BytesIO(encode(cut))) == image_digest(
+        io.BytesIO(encode(short))
+    )
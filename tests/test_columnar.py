@@ -0,0 +1,110 @@
+import io
+import json
+
+import pytest
+
+from twiddler_ctl.config.columnar import Columnar
+from twiddler_ctl.config.config7 import Config7
+from twiddler_ctl.models import Config
+
+
+def encode(cfg: Config) -> str:
+    buf = io.StringIO()
+    Columnar.write(cfg, buf, "default")
+    return buf.getvalue()
+
+
+def decode(data: str) -> Config:
+    return Columnar.read(io.StringIO(data), "default")
+
+
+def test_round_trip(config):
+    assert decode(encode(config)) == config
+
+
+def test_round_trip_through_binary(config):
+    buf = io.BytesIO()
+    Config7.write(decode(encode(config)), buf, "default")
+    expected = io.BytesIO()
+    Config7.write(config, expected, "default")
+    assert buf.getvalue() == expected.getvalue()
+
+
+def test_columns(config):
+    doc = json.loads(encode(config))
+
+    assert len(doc["chords"]) == len(config.mappings)
+    assert doc["offsets"] == [0, 1, 2, 5, 8, 9]
+    assert len(doc["types"]) == len(doc["a"]) == len(doc["b"]) == 9
+
+
+def test_interns_commands(config):
+    first, second = decode(encode(config)).mappings[2:4]
+    assert all(a is b for a, b in zip(first.commands, second.commands))
+
+
+@pytest.mark.parametrize(
+    "doc, message",
+    [
+        ([], "Not a columnar config document"),
+        ({"chords": [1]}, "Not a columnar config document"),
+        (
+            {"chords": [1], "offsets": [0], "types": [], "a": [], "b": []},
+            "Expected one more offset than chords",
+        ),
+        (
+            {"chords": [1], "offsets": [0, 1], "types": [2], "a": [], "b": []},
+            "Command columns differ in length",
+        ),
+        (
+            {"chords": [1], "offsets": [0, 2], "types": [2], "a": [4], "b": [0]},
+            "Offsets do not cover the command columns",
+        ),
+        (
+            {"chords": [1], "offsets": [1, 1], "types": [2], "a": [4], "b": [0]},
+            "Offsets must start at 0",
+        ),
+        (
+            {
+                "chords": [1, 2],
+                "offsets": [0, 2, 1],
+                "types": [2],
+                "a": [4],
+                "b": [0],
+            },
+            "Offsets must start at 0 and never decrease",
+        ),
+        (
+            {"chords": [], "offsets": ["0"], "types": [], "a": [], "b": []},
+            "Offsets must start at 0",
+        ),
+    ],
+)
+def test_rejects_malformed_documents(doc, message):
+    with pytest.raises(ValueError, match=message):
+        decode(json.dumps(doc))
+
+
+@pytest.mark.parametrize(
+    "settings, message",
+    [
+        ({"idle_time": 1 << 16}, "Invalid value for idle_time: 65536"),
+        ({"repeat_delay": -1}, "Invalid value for repeat_delay: -1"),
+        ({"nav_sensitivity": 8}, "Invalid value for nav_sensitivity: 8"),
+        ({"haptic": 1}, "Invalid value for haptic: 1"),
+        ({"idle_time": "300"}, "Invalid value for idle_time: '300'"),
+        ({"idle_time": True}, "Invalid value for idle_time: True"),
+    ],
+)
+def test_rejects_invalid_settings(config, settings, message):
+    doc = json.loads(encode(config))
+    doc["settings"].update(settings)
+    with pytest.raises(ValueError, match=message):
+        decode(json.dumps(doc))
+
+
+def test_rejects_unsupported_version(config):
+    doc = json.loads(encode(config))
+    doc["version"] = 6
+    with pytest.raises(ValueError, match="Unsupported version"):
+        decode(json.dumps(doc))
@@ -0,0 +1,58 @@
+import io
+
+import pytest
+
+from twiddler_ctl.config.config7 import Config7
+from twiddler_ctl.diff import diff_configs
+from twiddler_ctl.models import Chord, Config, Mapping
+
+
+def encode(cfg: Config) -> bytes:
+    buf = io.BytesIO()
+    Config7.write(cfg, buf, "default")
+    return buf.getvalue()
+
+
+def decode(data: bytes) -> Config:
+    return Config7.read(io.BytesIO(data), "default")
+
+
+def test_round_trip(config):
+    read = decode(encode(config))
+
+    key = Config7._chord_to_int
+    assert sorted(read.mappings, key=lambda m: key(m.chord)) == sorted(
+        config.mappings, key=lambda m: key(m.chord)
+    )
+    assert list(read.dedicated) == config.dedicated
+    assert read.idle_time == config.idle_time
+
+
+@pytest.mark.parametrize("value", [0, 1, 1 << 19, 0xFFFFF, 0x12345])
+def test_chord_int_round_trip(value):
+    assert Config7._chord_to_int(Config7._chord_from_int(value)) == value
+
+
+def test_chord_from_lists():
+    chord = Chord(thumbs=[1, 0, 0, 0, 0], fingers=[[0, 1, 0]] + [[0, 0, 0]] * 4)
+    assert Config7._chord_to_int(chord) == 1 << 0x13 | 1 << 0x11
+
+
+@pytest.mark.parametrize(
+    "chord",
+    [
+        Chord(thumbs=(True,)),
+        Chord(fingers=((True,),) * 5),
+        Chord(fingers=((False, False, False),) * 4),
+        Chord(fingers=((False, False, False),) * 6),
+    ],
+)
+def test_malformed_chord(chord):
+    with pytest.raises(ValueError, match="Malformed chord"):
+        Config7._chord_to_int(chord)
+
+
+def test_diff_rejects_malformed_chord(config):
+    other = Config(mappings=[Mapping(Chord(thumbs=(True,)))])
+    with pytest.raises(ValueError):
+        diff_configs(config, other)
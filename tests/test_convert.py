@@ -0,0 +1,87 @@
+import argparse
+import io
+from pathlib import Path
+
+import pytest
+
+from twiddler_ctl import client
+from twiddler_ctl.commands.convert import convert_command
+from twiddler_ctl.config.text import SymbolicConfig, Text
+from twiddler_ctl.util import get_backward_mapping, get_forward_mapping
+
+LAYOUTS = ["default", "de_de"]
+
+TEXT = """[config]
+idle_time = 300
+
+[mappings]
+F1R = a
+F2R = y
+F3R = shift+z y
+"""
+
+
+@pytest.fixture(autouse=True)
+def no_server(monkeypatch):
+    monkeypatch.setattr(client, "connect", lambda: None)
+
+
+def convert(source: Path, output: Path, *layouts: str) -> None:
+    convert_command(
+        argparse.Namespace(
+            input=source,
+            output=output,
+            layout=list(layouts),
+            input_format=None,
+            output_format=None,
+        )
+    )
+
+
+@pytest.mark.parametrize("suffix", [".cfg", ".txt"])
+def test_fan_out_matches_single_layout(tmp_path, suffix):
+    source = tmp_path / "in.txt"
+    source.write_text(TEXT)
+
+    convert(source, tmp_path / f"{{layout}}{suffix}", *LAYOUTS)
+    for layout in LAYOUTS:
+        single = tmp_path / f"single-{layout}{suffix}"
+        convert(source, single, layout)
+        assert (tmp_path / f"{layout}{suffix}").read_bytes() == single.read_bytes()
+
+
+def test_symbolic_read():
+    symbolic = Text.read_symbolic(io.StringIO(TEXT))
+    assert isinstance(symbolic, SymbolicConfig)
+    assert symbolic.config.mappings == []
+
+    for layout in LAYOUTS:
+        assert symbolic.resolve(layout) == Text.read(io.StringIO(TEXT), layout)
+
+
+def test_failed_layouts(tmp_path, capsys):
+    names = set(get_backward_mapping("de_de"))
+    missing = [n for n in get_forward_mapping("default").values() if n not in names]
+    if not missing:
+        pytest.skip("de_DE can type every key of the default layout")
+
+    source = tmp_path / "in.txt"
+    source.write_text(TEXT + f"F4R = {missing[0]}\n")
+
+    with pytest.raises(SystemExit):
+        convert(source, tmp_path / "{layout}.cfg", *LAYOUTS)
+    assert (tmp_path / "default.cfg").exists()
+    assert not (tmp_path / "de_de.cfg").exists()
+    assert f"de_de: Invalid key: {missing[0]}" in capsys.readouterr().out
+
+
+def test_unwritable_output(tmp_path, capsys):
+    source = tmp_path / "in.txt"
+    source.write_text(TEXT)
+
+    # Every layout reports its own error rather than the first one aborting
+    with pytest.raises(SystemExit):
+        convert(source, tmp_path / "missing" / "{layout}.cfg", *LAYOUTS)
+    out = capsys.readouterr().out
+    for layout in LAYOUTS:
+        assert f"{layout}: " in out
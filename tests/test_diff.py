@@ -0,0 +1,87 @@
+import argparse
+import io
+from dataclasses import replace
+
+import pytest
+
+from twiddler_ctl.commands.diff import diff_command
+from twiddler_ctl.config.config7 import Config7
+from twiddler_ctl.diff import diff_configs
+from twiddler_ctl.models import Command, CommandType, Config
+
+from conftest import KEY_A, KEY_B, KEY_Z, key, mapping
+
+
+def config_chord(config: Config, i: int) -> int:
+    return Config7._chord_to_int(config.mappings[i].chord)
+
+
+def test_same(config):
+    assert not diff_configs(config, replace(config, mappings=config.mappings[::-1]))
+
+
+def test_mappings(config):
+    other = replace(
+        config,
+        mappings=[
+            *config.mappings[1:4],
+            mapping(1 << 10, key(KEY_Z)),
+            mapping(config_chord(config, 4), key(KEY_A)),
+        ],
+    )
+
+    result = diff_configs(config, other)
+    assert result.removed == [config.mappings[0]]
+    assert result.added == [other.mappings[3]]
+    assert result.changed == [(config.mappings[4], other.mappings[4])]
+    assert not result.header and not result.dedicated
+
+
+def test_settings(config):
+    dedicated = list(config.dedicated)
+    dedicated[3] = 0
+    other = replace(config, idle_time=100, sticky_num=True, dedicated=dedicated)
+
+    result = diff_configs(config, other)
+    assert result.header == [("sticky_num", False, True), ("idle_time", 300, 100)]
+    assert result.dedicated == [(3, config.dedicated[3], 0)]
+    assert not (result.added or result.removed or result.changed)
+
+
+def test_duplicates(config):
+    # The last mapping of a chord is the one compared
+    other = replace(config, mappings=[*config.mappings, mapping(1 << 0, key(KEY_B))])
+
+    result = diff_configs(config, other)
+    assert result.old_duplicates == []
+    assert result.new_duplicates == [1 << 0]
+    assert result.changed == [(config.mappings[0], other.mappings[-1])]
+
+
+def test_unnamed_commands(tmp_path, config, capsys):
+    other = replace(
+        config,
+        mappings=[
+            *config.mappings[1:],
+            # No layout names key 0xFF, and text has no way to write `b`
+            mapping(1 << 0, Command(CommandType.KEYBOARD, KEY_A << 8, 3)),
+            mapping(1 << 10, Command(CommandType.KEYBOARD, 0xFF << 8, 0)),
+        ],
+    )
+    paths = []
+    for name, cfg in (("a.cfg", config), ("b.cfg", other)):
+        buf = io.BytesIO()
+        Config7.write(cfg, buf, "default")
+        (tmp_path / name).write_bytes(buf.getvalue())
+        paths.append(tmp_path / name)
+
+    args = argparse.Namespace(
+        a=paths[0], b=paths[1], a_format=None, b_format=None, layout="default"
+    )
+    with pytest.raises(SystemExit) as exc:
+        diff_command(args)
+    assert exc.value.code == 1
+    assert capsys.readouterr().out.splitlines() == [
+        "+ F3M = keyboard:0xff00",
+        "~ T1 = a -> keyboard:0x400/0x3",
+    ]
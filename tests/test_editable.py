@@ -0,0 +1,57 @@
+import io
+
+from twiddler_ctl.config.config7 import MAPPING_LENGTH, Config7
+from twiddler_ctl.config.editable import EditableConfig7
+from twiddler_ctl.models import Config, Mapping
+
+from conftest import KEY_A, KEY_B, KEY_Z, key, mapping
+
+
+def encode(cfg: Config) -> bytes:
+    buf = io.BytesIO()
+    Config7.write(cfg, buf, "default")
+    return buf.getvalue()
+
+
+def mappings(data: bytes) -> list[Mapping]:
+    cfg = Config7.read(io.BytesIO(data), "default")
+    return sorted(cfg.mappings, key=lambda m: Config7._chord_to_int(m.chord))
+
+
+def edit(config: Config, new: Mapping) -> tuple[bytes, bytes]:
+    image = encode(config)
+    editable = EditableConfig7(image)
+    editable.set(new.chord, new.commands)
+    return image, editable.to_bytes()
+
+
+def test_splice_reuses_aligned_list(config):
+    # The tail of the shared A B Z list
+    new = mapping(1 << 14, key(KEY_B), key(KEY_Z))
+    image, edited = edit(config, new)
+
+    assert len(edited) == len(image) + MAPPING_LENGTH
+    config.mappings.append(new)
+    assert mappings(edited) == mappings(encode(config))
+
+
+def test_splice_appends_new_list(config):
+    new = mapping(1 << 14, key(KEY_Z), key(KEY_A))
+    image, edited = edit(config, new)
+
+    assert len(edited) == len(image) + MAPPING_LENGTH + len(
+        Config7._command_list_to_bytes(new.commands)
+    )
+    config.mappings.append(new)
+    assert mappings(edited) == mappings(encode(config))
+
+
+def test_replace_and_remove(config):
+    editable = EditableConfig7(encode(config))
+    editable.set(config.mappings[0].chord, [key(KEY_Z)])
+    editable.remove(config.mappings[1].chord)
+    assert len(editable) == len(config.mappings) - 1
+
+    config.mappings[0] = mapping(1 << 0, key(KEY_Z))
+    del config.mappings[1]
+    assert mappings(editable.to_bytes()) == mappings(encode(config))
@@ -0,0 +1,41 @@
+import pytest
+
+from twiddler_ctl.encode import ChordEncoder
+from twiddler_ctl.models import Command, CommandType, Config
+
+from conftest import KEY_A, KEY_B, key, mapping
+
+F1R = 1 << 1
+F2R = 1 << 5
+F3R = 1 << 9
+
+
+@pytest.fixture
+def encoder() -> ChordEncoder:
+    config = Config(
+        mappings=[
+            mapping(F1R | F2R, key(KEY_A)),
+            mapping(F1R, key(KEY_A)),
+            mapping(F2R, key(KEY_B)),
+            mapping(F3R, key(KEY_A), key(KEY_B)),
+            # Not typing, so never used
+            mapping(1 << 13, Command(CommandType.DELAY, 25, 0)),
+        ]
+    )
+    return ChordEncoder(config, "default")
+
+
+def test_short_string(encoder):
+    assert encoder.encode("ba") == [(F2R, "b"), (F1R, "a")]
+
+
+def test_prefers_macros(encoder):
+    chords = encoder.encode("abba")
+    assert chords == [(F3R, "ab"), (F2R, "b"), (F1R, "a")]
+    assert encoder.keystrokes(chords) == [KEY_A, KEY_B, KEY_B, KEY_A]
+
+
+def test_untypeable(encoder):
+    assert encoder.encode("") == []
+    with pytest.raises(ValueError, match="Cannot type 'z' at offset 1"):
+        encoder.encode("az")
@@ -0,0 +1,123 @@
+import argparse
+import io
+from pathlib import Path
+
+import pytest
+
+from twiddler_ctl.commands._util import load_config
+from twiddler_ctl.commands.index import index_query_command
+from twiddler_ctl.config.config7 import Config7
+from twiddler_ctl.index import ConfigIndex, config_files
+from twiddler_ctl.models import Config
+
+F1R = 1 << 1
+F2R = 1 << 5
+
+
+class Loader:
+    """Loads configs like `index build`, counting the files decoded"""
+
+    def __init__(self):
+        self.loaded: list[str] = []
+
+    def __call__(self, path: Path) -> Config:
+        self.loaded.append(path.name)
+        return load_config(path, None, "default")
+
+
+@pytest.fixture
+def configs(tmp_path, config) -> Path:
+    buf = io.BytesIO()
+    Config7.write(config, buf, "default")
+    (tmp_path / "a.cfg").write_bytes(buf.getvalue())
+    (tmp_path / "base.txt").write_text("[mappings]\nF1R = a\n")
+    (tmp_path / "child.txt").write_text(
+        "[config]\nextends = base.txt\n[mappings]\nF2R = z\n"
+    )
+    return tmp_path
+
+
+def build(index: ConfigIndex, root: Path) -> Loader:
+    load = Loader()
+    index.update(config_files([root]), load)
+    return load
+
+
+def names(results: list[tuple[str, int, str]]) -> list[str]:
+    return sorted({Path(name).name for name, _, _ in results})
+
+
+def test_query(configs):
+    index = ConfigIndex("default")
+    build(index, configs)
+
+    assert names(index.query_chord(F1R)) == ["a.cfg", "base.txt", "child.txt"]
+    assert names(index.query_command("z")) == ["a.cfg", "child.txt"]
+    assert index.query_command("nothing") == []
+
+
+def test_rebuild_skips_unchanged(configs):
+    index = ConfigIndex("default")
+    assert sorted(build(index, configs).loaded) == ["a.cfg", "base.txt", "child.txt"]
+    assert build(index, configs).loaded == []
+
+
+def test_rebuild_follows_edited_bases(configs):
+    index = ConfigIndex("default")
+    build(index, configs)
+
+    (configs / "base.txt").write_text("[mappings]\nF1R = b\n")
+    assert sorted(build(index, configs).loaded) == ["base.txt", "child.txt"]
+    assert names(index.query_command("b")) == ["a.cfg", "base.txt", "child.txt"]
+    assert names(index.query_command("a")) == ["a.cfg"]
+
+
+def test_save_and_load(configs, tmp_path_factory):
+    path = tmp_path_factory.mktemp("index") / "index.json"
+    index = ConfigIndex("default")
+    build(index, configs)
+    index.save(path)
+
+    loaded = ConfigIndex.load(path, "default")
+    assert loaded.files == index.files
+    assert build(loaded, configs).loaded == []
+    assert ConfigIndex.load(path, "other").files == {}
+
+
+def test_failed_and_removed_files(configs):
+    index = ConfigIndex("default")
+    build(index, configs)
+
+    (configs / "a.cfg").unlink()
+    (configs / "bad.txt").write_text("[mappings]\nF1R = not_a_key\n")
+    updated, removed, failed = index.update(config_files([configs]), Loader())
+
+    assert [Path(name).name for name in removed] == ["a.cfg"]
+    assert [Path(name).name for name, _ in failed] == ["bad.txt"]
+    assert names(index.query_chord(F1R)) == ["base.txt", "child.txt"]
+
+
+def test_vanished_files(configs):
+    index = ConfigIndex("default")
+    files = config_files([configs])
+    build(index, configs)
+
+    # Listed, then deleted before being looked at
+    (configs / "a.cfg").unlink()
+    missing = configs / "missing.cfg"
+    updated, removed, failed = index.update(files + [missing], Loader())
+
+    assert sorted(Path(name).name for name, _ in failed) == ["a.cfg", "missing.cfg"]
+    assert names(index.query_chord(F1R)) == ["base.txt", "child.txt"]
+
+
+def test_query_rejects_empty_chord(configs, tmp_path_factory, capsys):
+    path = tmp_path_factory.mktemp("index") / "index.json"
+    index = ConfigIndex("default")
+    build(index, configs)
+    index.save(path)
+
+    args = argparse.Namespace(index=path, layout="default", chord="X9", command=None)
+    with pytest.raises(SystemExit):
+        index_query_command(args)
+    assert "Invalid chord: X9" in capsys.readouterr().out
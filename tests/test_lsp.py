@@ -0,0 +1,106 @@
+import io
+import json
+import random
+
+from twiddler_ctl.lsp import Document, LanguageServer
+
+LINES = [
+    "[config]",
+    "[mappings]",
+    "F1R = a",
+    "F1R = b",
+    "F2M = nosuchkey",
+    "T1 = z",
+    "F1L = a",
+    "# comment",
+    "",
+    "junk",
+]
+
+
+def change(a: int, ca: int, b: int, cb: int, text: str) -> dict:
+    return {
+        "range": {
+            "start": {"line": a, "character": ca},
+            "end": {"line": b, "character": cb},
+        },
+        "text": text,
+    }
+
+
+def test_duplicates():
+    doc = Document("[mappings]\nF1R = a\nF2R = a\nF1R = b\n", "default")
+    diagnostics = json.loads(doc.diagnostics())
+    assert [(d["range"]["start"]["line"], d["message"]) for d in diagnostics] == [
+        (1, "Chord is also bound on line 4"),
+        (3, "Chord is also bound on line 2"),
+    ]
+
+    # Lines above move both
+    doc.apply_change(change(0, 0, 0, 0, "# comment\n"))
+    diagnostics = json.loads(doc.diagnostics())
+    assert [(d["range"]["start"]["line"], d["message"]) for d in diagnostics] == [
+        (2, "Chord is also bound on line 5"),
+        (4, "Chord is also bound on line 3"),
+    ]
+
+    # Removing one clears the other
+    doc.apply_change(change(2, 0, 3, 0, ""))
+    assert doc.diagnostics() == "[]"
+
+
+def test_edits_match_fresh_document():
+    rng = random.Random(0)
+    for _ in range(100):
+        doc = Document("\n".join(rng.choices(LINES, k=12)), "default")
+        for _ in range(20):
+            a = rng.randrange(len(doc.lines))
+            b = rng.randrange(a, len(doc.lines))
+            ca = rng.randrange(len(doc.lines[a].text) + 1)
+            cb = rng.randrange(len(doc.lines[b].text) + 1)
+            if a == b and cb < ca:
+                ca, cb = cb, ca
+            text = "\n".join(rng.choices(LINES, k=rng.randrange(3)))
+            doc.apply_change(change(a, ca, b, cb, text))
+
+            fresh = Document("\n".join(line.text for line in doc.lines), "default")
+            assert doc.diagnostics() == fresh.diagnostics()
+
+
+def serve(*messages: dict) -> list[dict]:
+    rfile = io.BytesIO()
+    for msg in messages:
+        body = json.dumps(msg).encode()
+        rfile.write(f"Content-Length: {len(body)}\r\n\r\n".encode() + body)
+    rfile.seek(0)
+
+    wfile = io.BytesIO()
+    LanguageServer("default", rfile, wfile).serve()
+
+    replies = []
+    for part in wfile.getvalue().split(b"Content-Length: ")[1:]:
+        replies.append(json.loads(part.partition(b"\r\n\r\n")[2]))
+    return replies
+
+
+def test_handler_errors():
+    uri = "file:///a.txt"
+    replies = serve(
+        # Missing the document
+        {"jsonrpc": "2.0", "method": "textDocument/didOpen", "params": {}},
+        {"jsonrpc": "2.0", "id": 1, "method": "textDocument/completion"},
+        {
+            "jsonrpc": "2.0",
+            "method": "textDocument/didOpen",
+            "params": {"textDocument": {"uri": uri, "text": "[mappings]\nF1R = ?"}},
+        },
+        {"jsonrpc": "2.0", "method": "exit"},
+    )
+
+    assert replies[0]["method"] == "window/logMessage"
+    assert replies[1]["id"] == 1
+    assert replies[1]["error"]["code"] == -32603
+    # The server is still running
+    assert replies[2]["method"] == "textDocument/publishDiagnostics"
+    assert replies[2]["params"]["uri"] == uri
+    assert len(replies[2]["params"]["diagnostics"]) == 1
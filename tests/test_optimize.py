@@ -0,0 +1,52 @@
+from collections import Counter
+
+import pytest
+
+from twiddler_ctl.config.config7 import FINGER_SHIFTS, THUMB_SHIFTS
+from twiddler_ctl.optimize import (
+    EffortModel,
+    candidate_chords,
+    chord_cost,
+    key_frequencies,
+    optimize_assignment,
+    transition_cost,
+)
+
+TEXT = "the quick brown fox jumps over the lazy dog " * 20 + "abababab cdcdcd " * 30
+
+
+def test_candidates():
+    chords = candidate_chords(2)
+    assert len(chords) == len(set(chords))
+
+    # Every button the effort model prices is proposed on its own
+    for shifts in [*FINGER_SHIFTS, THUMB_SHIFTS]:
+        for shift in shifts:
+            assert 1 << shift in chords
+
+
+def cost(assignment: dict[str, int], text: str, model: EffortModel) -> float:
+    unigrams, bigrams = key_frequencies(text)
+    total = sum(n * chord_cost(assignment[k], model) for k, n in unigrams.items())
+    for (a, b), n in bigrams.items():
+        if a != b:
+            total += n * transition_cost(assignment[a], assignment[b], model)
+    return total
+
+
+def test_optimize():
+    model = EffortModel()
+    unigrams, bigrams = key_frequencies(TEXT)
+
+    result = optimize_assignment(
+        unigrams, bigrams, candidate_chords(2), model, 20_000, seed=1
+    )
+    assert result.assignment.keys() == unigrams.keys()
+    assert len(set(result.assignment.values())) == len(result.assignment)
+    assert result.cost < result.initial_cost
+    assert abs(cost(result.assignment, TEXT, model) - result.cost) < 1e-6
+
+
+def test_too_few_chords():
+    with pytest.raises(ValueError, match="Not enough chords"):
+        optimize_assignment(Counter("abc"), Counter(), [1, 2], EffortModel(), 10)
@@ -0,0 +1,74 @@
+from twiddler_ctl.models import CommandType, Config
+from twiddler_ctl.reachability import Reach, check_layouts, key_uses
+from twiddler_ctl.util import get_backward_mapping, get_forward_mapping, get_layout_map
+
+from conftest import key, mapping
+
+SOURCE = "default"
+# Not a key code any layout names
+UNKNOWN = 0xFF
+
+
+def code(name: str) -> int:
+    return get_backward_mapping(SOURCE)[name]
+
+
+def expected_row(config: Config, layout: str) -> dict[int, Reach]:
+    """Each mapping checked on its own, the slow way"""
+
+    forward = get_forward_mapping(layout)
+    typeable = get_backward_mapping(layout)
+    source = get_forward_mapping(SOURCE)
+
+    row = {}
+    for i, m in enumerate(config.mappings):
+        worst = Reach.SAME
+        for cmd in m.commands:
+            name = source.get(cmd.a >> 8)
+            if cmd.command_type != CommandType.KEYBOARD or name is None:
+                continue
+            if forward.get(cmd.a >> 8) != name:
+                status = Reach.CHANGED if name in typeable else Reach.UNREACHABLE
+                worst = max(worst, status)
+        if worst != Reach.SAME:
+            row[i] = worst
+    return row
+
+
+def test_matrix():
+    codes = sorted(get_forward_mapping(SOURCE))
+    config_mappings = [mapping(1 << (i % 20), key(c)) for i, c in enumerate(codes)]
+    # Several keys in one mapping, and a key typed by several mappings
+    config_mappings.append(mapping(1, *(key(c) for c in codes[::7])))
+    config_mappings.append(mapping(2, key(UNKNOWN), key(codes[0])))
+
+    config = Config(mappings=config_mappings)
+    result = check_layouts(config, SOURCE, jobs=2)
+
+    assert result.layouts == sorted(get_layout_map())
+    assert result.unknown == {UNKNOWN}
+    for layout in result.layouts:
+        assert result.matrix[layout] == expected_row(config, layout), layout
+    assert result.matrix[SOURCE] == {}
+
+
+def test_swapped_keys():
+    config = Config(
+        mappings=[
+            mapping(1, key(code("a"))),
+            mapping(2, key(code("a")), key(code("y"))),
+        ]
+    )
+    result = check_layouts(config, SOURCE, ["de_de"], jobs=1)
+    assert result.matrix == {"de_de": {1: Reach.CHANGED}}
+
+
+def test_key_uses():
+    a, y = code("a"), code("y")
+    config = Config(
+        mappings=[
+            mapping(1, key(a), key(a)),
+            mapping(2, key(y), key(a)),
+        ]
+    )
+    assert key_uses(config) == {a: [0, 1], y: [1]}
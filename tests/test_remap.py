@@ -0,0 +1,111 @@
+import argparse
+import io
+
+import pytest
+
+from twiddler_ctl.commands.remap import remap_command
+from twiddler_ctl.config.config7 import Config7
+from twiddler_ctl.config.text import Text
+from twiddler_ctl.models import Command, CommandType
+from twiddler_ctl.remap import build_translation, remap_image
+from twiddler_ctl.util import get_backward_mapping, get_forward_mapping
+
+from conftest import KEY_A, key, mapping
+
+
+def encode(cfg) -> bytes:
+    buf = io.BytesIO()
+    Config7.write(cfg, buf, "default")
+    return buf.getvalue()
+
+
+def as_text(cfg) -> list[str]:
+    text = io.StringIO()
+    Text.write(cfg, text, "de_de")
+    return sorted(text.getvalue().splitlines())
+
+
+def missing_key(src: str, dst: str) -> int:
+    names = set(get_backward_mapping(dst))
+    for code, name in get_forward_mapping(src).items():
+        if code <= 0xFF and name not in names:
+            return code
+    pytest.skip(f"{dst} can type every key of {src}")
+
+
+def remap(tmp_path, data: bytes, keep_missing: bool = False) -> bytes:
+    source = tmp_path / "in.cfg"
+    source.write_bytes(data)
+    output = tmp_path / "out.cfg"
+    remap_command(
+        argparse.Namespace(
+            input=source,
+            output=output,
+            src="default",
+            dst="de_de",
+            keep_missing=keep_missing,
+        )
+    )
+    return output.read_bytes()
+
+
+def test_matches_text_conversion(config):
+    table, _ = build_translation("default", "de_de")
+    data, used = remap_image(encode(config), table)
+    assert KEY_A in used
+
+    # Through text, keys are matched by name in the target layout
+    text = io.StringIO()
+    Text.write(config, text, "default")
+    text.seek(0)
+    assert as_text(Config7.read(io.BytesIO(data), "de_de")) == as_text(
+        Text.read(text, "de_de")
+    )
+
+
+def test_used_keys_are_keyboard_commands(config):
+    # A delay whose value looks like a key code is not a key
+    config.mappings.append(mapping(1 << 14, Command(CommandType.DELAY, 0x35 << 8, 0)))
+
+    _, used = remap_image(encode(config), bytes(range(256)))
+    assert used == {
+        c.a >> 8
+        for m in config.mappings
+        for c in m.commands
+        if c.command_type == CommandType.KEYBOARD
+    }
+
+
+def test_unsupported_version(config):
+    data = bytearray(encode(config))
+    data[4] = 6
+    with pytest.raises(ValueError, match="Unsupported version"):
+        remap_image(bytes(data), bytes(range(256)))
+
+
+def test_unused_missing_keys_are_ignored(tmp_path, config, capsys):
+    missing_key("default", "de_de")
+
+    remap(tmp_path, encode(config))
+    assert capsys.readouterr().err == ""
+
+
+def test_missing_keys_fail(tmp_path, config, capsys):
+    code = missing_key("default", "de_de")
+    config.mappings.append(mapping(1 << 14, key(code)))
+
+    with pytest.raises(SystemExit):
+        remap(tmp_path, encode(config))
+    assert "--keep-missing" in capsys.readouterr().err
+    assert not (tmp_path / "out.cfg").exists()
+
+
+def test_keep_missing(tmp_path, config, capsys):
+    code = missing_key("default", "de_de")
+    config.mappings.append(mapping(1 << 14, key(code)))
+
+    data = remap(tmp_path, encode(config), keep_missing=True)
+    assert get_forward_mapping("default")[code] in capsys.readouterr().err
+    assert key(code) in [
+        c for m in Config7.read(io.BytesIO(data), "de_de").mappings for c in m.commands
+    ]
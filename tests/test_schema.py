@@ -0,0 +1,89 @@
+import hashlib
+import io
+
+import pytest
+
+from twiddler_ctl.config.config7 import CONFIG7_SCHEMA, Config7
+from twiddler_ctl.config.schema import (
+    MAPPING_COUNT,
+    Bits,
+    Field,
+    Schema,
+    compile_schema,
+)
+from twiddler_ctl.models import Config
+
+from conftest import KEY_A, KEY_B, key, mapping
+
+SCHEMA = Schema(
+    version=1,
+    header_length=8,
+    fields=(
+        Field(0, "B", "version"),
+        Field(1, "B", bits=(Bits("repeat", 0), Bits("nav_sensitivity", 1, 3))),
+        Field(2, "H", MAPPING_COUNT),
+        Field(4, "H", "idle_time"),
+        Field(6, "2s", const=b"ab"),
+    ),
+)
+
+
+def test_round_trip():
+    codec = compile_schema(SCHEMA)
+    cfg = Config(version=1, repeat=True, nav_sensitivity=5, idle_time=1000)
+
+    data = codec.pack(cfg, 3)
+    assert data == bytes([1, 0b1011, 3, 0]) + (1000).to_bytes(2, "little") + b"ab"
+
+    read = Config()
+    assert codec.unpack(read, data) == 3
+    assert read == cfg
+
+
+def test_config7_image():
+    cfg = Config(
+        idle_time=300,
+        repeat_delay=40,
+        sticky_shift=True,
+        bluetooth=True,
+        nav_up_direction=2,
+        nav_invert_x=True,
+        nav_sensitivity=5,
+        dedicated=[1 + i % 8 for i in range(20)],
+        mappings=[mapping(1, key(KEY_A)), mapping(2, key(KEY_B, 0x02))],
+    )
+
+    buf = io.BytesIO()
+    Config7.write(cfg, buf, "default")
+    # As written by the field by field encoder the schema replaced
+    assert (
+        hashlib.sha256(buf.getvalue()).hexdigest()
+        == "8833762f9c468c915dc3088faf18bafd8399493e73c52abbd85f646f6032686d"
+    )
+
+    buf.seek(0)
+    read = Config7.read(buf, "default")
+    for name in ("idle_time", "sticky_shift", "bluetooth", "nav_sensitivity"):
+        assert getattr(read, name) == getattr(cfg, name)
+    assert (read.nav_up_direction, read.nav_invert_x) == (2, True)
+
+
+@pytest.mark.parametrize(
+    "field",
+    [
+        Field(8, "B", "idle time"),
+        Field(8, "B", "class"),
+        Field(8, "B", bits=(Bits("x); import os; (", 0),)),
+        Field(8, "B", bits=(Bits("repeat", "0; import os"),)),
+    ],
+)
+def test_invalid_fields(field):
+    schema = Schema(version=1, header_length=16, fields=(*SCHEMA.fields, field))
+    with pytest.raises(ValueError):
+        compile_schema(schema)
+
+
+def test_overlapping_fields():
+    fields = (*CONFIG7_SCHEMA.fields, Field(11, "B", "repeat_delay"))
+    with pytest.raises(ValueError, match="Overlapping"):
+        compile_schema(Schema(version=7, header_length=0x80, fields=fields))
@@ -0,0 +1,50 @@
+import asyncio
+import json
+import stat
+
+import pytest
+
+from twiddler_ctl import server
+from twiddler_ctl.protocol import FRAME_HEADER
+
+
+def response(data: bytes) -> dict:
+    length = FRAME_HEADER.unpack_from(data)[0]
+    return json.loads(data[FRAME_HEADER.size : FRAME_HEADER.size + length])
+
+
+@pytest.mark.parametrize("header", [[], "convert", None])
+def test_header_not_an_object(header):
+    resp = response(server._dispatch(header, b""))
+    assert resp == {"ok": False, "error": "Header must be an object"}
+
+
+def test_unexpected_error(monkeypatch):
+    def fail(header, body):
+        raise TypeError("bad body")
+
+    monkeypatch.setitem(server.OPERATIONS, "convert", fail)
+    resp = response(server._dispatch({"op": "convert"}, b""))
+    assert resp == {"ok": False, "error": "Internal error: TypeError: bad body"}
+
+
+def test_missing_field():
+    resp = response(server._dispatch({"op": "convert"}, b""))
+    assert resp["ok"] is False
+
+
+def test_socket_permissions(tmp_path, monkeypatch):
+    path = tmp_path / "s.sock"
+    modes = []
+
+    async def run():
+        task = asyncio.create_task(server.serve(path, []))
+        while not path.exists():
+            await asyncio.sleep(0.01)
+        modes.append(stat.S_IMODE(path.stat().st_mode))
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+    asyncio.run(run())
+    assert modes == [0o600]
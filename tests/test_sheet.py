@@ -0,0 +1,24 @@
+from twiddler_ctl.models import Command, CommandType, Config
+from twiddler_ctl.sheet import sheet_entries
+
+from conftest import KEY_A, key, mapping
+
+
+def test_entries():
+    config = Config(
+        mappings=[
+            mapping(1 << 0, key(KEY_A)),
+            # Not expressible as text: a key no layout names, and a `b` value
+            mapping(1 << 1, Command(CommandType.KEYBOARD, 0xFF << 8, 0)),
+            mapping(1 << 2, Command(CommandType.KEYBOARD, KEY_A << 8, 3)),
+        ]
+    )
+    config.dedicated[0] = 1
+
+    entries = list(sheet_entries(config, "default"))
+    assert [chord for chord, _, _ in entries] == [1 << 0, 1 << 0, 1 << 1, 1 << 2]
+    assert [action for _, _, action in entries[1:]] == [
+        "a",
+        "keyboard:0xff00",
+        "keyboard:0x400/0x3",
+    ]
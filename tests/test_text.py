@@ -0,0 +1,121 @@
+import io
+from dataclasses import replace
+from pathlib import Path
+
+import pytest
+
+from twiddler_ctl.config.text import LAYER_CACHE_SIZE, Text, _parse_layer
+from twiddler_ctl.models import Config
+
+from conftest import KEY_A, KEY_Z
+
+
+def read(path: Path) -> Config:
+    with open(path) as fh:
+        return Text.read(fh, "default")
+
+
+def keys(cfg: Config) -> dict[str, list[int]]:
+    return {
+        Text._chord_to_text(m.chord): [cmd.a >> 8 for cmd in m.commands]
+        for m in cfg.mappings
+    }
+
+
+def test_round_trip(config):
+    buf = io.StringIO()
+    Text.write(config, buf, "default")
+    buf.seek(0)
+    assert Text.read(buf, "default") == config
+
+
+def test_overlay_order(tmp_path):
+    (tmp_path / "base.txt").write_text(
+        "[config]\nidle_time = 100\n[mappings]\nF1R = a\nF2R = a\n"
+    )
+    (tmp_path / "child.txt").write_text(
+        "[config]\nextends = base.txt\nsticky_num = true\n[mappings]\nF2R = z\n"
+    )
+
+    cfg = read(tmp_path / "child.txt")
+    assert (cfg.idle_time, cfg.sticky_num) == (100, True)
+    assert keys(cfg) == {"F1R": [KEY_A], "F2R": [KEY_Z]}
+
+
+def test_overlay_sees_edited_bases(tmp_path):
+    grand = tmp_path / "grand.txt"
+    grand.write_text("[mappings]\nF1R = a\n")
+    (tmp_path / "base.txt").write_text("[config]\nextends = grand.txt\n")
+    child = tmp_path / "child.txt"
+    child.write_text("[config]\nextends = base.txt\n[mappings]\nF2R = a\n")
+
+    assert keys(read(child))["F1R"] == [KEY_A]
+
+    # Only the file at the end of the chain changes
+    grand.write_text("[mappings]\nF1R = z\n")
+    assert keys(read(child))["F1R"] == [KEY_Z]
+
+
+def test_overlay_circular(tmp_path):
+    (tmp_path / "a.txt").write_text("[config]\nextends = b.txt\n")
+    (tmp_path / "b.txt").write_text("[config]\nextends = a.txt\n")
+
+    with pytest.raises(ValueError, match="Circular extends"):
+        read(tmp_path / "a.txt")
+
+
+def test_overlay_reads_like_plain_config(tmp_path):
+    # T1 and T11 are the same chord, and %(base)s is interpolated
+    body = (
+        "[config]\nbase = 30\nidle_time = %(base)s0\n"
+        "[mappings]\nT1 = a\nF2R = b\nT11 = z\n"
+    )
+    (tmp_path / "plain.txt").write_text(body)
+    (tmp_path / "empty.txt").write_text("")
+    (tmp_path / "child.txt").write_text(
+        body.replace("\n", "\nextends = empty.txt\n", 1)
+    )
+
+    plain = read(tmp_path / "plain.txt")
+    assert plain.idle_time == 300
+    assert [Text._chord_to_text(m.chord) for m in plain.mappings] == ["T1", "T1", "F2R"]
+    assert read(tmp_path / "child.txt") == plain
+
+
+def test_overlay_replaces_duplicate_chords(tmp_path):
+    (tmp_path / "base.txt").write_text("[mappings]\nT1 = a\nT11 = a\n")
+    (tmp_path / "child.txt").write_text(
+        "[config]\nextends = base.txt\n[mappings]\nT1 = z\n"
+    )
+
+    cfg = read(tmp_path / "child.txt")
+    assert [[cmd.a >> 8 for cmd in m.commands] for m in cfg.mappings] == [[KEY_Z]]
+
+
+def test_layer_cache_is_bounded(tmp_path):
+    for i in range(LAYER_CACHE_SIZE + 10):
+        path = tmp_path / f"base{i}.txt"
+        path.write_text(f"[config]\nidle_time = {i}\n")
+        child = tmp_path / "child.txt"
+        child.write_text(f"[config]\nextends = {path.name}\n")
+        assert read(child).idle_time == i
+
+    assert _parse_layer.cache_info().currsize <= LAYER_CACHE_SIZE
+
+
+def test_chord_notation():
+    assert Text._chord_to_text(Text._chord_from_text("t14 f1rm 4l")) == "T14F1MR4L"
+    # Finger rows after the first may leave out the F, but not the first one
+    assert Text._chord_from_text("1R") == Text._chord_from_text("")
+    assert Text._chord_from_text("F1R2L") == Text._chord_from_text("F1RF2L")
+
+
+@pytest.mark.parametrize("name, code", [("north", 0), ("East", 1), ("south", 2)])
+def test_nav_up_direction(config, name, code):
+    cfg = Text.read(io.StringIO(f"[config]\nnav_up_direction = {name}\n"), "default")
+    assert cfg.nav_up_direction == code
+
+    buf = io.StringIO()
+    Text.write(replace(config, nav_up_direction=code), buf, "default")
+    buf.seek(0)
+    assert Text.read(buf, "default").nav_up_direction == code